@@ -0,0 +1,301 @@
+import math
+from collections import OrderedDict
+import numpy as np
+from src.PeriodicReview_JointReplenishment.scenarios import demand_history
+from src.PeriodicReview_JointReplenishment.fitness_cache import setup_hash
+
+# Samples of joint order events per review phase in the order-timing estimate
+ORDER_SAMPLES = 4096
+
+# Setup parameters the per-item results depend on; the container parameters only enter when items are combined
+ITEM_KEYS = ['holding_cost', 'backorder_cost', 'lead_time', 'num_items']
+
+# Analytical evaluators by item hash, so their per-item caches live for the whole run; the least recently
+# used is dropped when a process works on more problems, e.g. the points of a sweep
+MAX_EVALUATORS = 4
+_evaluators = OrderedDict()
+
+# Distributions of integer random variables are (offset, probabilities), where probabilities[k] is P(X = offset + k)
+
+def convolve(first, second):
+    """
+    Distribution of the sum of two independent integer random variables.
+    """
+    return first[0] + second[0], np.convolve(first[1], second[1])
+
+def negate(distribution):
+    """
+    Distribution of -X.
+    """
+    offset, probabilities = distribution
+    return -(offset + len(probabilities) - 1), probabilities[::-1]
+
+def double(distribution):
+    """
+    Distribution of 2X.
+    """
+    offset, probabilities = distribution
+    doubled = np.zeros(2 * len(probabilities) - 1)
+    doubled[::2] = probabilities
+    return 2 * offset, doubled
+
+def values(distribution):
+    """
+    Support of a distribution, aligned with its probabilities.
+    """
+    offset, probabilities = distribution
+    return np.arange(offset, offset + len(probabilities))
+
+class AnalyticalEvaluator:
+    """
+    Noise-free evaluation of policy combinations from the stationary distribution of each item.
+
+    The evaluation follows the bookkeeping of simulate_path exactly. An order placed in period t arrives in
+    period t + lead_time - 1, and the inventory level is updated as level -= arrivals - demand. Over a path this
+    gives, with I0 the initial inventory and P the inventory position after ordering,
+
+        level(t) - demand(t) = 2 * I0 - P(t - lead_time + 1) + demand(t - lead_time + 2) + ... + demand(t - 1).
+
+    The inventory position observed at review epochs is a Markov chain on (s, S]. Its stationary distribution,
+    mixed over the phases of the review cycle, gives the exact long-run holding cost, backorder cost and
+    service level of an item, which are cached by (item, r, s, S). The initial inventory is the sum of
+    2 * lead_time sampled demands, as in generate_scenarios; the initial transient and warm-up are ignored.
+
+    Only the container cost couples the items. Items order independently in the stationary regime, so the
+    joint order timing is estimated by sampling their order quantities at each review phase, with the same
+    samples for every candidate.
+    """
+
+    def __init__(self, demand_distribution, setup):
+        """
+        Parameters:
+            demand_distribution (numpy.ndarray or list): Empirical demand distribution for items.
+            setup (dict): Dictionary containing setup parameters.
+        """
+        self.setup = setup
+        self.lead_time = setup['lead_time']
+        if self.lead_time < 2:
+            raise ValueError("The analytical evaluator needs a lead_time of at least 2; with lead_time 1 orders never arrive")
+
+        history, history_lengths = demand_history(demand_distribution, setup['num_items'])
+        self.demand = []  # Per-item demand distribution of one period
+        for i, length in enumerate(history_lengths):
+            counts = np.bincount(history[i, :length].astype(np.int64))
+            self.demand.append((0, counts / length))
+
+        self.demand_sums = {}  # Distribution of the demand over k periods, by (item, k)
+        self.item_cache = {}  # Per-item results, by (item, r, s, S)
+        self.uniforms = np.random.default_rng(0).random((ORDER_SAMPLES, setup['num_items']))
+
+    def demand_sum(self, item, periods):
+        """
+        Distribution of the total demand of an item over a number of periods.
+        """
+        key = (item, periods)
+        if key not in self.demand_sums:
+            if periods == 0:
+                self.demand_sums[key] = (0, np.ones(1))
+            else:
+                self.demand_sums[key] = convolve(self.demand_sum(item, periods - 1), self.demand[item])
+        return self.demand_sums[key]
+
+    def stationary_position(self, item, r, s, S):
+        """
+        Stationary distribution of the inventory position right after a review.
+
+        Returns:
+            tuple: (distribution of the position, distribution of the demand over a review period)
+        """
+        lowest = min(s + 1, S)
+        states = np.arange(lowest, S + 1)
+        review_offset, review_demand = self.demand_sum(item, r)
+
+        # From position v, the next review sees v - demand; at or below s it orders up to S
+        transition = np.zeros((len(states), len(states)))
+        for k, probability in enumerate(review_demand):
+            next_position = states - (review_offset + k)
+            next_position = np.where(next_position <= s, S, next_position)
+            transition[np.arange(len(states)), next_position - lowest] += probability
+
+        # Solve pi = pi T with sum(pi) = 1
+        system = np.vstack([transition.T - np.eye(len(states)), np.ones(len(states))])
+        target = np.zeros(len(states) + 1)
+        target[-1] = 1
+        stationary = np.linalg.lstsq(system, target, rcond=None)[0].clip(min=0)
+        return (lowest, stationary / stationary.sum()), (review_offset, review_demand)
+
+    def item_metrics(self, item, r, s, S):
+        """
+        Long-run metrics of one item under an (r, s, S) policy.
+
+        Returns:
+            dict: Per-period 'holding' and 'backorder' cost, 'demand' and 'demand_met', and the distribution of
+                  the order quantity at a review, 'order' (0 when no order is placed).
+        """
+        key = (item, r, s, S)
+        if key in self.item_cache:
+            return self.item_cache[key]
+
+        position, review_demand = self.stationary_position(item, r, s, S)
+
+        # Position at a uniformly random phase of the review cycle
+        mixed_offset = position[0] - (len(review_demand[1]) - 1)
+        mixed = np.zeros(len(position[1]) + len(review_demand[1]) - 1)
+        for phase in range(r):
+            offset, probabilities = convolve(position, negate(self.demand_sum(item, phase)))
+            mixed[offset - mixed_offset:offset - mixed_offset + len(probabilities)] += probabilities / r
+
+        # level - demand = 2 * I0 - P + demand over lead_time - 2 periods
+        initial_inventory = self.demand_sum(item, 2 * self.lead_time)
+        shortfall = convolve(convolve(double(initial_inventory), negate((mixed_offset, mixed))), self.demand_sum(item, self.lead_time - 2))
+        shortfall_values = values(shortfall)
+        level = convolve(shortfall, self.demand[item])
+        level_values = values(level)
+
+        demand_values = values(self.demand[item])
+        # Demand is met in full when level >= demand, otherwise up to the positive level
+        met = np.where(shortfall_values[:, None] >= 0, demand_values[None, :],
+                       np.maximum(0, shortfall_values[:, None] + demand_values[None, :]))
+
+        # Order quantity at a review: S - (position - review demand) when that is at or below s
+        pre_review = convolve(position, negate(review_demand))
+        order_quantities = S - values(pre_review)
+        orders = pre_review[1] * ((values(pre_review) <= s) & (order_quantities != 0))  # An empty order is no order
+        quantities = np.concatenate([[0], order_quantities[orders > 0]])
+        probabilities = np.concatenate([[1 - orders.sum()], orders[orders > 0]])
+
+        metrics = {
+            'holding': self.setup['holding_cost'] * (level[1] * level_values * (level_values > 1)).sum(),
+            'backorder': self.setup['backorder_cost'] * (shortfall[1] * np.maximum(0, -shortfall_values)).sum(),
+            'demand': (self.demand[item][1] * demand_values).sum(),
+            'demand_met': (shortfall[1][:, None] * self.demand[item][1][None, :] * met).sum(),
+            'order': (quantities, np.cumsum(probabilities.clip(min=0)))
+        }
+        self.item_cache[key] = metrics
+        return metrics
+
+    def order_samples(self, policies, item_metrics):
+        """
+        Sample the joint order quantities at every phase of the review cycle.
+
+        Returns:
+            tuple: (cycle length, list of (reviewing items, sampled quantities of shape (ORDER_SAMPLES, items)))
+        """
+        cycle = math.lcm(*(int(policy[0]) for policy in policies))
+        phases = []
+        for phase in range(cycle):
+            items = [i for i, policy in enumerate(policies) if phase % policy[0] == 0]
+            quantities = np.zeros((ORDER_SAMPLES, len(items)))
+            for column, i in enumerate(items):
+                order_values, cumulative = item_metrics[i]['order']
+                picks = np.searchsorted(cumulative / cumulative[-1], self.uniforms[:, i], side='right').clip(max=len(order_values) - 1)
+                quantities[:, column] = order_values[picks]
+            phases.append((items, quantities))
+        return cycle, phases
+
+    def evaluate_policies(self, policies, setup=None):
+        """
+        Parameters:
+            policies (list or numpy.ndarray): List of [r, s, S] per item.
+            setup (dict, optional): Setup whose order cost and container and pallet volumes combine the items.
+                Defaults to the evaluator's setup.
+
+        Returns:
+            tuple: (cost per period, service level, container fill rate, periodicity, containers per order),
+                as returned by simulate_policy.
+        """
+        setup = self.setup if setup is None else setup
+        item_metrics = [self.item_metrics(i, int(r), int(s), int(S)) for i, (r, s, S) in enumerate(policies)]
+        pallet_volume = np.asarray(setup['pallet_volume'], dtype=np.float64)
+        container_volume = setup['container_volume']
+
+        cycle, phases = self.order_samples(policies, item_metrics)
+        orders = containers = fill = 0.0
+        for items, quantities in phases:
+            ordering = np.any(quantities != 0, axis=1)
+            volume = quantities @ pallet_volume[items]
+            phase_containers = np.where(ordering, np.ceil(volume / container_volume), 0)
+            orders += ordering.mean()
+            containers += phase_containers.mean()
+            fill += np.where(phase_containers > 0, volume / (container_volume * np.where(phase_containers > 0, phase_containers, 1)), 0).mean()
+
+        cost = sum(metrics['holding'] + metrics['backorder'] for metrics in item_metrics) + setup['order_cost'] * containers / cycle
+        total_demand = sum(metrics['demand'] for metrics in item_metrics)
+        service_level = 100 * sum(metrics['demand_met'] for metrics in item_metrics) / total_demand if total_demand > 0 else 1.0
+        container_fill_rate = fill / containers if containers > 0 else 0
+        containers_per_order = containers / orders if orders > 0 else 0
+
+        return cost, service_level, container_fill_rate, orders / cycle, containers_per_order
+
+    def evaluate(self, population, setup=None):
+        """
+        Parameters:
+            population (list or numpy.ndarray): Policy combinations.
+            setup (dict, optional): As for evaluate_policies.
+
+        Returns:
+            numpy.ndarray: 2D array of shape (pop_size, 5) with the metrics of each policy combination.
+        """
+        return np.array([self.evaluate_policies(policies, setup) for policies in np.asarray(population, dtype=np.int64)]).reshape(-1, 5)
+
+    def screening_costs(self, population, setup=None):
+        """
+        Optimistic analytical cost of each policy combination, used to screen out combinations before simulation.
+
+        The holding and backorder costs are the analytical estimates. The container cost counts every period
+        with an order as at least one container, and at least the expected ordered volume divided by the
+        container volume, so the result is below the analytical estimate. It is a heuristic, not a bound on
+        the simulated cost: a simulation of finite length can come out cheaper, and the stationary
+        estimate ignores the initial transient. Compare it with simulated costs only with a margin for that
+        noise, as in screened_metrics.
+
+        Parameters:
+            population (list or numpy.ndarray): Policy combinations.
+            setup (dict, optional): As for evaluate_policies.
+
+        Returns:
+            numpy.ndarray: 1D array with the screening cost of each policy combination.
+        """
+        setup = self.setup if setup is None else setup
+        pallet_volume = np.asarray(setup['pallet_volume'], dtype=np.float64)
+        costs = []
+        for policies in np.asarray(population, dtype=np.int64):
+            item_metrics = [self.item_metrics(i, int(r), int(s), int(S)) for i, (r, s, S) in enumerate(policies)]
+            item_cost = sum(metrics['holding'] + metrics['backorder'] for metrics in item_metrics)
+
+            cycle = math.lcm(*(int(r) for r in policies[:, 0]))
+            order_periods = volume = 0.0
+            for phase in range(cycle):
+                no_order = 1.0
+                for i, (r, _, _) in enumerate(policies):
+                    if phase % r == 0:
+                        order_values, cumulative = item_metrics[i]['order']
+                        probabilities = np.diff(cumulative, prepend=0) / cumulative[-1]
+                        no_order *= probabilities[0]
+                        volume += pallet_volume[i] * (probabilities * order_values).sum()
+                order_periods += 1 - no_order
+
+            costs.append(item_cost + setup['order_cost'] * max(order_periods, volume / setup['container_volume']) / cycle)
+        return np.array(costs)
+
+def analytical_evaluator(demand_distribution, setup):
+    """
+    Analytical evaluator of the demand data and item parameters of a problem, reused across calls so its
+    per-item cache is kept. Problems that only differ in container or order parameters share an evaluator;
+    pass their setup to evaluate.
+
+    Parameters:
+        demand_distribution (numpy.ndarray or list): Empirical demand distribution for items.
+        setup (dict): Dictionary containing setup parameters.
+
+    Returns:
+        AnalyticalEvaluator: The evaluator of this demand data and setup.
+    """
+    history, _ = demand_history(demand_distribution, setup['num_items'])
+    problem = setup_hash(history, setup, ITEM_KEYS)
+    if problem not in _evaluators:
+        _evaluators[problem] = AnalyticalEvaluator(demand_distribution, setup)
+        while len(_evaluators) > MAX_EVALUATORS:
+            _evaluators.popitem(last=False)
+    _evaluators.move_to_end(problem)
+    return _evaluators[problem]
@@ -0,0 +1,170 @@
+import os
+import json
+import struct
+import numpy as np
+
+# Start of every archive file, followed by the length of the JSON header
+ARCHIVE_MAGIC = b'PRJRARC2'
+
+def archive_dtype(num_items):
+    """
+    Record layout of an archive: one record per evaluated policy combination.
+
+    Parameters:
+        num_items (int): Number of items.
+
+    Returns:
+        numpy.dtype: Packed structured dtype with 'generation', 'policies' ([r, s, S] per item), 'metrics'
+            (cost, service level, container fill rate, periodicity, containers per order) and 'simulated'
+            (False for metrics that are only estimates, e.g. of candidates dropped by racing).
+    """
+    return np.dtype([('generation', '<i4'), ('policies', '<i4', (num_items, 3)), ('metrics', '<f8', (5,)), ('simulated', '?')])
+
+def read_header(file):
+    """
+    Read the header of an archive file.
+
+    Returns:
+        tuple: (header dictionary, offset of the first record)
+    """
+    magic = file.read(len(ARCHIVE_MAGIC))
+    if magic != ARCHIVE_MAGIC:
+        raise ValueError("Not an evaluation archive")
+    (length,) = struct.unpack('<I', file.read(4))
+    header = json.loads(file.read(length).decode())
+    return header, len(ARCHIVE_MAGIC) + 4 + length
+
+class EvaluationArchive:
+    """
+    Append-only file of every evaluated policy combination and its metrics.
+
+    Records are collected in a preallocated typed buffer and written out whenever it is full, so memory
+    stays flat however long the run is. The file is a short JSON header followed by fixed-size records,
+    which load_archive maps into memory for queries over the whole search history. Use it as a context
+    manager so the last records are written.
+    """
+
+    def __init__(self, path, num_items, problem=None, chunk_size=4096, resume_records=None):
+        """
+        Parameters:
+            path (str): Archive file; an existing file is replaced unless a run is resumed.
+            num_items (int): Number of items.
+            problem (str, optional): Hash of the demand data and setup, from setup_hash. Resuming an archive
+                of another problem is rejected. Defaults to None.
+            chunk_size (int, optional): Number of records buffered before they are written. Defaults to 4096.
+            resume_records (int, optional): Number of records of the existing archive to keep, as saved in the
+                checkpoint of the run being resumed. Records written after that checkpoint are dropped, as their
+                generations are evaluated again. Defaults to None (start a new archive).
+        """
+        self.path = path
+        self.dtype = archive_dtype(num_items)
+        self.buffer = np.zeros(chunk_size, dtype=self.dtype)
+        self.size = 0  # Number of buffered records
+
+        if resume_records is not None:
+            with open(path, 'rb') as file:
+                header, offset = read_header(file)
+            if header['num_items'] != num_items or header['problem'] != problem:
+                raise ValueError(f"Archive {path} was written for another problem")
+            if os.path.getsize(path) < offset + resume_records * self.dtype.itemsize:
+                raise ValueError(f"Archive {path} holds fewer records than the checkpoint")
+            os.truncate(path, offset + resume_records * self.dtype.itemsize)
+            self.written = resume_records  # Number of records in the file
+        else:
+            header = json.dumps({'num_items': num_items, 'problem': problem}).encode()
+            with open(path, 'wb') as file:
+                file.write(ARCHIVE_MAGIC + struct.pack('<I', len(header)) + header)
+            self.written = 0
+        self.file = open(path, 'ab')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def append(self, generation, population, metrics, simulated=None):
+        """
+        Add evaluated policy combinations.
+
+        Parameters:
+            generation (int): Generation the policy combinations were evaluated in.
+            population (numpy.ndarray): Policy combinations of shape (pop_size, num_items, 3).
+            metrics (numpy.ndarray): Their metrics, of shape (pop_size, 5).
+            simulated (numpy.ndarray, optional): Whether each policy combination was simulated on the full horizon,
+                as returned by evaluate_population. Defaults to all True.
+        """
+        population = np.asarray(population)
+        metrics = np.asarray(metrics)
+        simulated = np.ones(len(population), dtype=bool) if simulated is None else np.asarray(simulated)
+        start = 0
+        while start < len(population):
+            count = min(len(population) - start, len(self.buffer) - self.size)
+            records = self.buffer[self.size:self.size + count]
+            records['generation'] = generation
+            records['policies'] = population[start:start + count]
+            records['metrics'] = metrics[start:start + count]
+            records['simulated'] = simulated[start:start + count]
+            self.size += count
+            start += count
+            if self.size == len(self.buffer):
+                self.flush()
+
+    def flush(self):
+        """
+        Write the buffered records to the file.
+        """
+        if self.size > 0:
+            self.file.write(self.buffer[:self.size].tobytes())
+            self.written += self.size
+            self.size = 0
+        self.file.flush()
+
+    def close(self):
+        """
+        Write the remaining records and close the file.
+        """
+        if self.file is not None:
+            self.flush()
+            self.file.close()
+            self.file = None
+
+def load_archive(path):
+    """
+    Map the records of an archive into memory, without reading them.
+
+    Parameters:
+        path (str): Archive file.
+
+    Returns:
+        numpy.ndarray: Read-only structured array of records (see archive_dtype).
+    """
+    with open(path, 'rb') as file:
+        header, offset = read_header(file)
+    dtype = archive_dtype(header['num_items'])
+    num_records = (os.path.getsize(path) - offset) // dtype.itemsize
+    if num_records == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(num_records,))
+
+def best_meeting(records, min_service_level):
+    """
+    Cheapest archived policy combination that meets a service level in a full simulation.
+
+    Records whose metrics are estimates, such as the partial-horizon metrics of racing or the analytical
+    metrics of screened-out policies, are left out.
+
+    Parameters:
+        records (numpy.ndarray): Records from load_archive.
+        min_service_level (float): Minimum service level in percent, e.g. 95.
+
+    Returns:
+        tuple or None: (policies, cost, service level, container fill rate, periodicity, containers per order)
+            in the format returned by genetic_algorithm, or None when no policy meets the service level.
+    """
+    metrics = records['metrics']
+    candidates = np.flatnonzero(records['simulated'] & (metrics[:, 1] >= min_service_level))
+    if len(candidates) == 0:
+        return None
+    best = candidates[np.argmin(metrics[candidates, 0])]
+    return (records['policies'][best].tolist(), *metrics[best].tolist())
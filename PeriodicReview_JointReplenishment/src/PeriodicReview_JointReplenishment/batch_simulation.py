@@ -0,0 +1,207 @@
+import numpy as np
+from src.PeriodicReview_JointReplenishment.simulation import format_demand_distribution
+from src.PeriodicReview_JointReplenishment.scenarios import demand_history, sample_demand
+
+def policies_to_array(population):
+    """
+    Convert a population of policy combinations into an integer array.
+
+    Parameters:
+        population (list or numpy.ndarray): List of policy combinations, each a list of [r, s, S] per item.
+
+    Returns:
+        numpy.ndarray: 3D array of shape (pop_size, num_items, 3).
+    """
+    policies = np.asarray(population, dtype=np.int64)
+    if policies.ndim == 2:
+        policies = policies[np.newaxis]  # A single policy combination
+    if policies.ndim != 3 or policies.shape[2] != 3:
+        raise ValueError(f"population must have shape (pop_size, num_items, 3), got {policies.shape}")
+    return policies
+
+class BatchSimulation:
+    """
+    State of a population simulation that can be advanced period by period.
+
+    The inventory bookkeeping is identical to simulate_policy, but each period advances all
+    candidates and items together with array operations. With scenarios, every candidate is
+    simulated once per scenario, so each row of the state is a (candidate, scenario) pair.
+    """
+
+    def __init__(self, demand_distribution, population, setup, rng=None, scenarios=None):
+        """
+        Parameters:
+            demand_distribution (numpy.ndarray or list): Empirical demand distribution for items.
+            population (list or numpy.ndarray): Policy combinations, shape (pop_size, num_items, 3).
+            setup (dict): Dictionary containing setup parameters.
+            rng (numpy.random.Generator, optional): Random generator used to sample demand. Defaults to None.
+            scenarios (tuple, optional): Common demand scenarios from generate_scenarios, shared by every
+                candidate. Defaults to None.
+        """
+        self.setup = setup
+        num_items = setup['num_items']
+        lead_time = setup['lead_time']
+        self.pallet_volume = np.asarray(setup['pallet_volume'][:num_items], dtype=np.float64)
+
+        policies = policies_to_array(population)
+        self.pop_size = policies.shape[0]
+        self.scenarios = scenarios
+
+        if scenarios is None:
+            self.rng = rng if rng is not None else np.random.default_rng()
+            self.history, self.history_lengths = demand_history(format_demand_distribution(demand_distribution), num_items)
+            self.num_replications = 1
+            self.replication = np.zeros(self.pop_size, dtype=np.int64)
+            initial_inventory = sample_demand(self.history, self.history_lengths, self.rng, (self.pop_size, 2 * lead_time)).sum(axis=1)
+        else:
+            # Replicate the population so row k is candidate k // num_replications on scenario k % num_replications
+            scenario_inventory, _ = scenarios
+            self.num_replications = len(scenario_inventory)
+            policies = np.repeat(policies, self.num_replications, axis=0)
+            self.replication = np.tile(np.arange(self.num_replications), self.pop_size)
+            initial_inventory = scenario_inventory[self.replication]
+
+        self.candidate = np.repeat(np.arange(self.pop_size), self.num_replications)
+        self.r = policies[:, :num_items, 0]
+        self.s = policies[:, :num_items, 1]
+        self.S = policies[:, :num_items, 2]
+
+        # Initialize inventory for each candidate and item
+        self.inventory_level = initial_inventory.astype(np.float64)
+        self.inventory_position = self.inventory_level.copy()
+
+        # Pipeline inventory as a ring buffer indexed by period, so no np.roll is needed
+        num_rows = len(self.candidate)
+        self.pipeline_inventory = np.zeros((num_rows, lead_time, num_items))
+
+        self.total_cost = np.zeros(num_rows)
+        self.total_demand = np.zeros(num_rows)
+        self.total_demand_met = np.zeros(num_rows)
+        self.total_containers = np.zeros(num_rows)
+        self.total_orders = np.zeros(num_rows)
+        self.container_fill_rate = np.zeros(num_rows)
+        self.period = 0
+
+    def keep(self, rows):
+        """
+        Drop all rows except the selected ones from the simulation.
+
+        Parameters:
+            rows (numpy.ndarray): Boolean mask or indices of the rows to keep.
+        """
+        for name in ['candidate', 'replication', 'r', 's', 'S', 'inventory_level', 'inventory_position', 'pipeline_inventory',
+                     'total_cost', 'total_demand', 'total_demand_met', 'total_containers', 'total_orders', 'container_fill_rate']:
+            setattr(self, name, getattr(self, name)[rows])
+
+    def advance(self, num_periods):
+        """
+        Simulate the next periods for every row.
+
+        Parameters:
+            num_periods (int): Number of periods to simulate.
+        """
+        holding_cost = self.setup['holding_cost']
+        backorder_cost = self.setup['backorder_cost']
+        order_cost = self.setup['order_cost']
+        lead_time = self.setup['lead_time']
+        container_volume = self.setup['container_volume']
+        warm_up = self.setup['warm_up']
+        num_rows = len(self.candidate)
+
+        for period in range(self.period, self.period + num_periods):
+            counting = period >= warm_up  # Do not count costs in warm-up!
+            j = period - warm_up if counting else period
+            arrival_slot = period % lead_time
+            order_slot = (period + lead_time - 1) % lead_time
+
+            if self.scenarios is None:
+                demand = sample_demand(self.history, self.history_lengths, self.rng, (num_rows,))
+            else:
+                demand = self.scenarios[1][self.replication, :, period]
+            self.inventory_position -= demand
+            self.inventory_level -= self.pipeline_inventory[:, arrival_slot] - demand
+
+            if counting:
+                self.total_demand += demand.sum(axis=1)
+                short = self.inventory_level < demand
+                self.total_demand_met += np.where(short, np.maximum(self.inventory_level, 0), demand).sum(axis=1)
+                self.total_cost += np.where(short, demand - self.inventory_level, 0).sum(axis=1) * backorder_cost
+
+            # Review inventory when in a review period
+            reorder = (j % self.r == 0) & (self.inventory_position <= self.s)
+            order_quantity = np.where(reorder, self.S - self.inventory_position, 0)
+            self.inventory_position += order_quantity
+            self.pipeline_inventory[:, order_slot] += order_quantity
+
+            if counting:
+                # Add holding costs
+                self.total_cost += np.where(self.inventory_level > 1, self.inventory_level, 0).sum(axis=1) * holding_cost
+
+                # Add ordering costs for rows that placed an order this period
+                ordered = np.any(self.pipeline_inventory[:, order_slot] != 0, axis=1)
+                total_volume = self.pipeline_inventory[:, order_slot] @ self.pallet_volume
+                containers = np.where(ordered, np.ceil(total_volume / container_volume), 0)
+                self.total_cost += containers * order_cost
+
+                # Update container fill rate, total container and order counter metrics
+                self.total_orders += ordered
+                self.total_containers += containers
+                self.container_fill_rate += np.divide(total_volume, container_volume * containers,
+                                                      out=np.zeros(num_rows), where=containers > 0)
+
+            # Update pipeline inventory
+            self.pipeline_inventory[:, arrival_slot] = 0
+
+        self.period += num_periods
+
+    def metrics(self):
+        """
+        Calculate the metrics of every row over the periods simulated so far (excluding warm-up).
+
+        Returns:
+            numpy.ndarray: 2D array with one row of five metrics per simulation row.
+        """
+        num_rows = len(self.candidate)
+        num_samples = max(1, self.period - self.setup['warm_up'])
+        has_orders = self.total_orders > 0
+        service_level = np.divide(100 * self.total_demand_met, self.total_demand, out=np.ones(num_rows), where=self.total_demand > 0)
+        containers_per_order = np.divide(self.total_containers, self.total_orders, out=np.zeros(num_rows), where=has_orders)
+        container_fill_rate = np.divide(self.container_fill_rate, self.total_containers, out=np.zeros(num_rows), where=has_orders)
+        periodicity = self.total_orders / num_samples
+        total_cost = self.total_cost / num_samples
+
+        return np.column_stack((total_cost, service_level, container_fill_rate, periodicity, containers_per_order))
+
+    def candidate_metrics(self):
+        """
+        Calculate the metrics of every candidate still simulated, averaged over its scenarios.
+
+        Returns:
+            tuple: (1D array of candidate indices, 2D array with one row of five metrics per candidate)
+        """
+        candidates = np.unique(self.candidate)
+        metrics = self.metrics().reshape(len(candidates), self.num_replications, 5).mean(axis=1)
+        return candidates, metrics
+
+def simulate_population(demand_distribution, population, setup, rng=None, scenarios=None):
+    """
+    Simulate every policy combination in the population at once.
+
+    Without scenarios, every candidate samples its own demand path, as it would in separate
+    simulate_policy calls.
+
+    Parameters:
+        demand_distribution (numpy.ndarray or list): Empirical demand distribution for items.
+        population (list or numpy.ndarray): Policy combinations, shape (pop_size, num_items, 3).
+        setup (dict): Dictionary containing setup parameters.
+        rng (numpy.random.Generator, optional): Random generator used to sample demand. Defaults to None.
+        scenarios (tuple, optional): Common demand scenarios from generate_scenarios, shared by every
+            candidate. Metrics are averaged over the scenarios. Defaults to None.
+
+    Returns:
+        numpy.ndarray: 2D array of shape (pop_size, 5) holding the average total cost per sample,
+            service level, container fill rate, periodicity and containers per order of each candidate.
+    """
+    simulation = BatchSimulation(demand_distribution, population, setup, rng, scenarios)
+    simulation.advance(setup['warm_up'] + setup['num_samples'])
+    return simulation.candidate_metrics()[1]
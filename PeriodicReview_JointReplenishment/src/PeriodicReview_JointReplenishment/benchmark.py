@@ -0,0 +1,270 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import numpy as np
+
+# Add the project root directory to the Python path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(PROJECT_ROOT)
+
+from src.PeriodicReview_JointReplenishment.demand import synthetic_intermittent_demand
+from src.PeriodicReview_JointReplenishment.simulation import simulate_policy
+from src.PeriodicReview_JointReplenishment.evaluator import PopulationEvaluator
+from src.PeriodicReview_JointReplenishment.worker import startup_probe
+from src.PeriodicReview_JointReplenishment.genetic_algorithm import initialize_population, evaluate_fitness, genetic_algorithm, generation_size
+
+# Base setup of the benchmark problems; the grid parameters and command line overrides replace these values
+BASE_SETUP = {
+    'num_samples': 1040,
+    'warm_up': 0,
+    'pop_size': 100,
+    'num_generations': 1,
+    'mutation_rate': 0.2,
+    'decay_rate': 1,
+    'parent_fraction': 0.1,
+    'num_items': 4,
+    'r': 4,
+    'max_s': 20,
+    'max_S': 25,
+    'container_volume': 65,
+    'holding_cost': 1.9,
+    'backorder_cost': 100.0,
+    'order_cost': 5000.0,
+    'lead_time': 20,
+    'plot': False
+}
+
+def peak_rss():
+    """
+    Peak resident set size of this process and of its finished child processes.
+
+    The peak is taken over the lifetime of the process, so within one benchmark run it only grows:
+    it is the largest footprint of this case and every case measured before it.
+
+    Returns:
+        dict: Peak RSS in MiB for 'self' and 'children', or None where the platform does not report it.
+    """
+    try:
+        import resource
+    except ImportError:
+        return {'self': None, 'children': None}  # Not available on Windows
+
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    scale = 1 / 1024 ** 2 if sys.platform == 'darwin' else 1 / 1024
+    return {'self': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+            'children': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale}
+
+def time_call(function, repeats):
+    """
+    Time a function, keeping the fastest of several repeats.
+
+    Parameters:
+        function (callable): Function to time, called without arguments.
+        repeats (int): Number of times to call the function.
+
+    Returns:
+        float: Fastest wall time in seconds.
+    """
+    best_time = float('inf')
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        function()
+        best_time = min(best_time, time.perf_counter() - start_time)
+    return best_time
+
+def benchmark_case(setup, demand_distribution, population, repeats):
+    """
+    Measure simulate_policy, evaluate_fitness and a full genetic_algorithm run on one problem.
+
+    The evaluations share one PopulationEvaluator, so the pool is started and the demand is shared
+    once per case, outside the timed calls. Throughput of the genetic algorithm is counted over the
+    policy combinations of all its generations.
+
+    Parameters:
+        setup (dict): Dictionary containing setup parameters.
+        demand_distribution (numpy.ndarray): Empirical demand distribution for items.
+        population (list): Population used for the evaluate_fitness measurement.
+        repeats (int): Number of repeats per measurement.
+
+    Returns:
+        list: A list of result dictionaries, one per measurement.
+    """
+    periods_items = (setup['warm_up'] + setup['num_samples']) * setup['num_items']
+    results = []
+
+    def record(name, seconds, evaluations):
+        results.append({
+            'benchmark': name,
+            'seconds': seconds,
+            'evaluations_per_second': evaluations / seconds,
+            'period_items_per_second': evaluations * periods_items / seconds,
+            'cumulative_peak_rss_mib': peak_rss()
+        })
+
+    rng = np.random.default_rng(0)
+    record('simulate_policy', time_call(lambda: simulate_policy(demand_distribution, population[0], setup, rng=rng), repeats), 1)
+
+    ga_evaluations = sum(generation_size(setup['pop_size'], generation, setup)[0] for generation in range(setup['num_generations']))
+    with PopulationEvaluator(demand_distribution, setup) as evaluator:
+        record('evaluate_fitness', time_call(lambda: evaluate_fitness(population, demand_distribution, setup, evaluator=evaluator), repeats),
+               len(population))
+        record('genetic_algorithm', time_call(lambda: genetic_algorithm(demand_distribution, setup, callbacks=[], evaluator=evaluator), repeats),
+               ga_evaluations)
+
+    return results
+
+# Run in a fresh interpreter: import the command line program as main.py does, then evaluate one policy on a new pool
+CLI_STARTUP = """
+import sys, json, time
+setup = json.loads(sys.argv[1])
+import src.PeriodicReview_JointReplenishment.main
+from src.PeriodicReview_JointReplenishment.demand import synthetic_intermittent_demand
+from src.PeriodicReview_JointReplenishment.genetic_algorithm import genetic_algorithm
+from src.PeriodicReview_JointReplenishment.evaluator import PopulationEvaluator
+import numpy as np
+imported_at = time.time()
+demand_distribution = synthetic_intermittent_demand(setup['num_items'], 156, np.random.default_rng(1))
+with PopulationEvaluator(demand_distribution, setup) as evaluator:
+    evaluator.evaluate([[[setup['r'], 1, 2]] * setup['num_items']])
+    evaluated_at = time.time()
+print(json.dumps({'imported_at': imported_at, 'evaluated_at': evaluated_at, 'modules': len(sys.modules),
+                  'matplotlib': 'matplotlib' in sys.modules, 'pandas': 'pandas' in sys.modules}))
+"""
+
+def cli_startup(setup):
+    """
+    Measure the latency from interpreter start to the first evaluation of the command line program.
+
+    Parameters:
+        setup (dict): Dictionary containing setup parameters, e.g. 'max_workers' and 'start_method'.
+
+    Returns:
+        dict: Seconds until the modules are imported and until the first evaluation, the number of
+              imported modules, and whether matplotlib or pandas were imported.
+    """
+    start_time = time.time()
+    output = subprocess.run([sys.executable, '-c', CLI_STARTUP, json.dumps(setup)], cwd=PROJECT_ROOT,
+                            capture_output=True, text=True, check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    return {
+        'import_seconds': result['imported_at'] - start_time,
+        'first_evaluation_seconds': result['evaluated_at'] - start_time,
+        'modules': result['modules'],
+        'matplotlib': result['matplotlib'],
+        'pandas': result['pandas']
+    }
+
+def worker_startup(setup, demand_distribution):
+    """
+    Measure how long each pool worker takes from the pool start until it runs its first task.
+
+    Every worker gets a probe that keeps it busy briefly, so the pool starts all of its workers.
+
+    Parameters:
+        setup (dict): Dictionary containing setup parameters, e.g. 'max_workers' and 'start_method'.
+        demand_distribution (numpy.ndarray): Empirical demand distribution for items.
+
+    Returns:
+        list: One dictionary per worker with its startup latency in seconds, its number of imported
+              modules and the heavy packages it imported.
+    """
+    num_workers = max(1, setup.get('max_workers') or os.cpu_count())
+    start_time = time.time()
+    with PopulationEvaluator(demand_distribution, dict(setup, max_workers=num_workers)) as evaluator:
+        probes = [future.result() for future in [evaluator.executor.submit(startup_probe, 0.2) for _ in range(num_workers)]]
+
+    first_probes = {}
+    for probe in probes:
+        if probe['worker'] not in first_probes or probe['started_at'] < first_probes[probe['worker']]['started_at']:
+            first_probes[probe['worker']] = probe
+    return [{'startup_seconds': probe['started_at'] - start_time, 'modules': probe['modules'], 'heavy_modules': probe['heavy_modules']}
+            for probe in sorted(first_probes.values(), key=lambda probe: probe['started_at'])]
+
+def run_startup_benchmarks(start_methods, overrides, output_path):
+    """
+    Measure the command line and worker startup latency for each start method and append the results to a JSON lines file.
+
+    Parameters:
+        start_methods (list): Start methods to measure, e.g. ['fork', 'spawn'].
+        overrides (dict): Setup parameters applied to every case, e.g. {'max_workers': 4}.
+        output_path (str): JSON lines file the results are appended to.
+    """
+    demand_distribution = synthetic_intermittent_demand(BASE_SETUP['num_items'], 156, np.random.default_rng(1))
+    with open(output_path, 'a') as file:
+        for start_method in start_methods:
+            setup = dict(BASE_SETUP, start_method=start_method, **overrides)
+            setup['pallet_volume'] = [1.0 + 0.1 * (i % 5) for i in range(setup['num_items'])]
+
+            cli = cli_startup(setup)
+            workers = worker_startup(setup, demand_distribution)
+            for result in [dict(benchmark='cli_startup', **cli), dict(benchmark='worker_startup', workers=workers)]:
+                result.update(start_method=start_method, setup=overrides, timestamp=time.strftime('%Y-%m-%dT%H:%M:%S'))
+                file.write(json.dumps(result) + '\n')
+
+            latencies = ', '.join(f"{worker['startup_seconds']:.3f}" for worker in workers)
+            print(f"{start_method:>10}: first evaluation after {cli['first_evaluation_seconds']:.3f} s "
+                  f"(imports {cli['import_seconds']:.3f} s), workers started after {latencies} s")
+
+def run_benchmarks(grid, overrides, repeats, output_path):
+    """
+    Run the benchmarks over every combination of the grid and append the results to a JSON lines file.
+
+    Parameters:
+        grid (dict): Lists of values for 'num_items', 'num_samples', 'lead_time' and 'pop_size'.
+        overrides (dict): Setup parameters applied to every case, e.g. {'evaluation_mode': 'batch'}.
+        repeats (int): Number of repeats per measurement.
+        output_path (str): JSON lines file the results are appended to.
+    """
+    environment = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+    keys = list(grid)
+    with open(output_path, 'a') as file:
+        for values in itertools.product(*(grid[key] for key in keys)):
+            setup = dict(BASE_SETUP, **dict(zip(keys, values)), **overrides)
+            setup['pallet_volume'] = [1.0 + 0.1 * (i % 5) for i in range(setup['num_items'])]
+
+            # Synthetic intermittent demand with three years of weekly history
+            demand_distribution = synthetic_intermittent_demand(setup['num_items'], 156, np.random.default_rng(1))
+            population = initialize_population(setup['pop_size'], setup['num_items'], setup)
+
+            for result in benchmark_case(setup, demand_distribution, population, repeats):
+                result.update({key: setup[key] for key in keys})
+                result['setup'] = overrides
+                result['environment'] = environment
+                file.write(json.dumps(result) + '\n')
+                print(f"{result['benchmark']:>16} {dict(zip(keys, values))}: {result['evaluations_per_second']:.1f} evaluations/s, "
+                      f"{result['period_items_per_second']:.3g} period-items/s")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark simulation and genetic algorithm throughput.')
+    parser.add_argument('--num-items', type=int, nargs='+', default=[4, 50])
+    parser.add_argument('--num-samples', type=int, nargs='+', default=[260, 1040])
+    parser.add_argument('--lead-time', type=int, nargs='+', default=[20])
+    parser.add_argument('--pop-size', type=int, nargs='+', default=[100])
+    parser.add_argument('--set', type=json.loads, default={}, help='JSON object of setup overrides, e.g. \'{"evaluation_mode": "batch"}\'')
+    parser.add_argument('--repeats', type=int, default=1)
+    parser.add_argument('--output', default='benchmark_results.jsonl')
+    parser.add_argument('--startup', action='store_true', help='Measure startup latency instead of throughput')
+    parser.add_argument('--start-method', nargs='+', default=['fork', 'spawn'], help='Start methods measured with --startup')
+    args = parser.parse_args()
+
+    if args.startup:
+        run_startup_benchmarks(args.start_method, args.set, args.output)
+        return
+
+    grid = {'num_items': args.num_items, 'num_samples': args.num_samples, 'lead_time': args.lead_time, 'pop_size': args.pop_size}
+    run_benchmarks(grid, args.set, args.repeats, args.output)
+
+if __name__ == "__main__":
+    main()
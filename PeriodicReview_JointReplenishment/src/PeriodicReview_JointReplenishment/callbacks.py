@@ -0,0 +1,40 @@
+import sys
+
+# Per-generation callbacks are called with a progress dictionary holding:
+#     'generation' (int): Number of completed generations.
+#     'num_generations' (int): Total number of generations.
+#     'cost_progression' (list): Best cost of each completed generation.
+#     'service_level_progression' (list): Service level of the best policy of each completed generation.
+#     'best_policy' (tuple): Best policy combination of the generation, with its metrics.
+#     'generation_time' (float): Wall time of the generation in seconds.
+#     'cache_hits', 'cache_lookups' (int or None): Fitness cache counters of the generation, None without a cache.
+# A callback may also define close(), which is called once after the last generation.
+
+class ProgressBar:
+    """
+    Write a single-line progress bar to the console.
+    """
+
+    def __init__(self, stream=None):
+        """
+        Parameters:
+            stream (file, optional): Stream to write to. Defaults to sys.stdout.
+        """
+        self.stream = stream if stream is not None else sys.stdout
+
+    def __call__(self, progress):
+        generation = progress['generation']
+        num_generations = progress['num_generations']
+        percentage = generation / num_generations * 100
+
+        cache_status = ''
+        if progress['cache_lookups'] is not None:
+            cache_status = f" - Cache hits: {progress['cache_hits']}/{progress['cache_lookups']}"
+
+        self.stream.write(f"\rGeneration {generation}/{num_generations} - Progress: {percentage:.2f}% - "
+                          f"Last generation evaluation time: {progress['generation_time']:.2f} seconds{cache_status}     ")
+        self.stream.flush()
+
+    def close(self):
+        self.stream.write('\n')  # Move to the next line after the progress bar is done
+        self.stream.flush()
@@ -0,0 +1,96 @@
+import os
+import json
+import numpy as np
+
+# Version of the checkpoint layout; checkpoints of another version are rejected
+CHECKPOINT_VERSION = 1
+
+def save_checkpoint(path, generation, population, scored_population, scored_metrics, cost_progression, service_level_progression,
+                    seed_sequence, rng, problem, cache=None, archive_records=None):
+    """
+    Write the state of a genetic algorithm run to a compressed .npz file.
+
+    The file is written next to its destination and then renamed over it, so an interruption
+    during the write leaves the previous checkpoint intact.
+
+    Parameters:
+        path (str): Checkpoint file.
+        generation (int): Number of completed generations.
+        population (numpy.ndarray): Population of the next generation, of shape (pop_size, num_items, 3).
+        scored_population (numpy.ndarray): Last evaluated population.
+        scored_metrics (numpy.ndarray): Metrics of the last evaluated population, of shape (pop_size, 5).
+        cost_progression (list): Best cost of each completed generation.
+        service_level_progression (list): Service level of the best policy of each completed generation.
+        seed_sequence (numpy.random.SeedSequence): Root seed sequence of the run.
+        rng (numpy.random.Generator): Random generator of the GA operators.
+        problem (str): Hash of the demand data and setup, from setup_hash.
+        cache (FitnessCache, optional): Fitness cache whose in-memory entries are saved. Defaults to None.
+        archive_records (int, optional): Number of records in the evaluation archive at this checkpoint. Defaults to None.
+    """
+    metadata = {
+        'checkpoint_version': CHECKPOINT_VERSION,
+        'generation': generation,
+        'problem': problem,
+        # Entropy can exceed 64 bits, so it is kept as a string
+        'entropy': str(seed_sequence.entropy),
+        'n_children_spawned': seed_sequence.n_children_spawned,
+        'rng_state': rng.bit_generator.state,
+        'archive_records': archive_records
+    }
+
+    cache_keys = list(cache.entries) if cache is not None else []
+    arrays = {
+        'metadata': np.frombuffer(json.dumps(metadata).encode(), dtype=np.uint8),
+        'population': np.asarray(population, dtype=np.int64),
+        'scored_population': np.asarray(scored_population, dtype=np.int64),
+        'scored_metrics': np.asarray(scored_metrics, dtype=np.float64).reshape(-1, 5),
+        'cost_progression': np.array(cost_progression, dtype=np.float64),
+        'service_level_progression': np.array(service_level_progression, dtype=np.float64),
+        'cache_keys': np.array(cache_keys, dtype='S40'),
+        'cache_metrics': np.array([cache.entries[key] for key in cache_keys], dtype=np.float64).reshape(-1, 5)
+    }
+
+    temporary_path = f'{path}.{os.getpid()}.tmp'
+    with open(temporary_path, 'wb') as file:
+        np.savez_compressed(file, **arrays)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary_path, path)
+
+def load_checkpoint(path, problem):
+    """
+    Read a checkpoint written by save_checkpoint.
+
+    Parameters:
+        path (str): Checkpoint file.
+        problem (str): Hash of the demand data and setup of the run being resumed, from setup_hash.
+
+    Returns:
+        dict: 'generation', 'population', 'scored_population', 'scored_metrics', 'cost_progression',
+              'service_level_progression', 'seed_sequence', 'rng', 'cache_entries' (list of (key, metrics)
+              in least recently used order) and 'archive_records' (None when the run had no archive).
+    """
+    with np.load(path, allow_pickle=False) as checkpoint:
+        arrays = {name: checkpoint[name] for name in checkpoint.files}
+
+    metadata = json.loads(arrays['metadata'].tobytes().decode())
+    if metadata['checkpoint_version'] != CHECKPOINT_VERSION:
+        raise ValueError(f"Checkpoint version {metadata['checkpoint_version']} is not supported")
+    if metadata['problem'] != problem:
+        raise ValueError("Checkpoint was written for different demand data or simulation parameters")
+
+    rng = np.random.default_rng()
+    rng.bit_generator.state = metadata['rng_state']
+
+    return {
+        'generation': metadata['generation'],
+        'population': arrays['population'],
+        'scored_population': arrays['scored_population'],
+        'scored_metrics': arrays['scored_metrics'],
+        'cost_progression': arrays['cost_progression'].tolist(),
+        'service_level_progression': arrays['service_level_progression'].tolist(),
+        'seed_sequence': np.random.SeedSequence(int(metadata['entropy']), n_children_spawned=metadata['n_children_spawned']),
+        'rng': rng,
+        'cache_entries': list(zip(arrays['cache_keys'].astype(str).tolist(), map(tuple, arrays['cache_metrics'].tolist()))),
+        'archive_records': metadata.get('archive_records')
+    }
@@ -1,29 +1,195 @@
-import pandas as pd
+import json
+import os
+import hashlib
 import numpy as np
 
-def load_historic_demand(file_path):
+def compact_dtype(demand_data):
+    """
+    Find the smallest integer dtype that holds all values of the demand data.
+    
+    Parameters:
+        demand_data (numpy.ndarray): 2D array of demand data.
+    
+    Returns:
+        numpy.dtype: The smallest fitting integer dtype.
+    """
+    if demand_data.size == 0:
+        return np.dtype(np.uint8)
+    return np.promote_types(np.min_scalar_type(demand_data.min()), np.min_scalar_type(demand_data.max()))
+
+def parse_demand_csv(file_path):
+    """
+    Parse semicolon-delimited demand data, one item per row and one period per column.
+    
+    Parameters:
+        file_path (str): Path to the CSV file containing demand data.
+    
+    Returns:
+        numpy.ndarray: 2D array of demand data in the smallest fitting integer dtype.
+    """
+    # Parse all values in one pass straight into an integer array
+    demand_data = np.loadtxt(file_path, delimiter=';', dtype=np.int64, ndmin=2)
+    return demand_data.astype(compact_dtype(demand_data))
+
+def source_signature(file_path):
+    """
+    Describe the state of a source file, to detect when a cache of it is stale.
+    
+    Parameters:
+        file_path (str): Path to the source file.
+    
+    Returns:
+        dict: Size and modification time of the file.
+    """
+    stat = os.stat(file_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+def read_rows(file_path):
+    """
+    Read the non-empty rows of a demand CSV file as text.
+    
+    Parameters:
+        file_path (str): Path to the CSV file containing demand data.
+    
+    Returns:
+        list: One string per item, without the line ending.
+    """
+    with open(file_path, 'r') as file:
+        return [line.strip() for line in file if line.strip()]
+
+def prefix_digest(rows, prefix_lengths=None):
+    """
+    Digest of the leading text of every row, to detect whether a file only gained columns.
+    
+    The rows are hashed as text up to a character offset, so no field is split in Python.
+    
+    Parameters:
+        rows (list): Rows of the CSV file, from read_rows.
+        prefix_lengths (list, optional): Number of characters of each row covered by the digest. Defaults to the whole rows.
+    
+    Returns:
+        str: Hex digest of the text of the rows.
+    """
+    digest = hashlib.sha1()
+    for k, row in enumerate(rows):
+        digest.update((row if prefix_lengths is None else row[:prefix_lengths[k]]).encode())
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+def append_new_columns(rows, demand_data, digest, prefix_lengths):
+    """
+    Extend cached demand data with the periods appended to the rows of the CSV since it was cached.
+    
+    Only the new columns are parsed. The cached columns are checked against the digest of their text,
+    so a file that was edited rather than extended is not patched.
+    
+    Parameters:
+        rows (list): Rows of the current CSV file, from read_rows.
+        demand_data (numpy.ndarray): Cached 2D array of demand data.
+        digest (str): Digest of the cached rows, from prefix_digest.
+        prefix_lengths (list): Length of each row when it was cached.
+    
+    Returns:
+        numpy.ndarray or None: The extended demand data, or None when the file must be parsed again.
+    """
+    num_items = demand_data.shape[0]
+    if len(rows) != num_items or len(prefix_lengths) != num_items or prefix_digest(rows, prefix_lengths) != digest:
+        return None
+
+    # The periods appended to a row follow a delimiter right after its cached text
+    new_text = [row[length:] for row, length in zip(rows, prefix_lengths)]
+    extended = {text != '' for text in new_text}
+    if extended == {False}:
+        return np.array(demand_data)  # The file was saved again without new periods
+    if extended != {True} or not all(text.startswith(';') for text in new_text):
+        return None
+
+    try:
+        new_columns = np.loadtxt([text[1:] for text in new_text], delimiter=';', dtype=np.int64, ndmin=2)
+    except ValueError:
+        return None  # Rows gained different numbers of periods
+    dtype = np.promote_types(demand_data.dtype, compact_dtype(new_columns))
+    return np.concatenate([demand_data, new_columns], axis=1).astype(dtype)
+
+def load_historic_demand(file_path, use_cache=True):
     """
     Load historic demand data from a CSV file and convert it to a numpy array.
     
+    The parsed data is written to a sidecar .npy file next to the CSV. Later loads memory-map
+    that file instead of parsing the CSV again, until the CSV changes. When new periods were
+    appended to the rows, e.g. for a weekly re-plan, only the new columns are parsed and added
+    to the cache.
+    
     Parameters:
         file_path (str): Path to the CSV file containing demand data.
+        use_cache (bool, optional): Read and write the sidecar cache. Defaults to True.
     
     Returns:
         numpy.ndarray: 2D array of demand data.
     """
-    # Load the demand data as a DataFrame
-    demand_df = pd.read_csv(file_path, header=None)
+    if not use_cache:
+        return parse_demand_csv(file_path)
+
+    cache_path = file_path + '.npy'
+    signature_path = cache_path + '.json'
+    signature = source_signature(file_path)
+
+    # Memory-map the cache when it was written from the current version of the CSV
+    cached_signature = None
+    try:
+        with open(signature_path, 'r') as file:
+            cached_signature = json.load(file)
+        if {key: cached_signature.get(key) for key in signature} == signature:
+            return np.load(cache_path, mmap_mode='r')
+    except (OSError, ValueError):
+        pass
+
+    rows = read_rows(file_path)
+    demand_data = None
+    if cached_signature is not None and 'digest' in cached_signature and 'prefix_lengths' in cached_signature:
+        try:
+            demand_data = append_new_columns(rows, np.load(cache_path, mmap_mode='r'), cached_signature['digest'],
+                                             cached_signature['prefix_lengths'])
+        except (OSError, ValueError):
+            pass
+    if demand_data is None:
+        demand_data = parse_demand_csv(file_path)
+    # The data now covers the whole of every row, which the next load compares its rows against
+    signature.update(digest=prefix_digest(rows), prefix_lengths=[len(row) for row in rows])
+
+    # Write the cache atomically, so an interrupted run never leaves a truncated file behind
+    try:
+        np.save(cache_path + '.tmp.npy', demand_data)
+        os.replace(cache_path + '.tmp.npy', cache_path)
+        with open(signature_path + '.tmp', 'w') as file:
+            json.dump(signature, file)
+        os.replace(signature_path + '.tmp', signature_path)
+    except OSError:
+        return demand_data  # Read-only data directory; run without the cache
+
+    return np.load(cache_path, mmap_mode='r')
+
+def synthetic_intermittent_demand(num_items, num_periods, rng, demand_probability=0.3, mean_demand_size=2.0):
+    """
+    Generate intermittent demand data, e.g. for benchmarks and tests.
     
-    # Convert the DataFrame into a 2D numpy array, ensuring all values are numeric
-    demand_data = []
-    for row in demand_df.values:
-        # Convert semicolon-separated string into a list of integers
-        demand_data.append(list(map(int, row[0].split(';'))))
+    Demand occurs in a period with a fixed probability, and its size is drawn from a shifted Poisson
+    distribution, so periods with demand always have at least one unit.
     
-    # Convert to numpy array
-    demand_data = np.array(demand_data)
+    Parameters:
+        num_items (int): Number of items (rows).
+        num_periods (int): Number of periods (columns).
+        rng (numpy.random.Generator): Random generator used for sampling.
+        demand_probability (float, optional): Probability of demand in a period. Defaults to 0.3.
+        mean_demand_size (float, optional): Mean size of a non-zero demand. Defaults to 2.0.
     
-    return demand_data
+    Returns:
+        numpy.ndarray: 2D array of demand data in the smallest fitting integer dtype.
+    """
+    occurs = rng.random((num_items, num_periods)) < demand_probability
+    sizes = 1 + rng.poisson(max(0.0, mean_demand_size - 1), size=(num_items, num_periods))
+    demand_data = np.where(occurs, sizes, 0)
+    return demand_data.astype(compact_dtype(demand_data))
 
 def create_empirical_distribution(demand_data, setup):
     """
@@ -38,15 +204,9 @@ def create_empirical_distribution(demand_data, setup):
         numpy.ndarray: 2D array of empirical distributions for each item.
     """
     num_items = setup['num_items']
-    
-    empirical_distributions = []
-    for i in range(num_items):
 
-        if i >= demand_data.shape[0]:  # Check if i is within the bounds of the data
-            raise IndexError(f"Item index {i} is out of bounds for demand_data with shape {demand_data.shape}.")
+    if num_items > demand_data.shape[0]:  # Check if all items are within the bounds of the data
+        raise IndexError(f"Item index {demand_data.shape[0]} is out of bounds for demand_data with shape {demand_data.shape}.")
 
-        # Generate empirical distribution by randomly sampling from historical data
-        empirical_distribution = demand_data[i, :]
-        empirical_distributions.append(empirical_distribution)
-    
-    return np.array(empirical_distributions)
+    # Each item's empirical distribution is its row of historical data; slicing avoids copying the rows
+    return demand_data[:num_items]
@@ -0,0 +1,251 @@
+import os
+import time
+import pickle
+import concurrent.futures
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+from src.PeriodicReview_JointReplenishment.simulation import format_demand_distribution
+from src.PeriodicReview_JointReplenishment.worker import init_worker, evaluate_chunk, timed_evaluate_chunk
+
+def share_array(array, shared=None):
+    """
+    Copy an array into a shared memory block.
+
+    Parameters:
+        array (numpy.ndarray): Array to share.
+        shared (multiprocessing.shared_memory.SharedMemory, optional): Existing block to reuse when it is large enough. Defaults to None.
+
+    Returns:
+        tuple: (shared memory block, descriptor (name, shape, dtype) used to attach to it)
+    """
+    array = np.ascontiguousarray(array)
+    if shared is None or shared.size < array.nbytes:
+        if shared is not None:
+            shared.close()
+            shared.unlink()
+        shared = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shared.buf)[...] = array
+    return shared, (shared.name, array.shape, array.dtype.str)
+
+class PopulationEvaluator:
+    """
+    Evaluate populations on a worker pool that lives for a whole genetic algorithm run.
+
+    The demand data is placed in shared memory once, and each generation's scenarios are
+    copied into a reused shared block, so tasks only carry policies and seeds. Use it as a
+    context manager so the pool and the shared memory are released.
+    """
+
+    def __init__(self, demand_distribution, setup):
+        """
+        Parameters:
+            demand_distribution (numpy.ndarray or list): Empirical demand distribution for items.
+            setup (dict): Dictionary containing setup parameters:
+                - 'max_workers' (int, optional): Number of worker processes. 0 evaluates in the calling process. Defaults to the number of CPU cores.
+                - 'chunk_size' (int, optional): Number of policies per task. Defaults to spreading the population over four tasks per worker.
+                - 'start_method' (str, optional): How worker processes are started: 'fork', 'spawn' or 'forkserver'.
+                  Defaults to the platform default.
+        """
+        self.demand_distribution = np.asarray(format_demand_distribution(demand_distribution))
+        self.setup = setup
+        self.pool_setup = setup  # Setup the workers are started with
+        self.max_workers = setup.get('max_workers')
+        if self.max_workers is None:
+            self.max_workers = os.cpu_count()
+        self.chunk_size = setup.get('chunk_size')
+        self.executor = None
+        self.demand_block = None
+        self.scenario_blocks = [None, None]
+        self.scenario_version = 0
+        self.telemetry = None  # Telemetry recording the tasks, set by the caller
+        self.submitted_scenarios = None  # Scenarios shared for submit, with their descriptors
+
+    def __enter__(self):
+        if self.max_workers > 0:
+            self.demand_block, demand_descriptor = share_array(self.demand_distribution)
+            context = multiprocessing.get_context(self.setup.get('start_method'))
+            self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context,
+                                                                   initializer=init_worker, initargs=(demand_descriptor, self.setup))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Shut down the worker pool and release the shared memory.
+        """
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        for block in [self.demand_block] + self.scenario_blocks:
+            if block is not None:
+                block.close()
+                block.unlink()
+        self.demand_block = None
+        self.scenario_blocks = [None, None]
+        self.submitted_scenarios = None
+
+    def use_setup(self, setup):
+        """
+        Evaluate later populations with other simulation parameters, on the same pool and demand data.
+
+        While the setup differs from the one the pool was started with, it is sent along with every task.
+
+        Parameters:
+            setup (dict): Dictionary containing setup parameters.
+        """
+        self.setup = setup
+
+    def task_setup(self):
+        """
+        Setup sent with a task, or None when the workers already hold it.
+        """
+        return None if self.setup is self.pool_setup else self.setup
+
+    def share_scenarios(self, scenarios):
+        """
+        Copy the scenarios of a generation into shared memory, reusing the blocks of earlier generations.
+
+        Parameters:
+            scenarios (tuple): Scenarios from generate_scenarios.
+
+        Returns:
+            tuple: Descriptors of the shared initial inventory and demand arrays, followed by the scenario version.
+        """
+        self.submitted_scenarios = None  # The blocks are overwritten
+        descriptors = []
+        for k, array in enumerate(scenarios):
+            self.scenario_blocks[k], descriptor = share_array(array, self.scenario_blocks[k])
+            descriptors.append(descriptor)
+
+        # Tag the descriptors with a new version so workers reload the data even when a block is reused
+        self.scenario_version += 1
+        return tuple(descriptors) + (self.scenario_version,)
+
+    def evaluate(self, population, scenarios=None, seed_sequence=None):
+        """
+        Evaluate a population, returning the metrics in population order.
+
+        Parameters:
+            population (list): List of policy combinations.
+            scenarios (tuple, optional): Common demand scenarios every policy is evaluated against. Defaults to None.
+            seed_sequence (numpy.random.SeedSequence, optional): Seed for independent demand streams. Defaults to None.
+
+        Returns:
+            numpy.ndarray: 2D array of shape (pop_size, 5) with the metrics of each policy combination.
+        """
+        if seed_sequence is None:
+            seed_sequence = np.random.SeedSequence()
+
+        num_tasks = max(1, self.max_workers) * 4
+        chunk_size = self.chunk_size or max(1, -(-len(population) // num_tasks))
+        chunks = [population[start:start + chunk_size] for start in range(0, len(population), chunk_size)]
+
+        # One demand stream per chunk in batch mode, one per policy otherwise
+        batch = self.setup.get('evaluation_mode', 'process') == 'batch'
+        seeds = seed_sequence.spawn(len(chunks) if batch else len(population))
+        chunk_seeds = [seeds[k:k + 1] if batch else seeds[k * chunk_size:(k + 1) * chunk_size] for k in range(len(chunks))]
+
+        if self.telemetry is not None and self.telemetry.enabled:
+            return self.evaluate_timed(population, chunks, chunk_size, chunk_seeds, scenarios)
+
+        if self.executor is None:
+            results = [evaluate_chunk(chunk, scenarios, chunk_seeds[k], self.demand_distribution, self.setup)
+                       for k, chunk in enumerate(chunks)]
+            return np.concatenate(results) if results else np.zeros((0, 5))
+
+        scenario_descriptors = None
+        if scenarios is not None:
+            scenario_descriptors = self.share_scenarios(scenarios)
+
+        metrics = np.zeros((len(population), 5))
+        futures = {self.executor.submit(evaluate_chunk, chunk, scenario_descriptors, chunk_seeds[k], None, self.task_setup()): k
+                   for k, chunk in enumerate(chunks)}
+
+        # Collect results as they finish and map them back by chunk index
+        for future in concurrent.futures.as_completed(futures):
+            start = futures[future] * chunk_size
+            result = future.result()
+            metrics[start:start + len(result)] = result
+
+        return metrics
+
+    def submit(self, policies_chunk, scenarios=None, seed_sequence=None):
+        """
+        Start evaluating a chunk of policy combinations without waiting for the result.
+
+        The scenarios are shared once and reused while the same scenarios object is passed, so
+        they must not change while tasks are in flight.
+
+        Parameters:
+            policies_chunk (list or numpy.ndarray): Policy combinations to evaluate.
+            scenarios (tuple, optional): Common demand scenarios every policy is evaluated against. Defaults to None.
+            seed_sequence (numpy.random.SeedSequence, optional): Seed for independent demand streams. Defaults to None.
+
+        Returns:
+            concurrent.futures.Future: Resolves to a 2D array with one row of five metrics per policy combination.
+        """
+        if seed_sequence is None:
+            seed_sequence = np.random.SeedSequence()
+        batch = self.setup.get('evaluation_mode', 'process') == 'batch'
+        seeds = seed_sequence.spawn(1 if batch else len(policies_chunk))
+
+        if self.executor is None:
+            future = concurrent.futures.Future()
+            future.set_result(evaluate_chunk(policies_chunk, scenarios, seeds, self.demand_distribution, self.setup))
+            return future
+
+        scenario_descriptors = None
+        if scenarios is not None:
+            if self.submitted_scenarios is None or self.submitted_scenarios[0] is not scenarios:
+                self.submitted_scenarios = (scenarios, self.share_scenarios(scenarios))
+            scenario_descriptors = self.submitted_scenarios[1]
+
+        return self.executor.submit(evaluate_chunk, policies_chunk, scenario_descriptors, seeds, None, self.task_setup())
+
+    def evaluate_timed(self, population, chunks, chunk_size, chunk_seeds, scenarios):
+        """
+        Evaluate the chunks of a population like evaluate, recording every task with the telemetry.
+
+        Kept apart from evaluate so runs without telemetry do not pay for the timing and the payload measurements.
+
+        Returns:
+            numpy.ndarray: 2D array of shape (pop_size, 5) with the metrics of each policy combination.
+        """
+        telemetry = self.telemetry
+        metrics = np.zeros((len(population), 5))
+
+        if self.executor is None:
+            with telemetry.phase('simulation'):
+                for k, chunk in enumerate(chunks):
+                    result, stats = timed_evaluate_chunk(time.time(), telemetry.profile_workers, chunk, scenarios, chunk_seeds[k],
+                                                         self.demand_distribution, self.setup)
+                    stats.update(payload_bytes=0, collected_at=time.time())  # Nothing crosses a process boundary
+                    telemetry.record_task(stats)
+                    metrics[k * chunk_size:k * chunk_size + len(result)] = result
+            return metrics
+
+        with telemetry.phase('dispatch'):
+            scenario_descriptors = None
+            if scenarios is not None:
+                scenario_descriptors = self.share_scenarios(scenarios)
+
+            futures = {}
+            for k, chunk in enumerate(chunks):
+                payload_bytes = len(pickle.dumps((chunk, scenario_descriptors, chunk_seeds[k], self.task_setup())))
+                future = self.executor.submit(timed_evaluate_chunk, time.time(), telemetry.profile_workers,
+                                              chunk, scenario_descriptors, chunk_seeds[k], None, self.task_setup())
+                futures[future] = (k, payload_bytes)
+
+        # Waiting for and collecting the results; the workers' own timings are in the task statistics
+        with telemetry.phase('simulation'):
+            for future in concurrent.futures.as_completed(futures):
+                k, payload_bytes = futures[future]
+                result, stats = future.result()
+                stats.update(payload_bytes=payload_bytes, collected_at=time.time())
+                telemetry.record_task(stats)
+                metrics[k * chunk_size:k * chunk_size + len(result)] = result
+
+        return metrics
@@ -0,0 +1,189 @@
+import hashlib
+import json
+import sqlite3
+import warnings
+from collections import OrderedDict
+import numpy as np
+
+# Setup parameters that change the outcome of a simulation; GA parameters do not invalidate cached fitness
+SIMULATION_KEYS = ['holding_cost', 'backorder_cost', 'order_cost', 'num_items', 'lead_time', 'num_samples',
+                   'container_volume', 'pallet_volume', 'warm_up', 'num_replications']
+
+def setup_hash(demand_distribution, setup, keys=SIMULATION_KEYS):
+    """
+    Hash the demand data and the simulation parameters of the setup.
+
+    Parameters:
+        demand_distribution (numpy.ndarray): Empirical demand distribution for items.
+        setup (dict): Dictionary containing setup parameters.
+        keys (list, optional): Setup parameters that are hashed. Defaults to SIMULATION_KEYS.
+
+    Returns:
+        str: Hex digest identifying the simulation problem.
+    """
+    digest = hashlib.sha1()
+    digest.update(json.dumps({key: setup.get(key) for key in keys}, sort_keys=True).encode())
+    demand = np.ascontiguousarray(demand_distribution)
+    digest.update(str((demand.shape, demand.dtype.str)).encode())
+    digest.update(demand.tobytes())
+    return digest.hexdigest()
+
+def scenario_hash(scenarios, seed_sequence=None):
+    """
+    Hash the demand scenarios a population is evaluated against.
+
+    Parameters:
+        scenarios (tuple or None): Scenarios from generate_scenarios.
+        seed_sequence (numpy.random.SeedSequence, optional): Seed of the independent demand streams drawn when
+            there are no scenarios. Defaults to None.
+
+    Returns:
+        str: Hex digest of the scenarios or, when every candidate draws its own demand, of the seed of those draws;
+            'independent' when neither is given.
+    """
+    if scenarios is None:
+        if seed_sequence is None:
+            return 'independent'
+        return hashlib.sha1(repr((seed_sequence.entropy, seed_sequence.spawn_key)).encode()).hexdigest()
+    digest = hashlib.sha1()
+    for array in scenarios:
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()
+
+def warn_without_fixed_scenarios(setup):
+    """
+    Warn when a fitness cache is configured but the demand changes every generation.
+
+    Outside scenario_mode 'fixed' entries are keyed on the generation's scenarios or demand seed, so
+    the cache only removes duplicates within a generation and elites are simulated again every generation.
+
+    Parameters:
+        setup (dict): Dictionary containing setup parameters ('cache_size' and 'scenario_mode').
+    """
+    scenario_mode = setup.get('scenario_mode', 'independent')
+    if setup.get('cache_size', 0) > 0 and scenario_mode != 'fixed':
+        warnings.warn(f"With scenario_mode '{scenario_mode}' the fitness cache only reuses evaluations within a generation; "
+                      "set scenario_mode to 'fixed' to reuse elites across generations")
+
+def policy_key(policies):
+    """
+    Canonical, hashable form of a policy combination.
+
+    Parameters:
+        policies (list or numpy.ndarray): List of [r, s, S] per item.
+
+    Returns:
+        tuple: Tuple of (r, s, S) tuples of ints.
+    """
+    return tuple(tuple(int(value) for value in item) for item in policies)
+
+class FitnessCache:
+    """
+    Bounded LRU cache of simulated metrics keyed on the policy combination, the scenarios and the setup hash.
+
+    Metrics only hold for the demand they were simulated on. With scenario_mode 'fixed' they are reused for
+    the whole run; with 'generation' and 'independent' the key includes the generation's scenarios or demand
+    seed, so the cache only saves simulating duplicate policies within a generation, and a lucky draw of
+    one generation is never reused in the next.
+    When a path is given, entries are also written to a SQLite file, so later runs on the same problem can reuse them.
+    """
+
+    def __init__(self, max_size, problem, path=None):
+        """
+        Parameters:
+            max_size (int): Maximum number of entries kept in memory.
+            problem (str): Hash of the demand data and setup, from setup_hash.
+            path (str, optional): SQLite file used as a backing store. Defaults to None.
+        """
+        self.max_size = max_size
+        self.problem = problem
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.connection = None
+        if path is not None:
+            self.connection = sqlite3.connect(path)
+            self.connection.execute('CREATE TABLE IF NOT EXISTS fitness (key TEXT PRIMARY KEY, cost REAL, service_level REAL, '
+                                    'container_fill_rate REAL, periodicity REAL, containers_per_order REAL)')
+
+    def key(self, policies, scenarios_digest):
+        """
+        Parameters:
+            policies (list): Policy combination.
+            scenarios_digest (str): Hash of the scenarios or demand seed, from scenario_hash.
+
+        Returns:
+            str: Cache key of the policy combination for this problem and these scenarios.
+        """
+        return hashlib.sha1((self.problem + scenarios_digest + repr(policy_key(policies))).encode()).hexdigest()
+
+    def get(self, key):
+        """
+        Look up a key in memory, then in the backing store.
+
+        Parameters:
+            key (str): Cache key.
+
+        Returns:
+            tuple or None: The five cached metrics, or None on a miss.
+        """
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+
+        if self.connection is not None:
+            row = self.connection.execute('SELECT cost, service_level, container_fill_rate, periodicity, containers_per_order '
+                                          'FROM fitness WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                self.hits += 1
+                self.put(key, row, persist=False)
+                return row
+
+        self.misses += 1
+        return None
+
+    def put(self, key, metrics, persist=True):
+        """
+        Store the metrics of a policy combination, evicting the least recently used entry when full.
+
+        Parameters:
+            key (str): Cache key.
+            metrics (tuple): The five simulated metrics.
+            persist (bool, optional): Also write the entry to the backing store. Defaults to True.
+        """
+        self.entries[key] = tuple(metrics)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+        if persist and self.connection is not None:
+            self.connection.execute('INSERT OR REPLACE INTO fitness VALUES (?, ?, ?, ?, ?, ?)', (key, *metrics))
+
+    def commit(self):
+        """
+        Flush pending writes to the backing store.
+        """
+        if self.connection is not None:
+            self.connection.commit()
+
+    def take_counters(self):
+        """
+        Return the hit and miss counts since the last call and reset them.
+
+        Returns:
+            tuple: (hits, misses)
+        """
+        counters = (self.hits, self.misses)
+        self.hits = 0
+        self.misses = 0
+        return counters
+
+    def close(self):
+        """
+        Commit and close the backing store.
+        """
+        if self.connection is not None:
+            self.connection.commit()
+            self.connection.close()
+            self.connection = None
@@ -1,12 +1,42 @@
-import random
-import sys
+import os
 import time
-from src.PeriodicReview_JointReplenishment.simulation import simulate_policy
-from src.PeriodicReview_JointReplenishment.graph import static_plot, live_plot
-import matplotlib.pyplot as plt
-import concurrent.futures
+import contextlib
+import numpy as np
+from src.PeriodicReview_JointReplenishment.evaluator import PopulationEvaluator
+from src.PeriodicReview_JointReplenishment.batch_simulation import policies_to_array
+from src.PeriodicReview_JointReplenishment.fitness_cache import FitnessCache, setup_hash, scenario_hash, warn_without_fixed_scenarios
+from src.PeriodicReview_JointReplenishment.racing import race_population
+from src.PeriodicReview_JointReplenishment.scenarios import generate_scenarios, scenarios_for_generation
+from src.PeriodicReview_JointReplenishment.callbacks import ProgressBar
+from src.PeriodicReview_JointReplenishment.telemetry import Telemetry
+from src.PeriodicReview_JointReplenishment.checkpoint import save_checkpoint, load_checkpoint
+from src.PeriodicReview_JointReplenishment.surrogate import Surrogate, screen_offspring
+from src.PeriodicReview_JointReplenishment.analytical import analytical_evaluator
+from src.PeriodicReview_JointReplenishment.incremental import incremental_evaluator, polish_elites
+from src.PeriodicReview_JointReplenishment.archive import EvaluationArchive
+
+def initialize_population_array(pop_size, num_items, setup, rng):
+    """
+    Initialize a population of (r, s, S) policy combinations for all items as an integer array.
+
+    Parameters:
+        pop_size (int): Size of the population.
+        num_items (int): Number of items.
+        setup (dict): Dictionary containing setup parameters:
+            - 'r' (int): Review period for the policies.
+            - 'max_s' (int), 'max_S' (int): Upper bounds of the reorder point and the order-up-to level.
+        rng (numpy.random.Generator): Random generator of the genetic algorithm.
+
+    Returns:
+        numpy.ndarray: Array of shape (pop_size, num_items, 3) holding [r, s, S] per item.
+    """
+    population = np.empty((pop_size, num_items, 3), dtype=np.int64)
+    population[:, :, 0] = setup['r']
+    population[:, :, 1] = rng.integers(1, setup['max_s'] + 1, size=(pop_size, num_items))
+    population[:, :, 2] = rng.integers(population[:, :, 1] + 1, setup['max_S'] + 1)  # Ensure 's' is smaller than 'S'
+    return population
 
-def initialize_population(pop_size, num_items, setup):
+def initialize_population(pop_size, num_items, setup, rng=None):
     """
     Initialize a population of (r, s, S) policy combinations for all items.
     
@@ -15,90 +45,194 @@ def initialize_population(pop_size, num_items, setup):
         num_items (int): Number of items.
         setup (dict): Dictionary containing setup parameters:
             - 'review_period' (int): Review period for the policies.
+        rng (numpy.random.Generator, optional): Random generator. Defaults to a freshly seeded one.
     
     Returns:
         list: A list of policy combinations for the population.
     """
-    population = []
-
-    r = setup['r']
-    max_s = setup['max_s']
-    max_S = setup['max_S']
-
-    # Generate random population of (r, s, S) policy combinations for all items
-    for _ in range(pop_size):
-        policies = []
-        for _ in range(num_items):
-            s = random.randint(1, max_s)
-            S = random.randint(s + 1, max_S)  # Ensure 's' is smaller than 'S'
-            policies.append([r, s, S])
-        population.append(policies)
-    
-    return population
+    if rng is None:
+        rng = np.random.default_rng()
+    return initialize_population_array(pop_size, num_items, setup, rng).tolist()
 
 def sort_by_cost(fitness_tuple):
     return fitness_tuple[1]
 
-def evaluate_fitness(population, demand_distribution, setup):
+def evaluate_metrics(population, demand_distribution, setup, scenarios=None, seed_sequence=None, evaluator=None, num_parents=None):
     """
-    Evaluate the fitness of each policy combination in the population.
+    Simulate each policy combination in the population.
     
     Parameters:
-        population (list): List of policy combinations.
+        population (list or numpy.ndarray): Policy combinations.
         demand_distribution (numpy.ndarray): Empirical demand distribution for items.
         setup (dict): Dictionary containing setup parameters.
+        scenarios (tuple, optional): Common demand scenarios every policy is evaluated against. Defaults to None.
+        seed_sequence (numpy.random.SeedSequence, optional): Seed for independent demand streams. Defaults to None.
+        evaluator (PopulationEvaluator, optional): Evaluator whose worker pool is reused across calls. Defaults to None.
+        num_parents (int, optional): Number of parents that will be selected; required for racing. Defaults to None.
     
     Returns:
-        list: A list of tuples containing policy combinations and their corresponding costs and service levels.
+        tuple: (2D array with one row of five metrics per policy combination, in population order,
+                1D boolean array marking the policies simulated on the full horizon)
     """
-    fitness_scores = []
-
-    # Use ProcessPoolExecutor to parallelize the fitness evaluations
-    with concurrent.futures.ProcessPoolExecutor() as executor:
-        # Submit each policy evaluation as a task to the executor
-        futures = [executor.submit(simulate_policy, demand_distribution, policies, setup) for policies in population]
-        
-        # Collect results as they finish
-        for future in concurrent.futures.as_completed(futures):
-            cost, service_level, container_fill_rate, periodicity, containers_per_order = future.result()
-            # Add the policy, cost, and service level to the fitness_scores list
-            fitness_scores.append((population[futures.index(future)], cost, service_level, container_fill_rate, periodicity, containers_per_order))
+    analytical_mode = setup.get('analytical_mode', 'off')
+    if analytical_mode == 'fitness':
+        # Noise-free but not simulated, so these metrics are not cached as simulation results
+        metrics = analytical_evaluator(demand_distribution, setup).evaluate(population, setup)
+        return metrics, np.zeros(len(population), dtype=bool)
+    if analytical_mode == 'screen' and num_parents and len(population) > 2 * num_parents:
+        return screened_metrics(population, demand_distribution, setup, scenarios, seed_sequence, evaluator, num_parents)
+
+    if setup.get('racing', False) and num_parents:
+        # Racing compares the whole population, so it runs in this process with the batch engine
+        rng = np.random.default_rng(seed_sequence)
+        return race_population(demand_distribution, population, setup, num_parents, rng, scenarios)
+
+    completed = np.ones(len(population), dtype=bool)
+    if setup.get('evaluation_mode', 'process') == 'incremental':
+        if scenarios is None:
+            raise ValueError("evaluation_mode 'incremental' needs common scenarios; set scenario_mode to 'fixed' or 'generation'")
+        return incremental_evaluator(demand_distribution, setup).evaluate(population, scenarios, setup), completed
+
+    if evaluator is not None:
+        return evaluator.evaluate(population, scenarios, seed_sequence), completed
+
+    evaluator_setup = setup
+    if setup.get('evaluation_mode', 'process') == 'batch':
+        evaluator_setup = dict(setup, max_workers=0)
+    with PopulationEvaluator(demand_distribution, evaluator_setup) as evaluator:
+        return evaluator.evaluate(population, scenarios, seed_sequence), completed
+
+def screened_metrics(population, demand_distribution, setup, scenarios, seed_sequence, evaluator, num_parents):
+    """
+    Simulate only the policy combinations whose analytical screening cost could place them among the parents.
 
-    # Sort by the cost (using the external function instead of lambda)
-    fitness_scores.sort(key=sort_by_cost)
+    The 2 * num_parents combinations with the lowest screening cost are simulated first, and the num_parents-th
+    best simulated cost is the threshold for the rest. The screening cost is a heuristic (see screening_costs),
+    so the differences between the simulated and screening costs of the first combinations give a margin for
+    simulation noise and model error: a remaining combination is simulated unless its screening cost, less
+    'screen_confidence' standard deviations of those differences, is still above the threshold. Skipped
+    combinations keep their analytical estimate and are marked as not completed.
 
-    return fitness_scores
+    Parameters:
+        population, demand_distribution, setup, scenarios, seed_sequence, evaluator, num_parents: As for evaluate_metrics.
 
-''' 
+    Returns:
+        tuple: As for evaluate_metrics; combinations that were not simulated are marked as not completed.
+    """
+    analytical = analytical_evaluator(demand_distribution, setup)
+    screening = analytical.screening_costs(population, setup)
+    simulation_setup = dict(setup, analytical_mode='off')
+
+    ranking = np.argsort(screening, kind='stable')
+    first, rest = ranking[:2 * num_parents], ranking[2 * num_parents:]
+    first_metrics, first_completed = evaluate_metrics([population[k] for k in first], demand_distribution, simulation_setup,
+                                                      scenarios, seed_sequence, evaluator, num_parents)
+
+    threshold = np.sort(first_metrics[:, 0])[num_parents - 1]
+    # Only the spread, and an optimistic screen, widen the margin; a pessimistic one never narrows it
+    differences = first_metrics[first_completed, 0] - screening[first[first_completed]]
+    margin = setup.get('screen_confidence', 2.0) * differences.std() - min(differences.mean(), 0) if len(differences) > 1 else np.inf
+    promising = rest[screening[rest] - margin < threshold]
+    skipped = rest[screening[rest] - margin >= threshold]
+
+    metrics = np.empty((len(population), 5))
+    completed = np.zeros(len(population), dtype=bool)
+    metrics[first], completed[first] = first_metrics, first_completed
+    if len(promising):
+        metrics[promising], completed[promising] = evaluate_metrics([population[k] for k in promising], demand_distribution,
+                                                                    simulation_setup, scenarios, seed_sequence, evaluator)
+    if len(skipped):
+        metrics[skipped] = analytical.evaluate([population[k] for k in skipped], setup)
+    return metrics, completed
+
+def evaluate_population(population, demand_distribution, setup, scenarios=None, seed_sequence=None, evaluator=None, cache=None, num_parents=None):
+    """
+    Evaluate each policy combination in the population, simulating only those missing from the cache.
 
-# Useful for debugging (when needing to step into e.g. simulation.py)
+    Parameters:
+        population (list or numpy.ndarray): Policy combinations.
+        demand_distribution, setup, scenarios, seed_sequence, evaluator, cache, num_parents: As for evaluate_fitness.
 
-def evaluate_fitness(population, demand_distribution, setup):
+    Returns:
+        tuple: (2D array with one row of five metrics per policy combination, in population order,
+                1D boolean array marking the policies simulated on the full horizon), as for evaluate_metrics
+    """
+    if cache is None:
+        return evaluate_metrics(population, demand_distribution, setup, scenarios, seed_sequence, evaluator, num_parents)
+
+    scenarios_digest = scenario_hash(scenarios, seed_sequence)
+    keys = [cache.key(policies, scenarios_digest) for policies in population]
+    cached = {}
+    full_horizon_keys = set()  # Keys of cached and simulated policies with full-horizon metrics
+    missing = {}  # Distinct uncached policies, by key
+
+    for key, policies in zip(keys, population):
+        if key in cached or key in missing:
+            cache.hits += 1  # A duplicate within the population is simulated only once
+            continue
+        metrics_row = cache.get(key)
+        if metrics_row is None:
+            missing[key] = policies
+        else:
+            cached[key] = metrics_row
+            full_horizon_keys.add(key)  # Only full-horizon metrics are cached
+
+    if missing:
+        simulated, completed = evaluate_metrics(list(missing.values()), demand_distribution, setup, scenarios, seed_sequence, evaluator, num_parents)
+        for key, metrics_row, full_horizon in zip(missing, simulated.tolist(), completed):
+            # Candidates dropped early by racing only have a partial estimate, which is not cached
+            if full_horizon:
+                cache.put(key, metrics_row)
+                full_horizon_keys.add(key)
+            cached[key] = metrics_row
+        cache.commit()
+
+    return np.array([cached[key] for key in keys]).reshape(-1, 5), np.array([key in full_horizon_keys for key in keys], dtype=bool)
+
+def evaluate_fitness(population, demand_distribution, setup, scenarios=None, seed_sequence=None, evaluator=None, cache=None, num_parents=None):
     """
     Evaluate the fitness of each policy combination in the population.
     
     Parameters:
-        population (list): List of policy combinations.
+        population (list or numpy.ndarray): Policy combinations.
         demand_distribution (numpy.ndarray): Empirical demand distribution for items.
-        setup (dict): Dictionary containing setup parameters.
+        setup (dict): Dictionary containing setup parameters:
+            - 'evaluation_mode' (str, optional): 'process' to simulate each policy with simulate_policy,
+              'batch' to simulate chunks of the population at once with simulate_population, or 'incremental'
+              to only simulate the item policies not seen on the current scenarios (see incremental.py). Defaults to 'process'.
+            - 'max_workers' (int, optional): Number of worker processes; 0 evaluates in the calling process,
+              which is useful for debugging (e.g. stepping into simulation.py).
+            - 'racing' (bool, optional): Evaluate in horizon segments and stop simulating candidates that are
+              clearly worse than the best num_parents (see race_population). Defaults to False.
+            - 'analytical_mode' (str, optional): 'off' to simulate every policy, 'fitness' to use the exact
+              stationary metrics of AnalyticalEvaluator instead of simulation, or 'screen' to skip the simulation
+              of policies whose analytical screening cost rules them out as parents (see screened_metrics). Defaults to 'off'.
+            - 'screen_confidence' (float, optional): Width of the screening margin in standard deviations. Defaults to 2.0.
+        scenarios (tuple, optional): Common demand scenarios every policy is evaluated against.
+            When None, each policy draws its own demand. Defaults to None.
+        seed_sequence (numpy.random.SeedSequence, optional): Seed for the independent demand streams
+            drawn when no scenarios are given. Defaults to None.
+        evaluator (PopulationEvaluator, optional): Evaluator whose worker pool is reused across calls.
+            When None, process mode starts a pool for this call and batch mode runs in the calling process. Defaults to None.
+        cache (FitnessCache, optional): Cache of earlier evaluations; only policies missing from it,
+            counted once per distinct policy, are simulated. Defaults to None.
+        num_parents (int, optional): Number of parents that will be selected; racing keeps at least
+            this many candidates on the full horizon. Defaults to None.
     
     Returns:
         list: A list of tuples containing policy combinations and their corresponding costs and service levels.
     """
-    fitness_scores = []
+    metrics, _ = evaluate_population(population, demand_distribution, setup, scenarios, seed_sequence, evaluator, cache, num_parents)
+    if isinstance(population, np.ndarray):
+        population = population.tolist()
 
-    # Loop through each policy in the population and evaluate its fitness
-    for policies in population:
-        # Simulate the policy and get the cost and service level
-        cost, service_level, container_fill_rate, peroidicity = simulate_policy(demand_distribution, policies, setup)
-        # Add the policy, cost, and service level to the fitness_scores list
-        fitness_scores.append((policies, cost, service_level, container_fill_rate, peroidicity))
+    # Add the policy, cost, and service level to the fitness_scores list
+    fitness_scores = [(policies, *row) for policies, row in zip(population, metrics.tolist())]
 
     # Sort by the cost (using the external function instead of lambda)
     fitness_scores.sort(key=sort_by_cost)
 
     return fitness_scores
-    '''
 
 def select_parents(fitness_scores, num_parents):
     """
@@ -114,45 +248,72 @@ def select_parents(fitness_scores, num_parents):
     fitness_scores.sort(key=lambda x: x[1])
     return fitness_scores[:num_parents]
 
-def crossover(parents, num_offspring):
+def crossover_array(parents, num_offspring, rng):
+    """
+    Perform uniform crossover between parent policy combinations held in an array.
+
+    Parameters:
+        parents (numpy.ndarray): Parents of shape (num_parents, num_items, 3).
+        num_offspring (int): Number of offspring to generate.
+        rng (numpy.random.Generator): Random generator of the genetic algorithm.
+
+    Returns:
+        numpy.ndarray: Offspring of shape (num_offspring, num_items, 3).
+    """
+    # Pick two parents per child and take each of r, s and S from either of them
+    parent1 = parents[rng.integers(0, len(parents), size=num_offspring)]
+    parent2 = parents[rng.integers(0, len(parents), size=num_offspring)]
+    offspring = np.where(rng.random(parent1.shape) < 0.5, parent1, parent2)
+
+    # If s >= S, draw S between the larger s and the larger S of the parents to make a feasible policy
+    max_s = np.maximum(parent1[:, :, 1], parent2[:, :, 1])
+    max_S = np.maximum(parent1[:, :, 2], parent2[:, :, 2])
+    repaired_S = (max_s + (max_S - max_s) * rng.random(max_s.shape)).astype(np.int64)
+    offspring[:, :, 2] = np.where(offspring[:, :, 1] >= offspring[:, :, 2], repaired_S, offspring[:, :, 2])
+
+    return offspring
+
+def crossover(parents, num_offspring, rng=None):
     """
     Perform crossover between parent policy combinations to generate offspring.
     
     Parameters:
         parents (list): List of top-performing policy combinations.
         num_offspring (int): Number of offspring to generate.
+        rng (numpy.random.Generator, optional): Random generator. Defaults to a freshly seeded one.
     
     Returns:
         list: A list of new policy combinations generated from the parents.
     """
-    offspring = []
+    if rng is None:
+        rng = np.random.default_rng()
+    return crossover_array(policies_to_array([parent[0] for parent in parents]), num_offspring, rng).tolist()
 
-    # Combine (r, s, S) policies to generate a new policy
-    for _ in range(num_offspring):
-        parent1 = random.choice(parents)[0]  # Select a role-model parent
-        parent2 = random.choice(parents)[0]
-
-        # Create a new child by combining policies from both parents
-        child = []
-        
-        for p1_item, p2_item in zip(parent1, parent2):
-            r = random.choice([p1_item[0], p2_item[0]]) # will be the same
-            s = random.choice([p1_item[1], p2_item[1]])
-            S = random.choice([p1_item[2], p2_item[2]])
+def mutate_array(offspring, mutation_rate, setup, rng):
+    """
+    Apply mutation in place to offspring held in an array: a mutated child gets a new random policy for one item.
 
-            # If s >= S, adjust to make a feasible policy
-            if s >= S:
-                max_s = max(p1_item[1], p2_item[1])
-                max_S = max(p1_item[2], p2_item[2])
-                S = int(random.uniform(max_s, max_S))
+    Parameters:
+        offspring (numpy.ndarray): Offspring of shape (num_offspring, num_items, 3).
+        mutation_rate (float): Probability of mutation for each policy combination.
+        setup (dict): Dictionary containing setup parameters:
+            - 'r' (int): Review period for the policies.
+            - 'max_s' (int), 'max_S' (int): Upper bounds of the reorder point and the order-up-to level.
+        rng (numpy.random.Generator): Random generator of the genetic algorithm.
 
-            child.append([r, s, S])  # Add the new valid policy to the child
+    Returns:
+        numpy.ndarray: The mutated offspring.
+    """
+    mutated = np.flatnonzero(rng.random(len(offspring)) < mutation_rate)
+    items = rng.integers(0, offspring.shape[1], size=len(mutated))
 
-        offspring.append(child)
+    s = rng.integers(1, setup['max_s'] + 1, size=len(mutated))
+    S = rng.integers(s + 1, setup['max_S'] + 1)  # Ensure 's' is smaller than 'S'
+    offspring[mutated, items] = np.stack([np.full(len(mutated), setup['r']), s, S], axis=1)
 
     return offspring
 
-def mutate(offspring, mutation_rate, setup):
+def mutate(offspring, mutation_rate, setup, rng=None):
     """
     Apply mutation to the offspring to introduce variability in the policies.
     
@@ -161,33 +322,105 @@ def mutate(offspring, mutation_rate, setup):
         mutation_rate (float): Probability of mutation for each policy.
         setup (dict): Dictionary containing setup parameters:
             - 'review_period' (int): Review period for the policies.
+        rng (numpy.random.Generator, optional): Random generator. Defaults to a freshly seeded one.
     
     Returns:
         list: A list of mutated policy combinations.
     """
+    if rng is None:
+        rng = np.random.default_rng()
+    offspring[:] = mutate_array(policies_to_array(offspring), mutation_rate, setup, rng).tolist()
+    return offspring
 
-    r = setup['r']
-    max_s = setup['max_s']
-    max_S = setup['max_S']
+def generation_size(pop_size, generation, setup):
+    """
+    Population size and number of parents of a generation.
 
-    # Randomly modify some policies to introduce variability
-    for policies in offspring:
-        if random.random() < mutation_rate:
-            item_index = random.randint(0, len(policies) - 1)
+    Parameters:
+        pop_size (int): Initial size of the population.
+        generation (int): Index of the generation, starting at 0.
+        setup (dict): Dictionary containing setup parameters:
+            - 'decay_rate' (float): Factor the population size shrinks by each generation.
+            - 'parent_fraction' (float): Fraction of the population selected as parents.
 
-            s = random.randint(1, max_s)
-            S = random.randint(s + 1, max_S)  # Ensure 's' is smaller than 'S'
-            policies[item_index] = [r, s, S]
-    
-    return offspring
+    Returns:
+        tuple: (population size, number of parents)
+    """
+    # Exponentially shrink the population size
+    current_pop_size = max(100, int(pop_size * (setup['decay_rate'] ** generation)))  # Shrinks by decay_rate each generation, minimum 100
 
-def genetic_algorithm(demand_distribution, setup):
+    # Adjust the number of parents based on current population size
+    num_parents = int(current_pop_size * setup['parent_fraction'])
+
+    return current_pop_size, num_parents
+
+def default_callbacks(setup):
+    """
+    Callbacks used when none are given: a progress bar, plus a live plot when enabled in setup.
+
+    Parameters:
+        setup (dict): Dictionary containing setup parameters ('plot' and 'live_plot').
+
+    Returns:
+        list: The callbacks.
+    """
+    # Matplotlib is only imported when plotting is on
+    callbacks = [ProgressBar()]
+    if setup.get('plot', True) and setup.get('live_plot', True):
+        from src.PeriodicReview_JointReplenishment.graph import LivePlot
+        callbacks.append(LivePlot())
+    return callbacks
+
+def reject_options(setup, options, mode):
+    """
+    Raise a ValueError when the setup turns on an option a search mode does not support, instead of ignoring it.
+
+    Parameters:
+        setup (dict): Dictionary containing setup parameters.
+        options (list): Names of the unsupported options. An option is on when its value is truthy and not 'off'.
+        mode (str): Name of the search mode, used in the message.
+    """
+    for option in options:
+        if setup.get(option) and setup.get(option) != 'off':
+            raise ValueError(f"'{option}' is not supported in {mode} mode")
+
+def genetic_algorithm(demand_distribution, setup, callbacks=None, initial_population=None, evaluator=None):
     """
     Run a genetic algorithm to optimize inventory policies based on demand distribution.
     
     Parameters:
         demand_distribution (numpy.ndarray): Empirical demand distribution for items.
-        setup (dict): Dictionary containing setup parameters.
+        setup (dict): Dictionary containing setup parameters:
+            - 'plot' (bool, optional): Save the convergence plot after the run. False runs headless
+              without importing matplotlib. Defaults to True.
+            - 'live_plot' (bool, optional): Redraw the convergence plot after every generation. Defaults to True.
+            - 'telemetry_path' (str, optional): JSON lines file for per-generation phase timings and task
+              statistics (see telemetry.py). Defaults to None (no telemetry).
+            - 'profile_workers' (bool, optional): Include a cProfile summary of the evaluation tasks in the
+              telemetry. Defaults to False.
+            - 'checkpoint_path' (str, optional): File the state of the run is saved to (see checkpoint.py). Defaults to None.
+            - 'checkpoint_interval' (int, optional): Number of generations between checkpoints. Defaults to 1.
+            - 'resume' (bool, optional): Continue from the checkpoint at 'checkpoint_path' when it exists. Defaults to False.
+            - 'surrogate' (bool, optional): Pre-screen the offspring with a regression model fitted on all simulations,
+              simulating only the most promising ones (see surrogate.py). More offspring are bred and screened down, so
+              every generation still simulates its full population size. Defaults to False.
+            - 'surrogate_fraction' (float, optional): Fraction of the bred offspring kept by predicted cost. Defaults to 0.5.
+            - 'surrogate_exploration' (float, optional): Fraction of the bred offspring kept at random from the others. Defaults to 0.1.
+            - 'polish_elites' (int, optional): Number of best policy combinations improved by local search every generation,
+              evaluated incrementally on the generation's scenarios (see incremental.py). Defaults to 0.
+            - 'polish_steps' (int, optional): Maximum number of local search moves per polished policy combination. Defaults to 5.
+            - 'archive_path' (str, optional): Append-only file every evaluated policy combination and its metrics are
+              streamed to, for queries over the search history (see archive.py). A new run replaces the file; a resumed
+              run keeps the records up to its checkpoint. Defaults to None.
+            - 'early_stop_generations' (int, optional): Stop when the best cost of the elites has not improved by more than
+              'early_stop_tolerance' (relative) within this many generations. Defaults to None (run all generations).
+            - 'early_stop_tolerance' (float, optional): Defaults to 0.
+        callbacks (list, optional): Callables called with a progress dictionary after every generation
+            (see callbacks.py). Defaults to a progress bar, plus a live plot when enabled in setup.
+        initial_population (list or numpy.ndarray, optional): Policy combinations placed at the start of the first
+            population, e.g. the best policies of a similar problem; the rest is drawn at random. Ignored on resume. Defaults to None.
+        evaluator (PopulationEvaluator, optional): Open evaluator whose worker pool is used instead of starting one;
+            it is left open. Defaults to None.
     
     Returns:
         list: A list of the best policy combinations after running the genetic algorithm.
@@ -195,62 +428,212 @@ def genetic_algorithm(demand_distribution, setup):
     pop_size = setup['pop_size']
     num_generations = setup['num_generations']
     mutation_rate = setup['mutation_rate']
-    decay_rate = setup['decay_rate']
-    parent_fraction = setup['parent_fraction']
-
-    population = initialize_population(pop_size, setup['num_items'], setup)
-    cost_progression = []  # List to track cost at each generation
-    service_level_progression = []  # List to track service level at each generation
-
-    # Create the initial plot
-    plt.ion()  # Turn on interactive mode
-    fig, ax = plt.subplots()
-    live_plot(cost_progression, service_level_progression, num_generations, ax)  # Modified live plot function
-
-    for generation in range(num_generations):
-        # Exponentially shrink the population size
-        current_pop_size = max(100, int(pop_size * (decay_rate ** generation)))  # Shrinks by decay_rate each generation, minimum 100
-        
-        # Adjust the number of parents based on current population size
-        num_parents = int(current_pop_size * parent_fraction)
-        
-        # Start measuring time for the generation evaluation
-        start_time = time.time()
-
-        # Calculate fitness, select parents, perform crossover and mutation
-        fitness_scores = evaluate_fitness(population, demand_distribution, setup)
-        parents = select_parents(fitness_scores, num_parents)
-        offspring = crossover(parents, current_pop_size - num_parents)
-        offspring = mutate(offspring, mutation_rate, setup)
-        population = [p[0] for p in parents] + offspring
-
-        # Get the cost and service level of the best policy in this generation
-        best_policy = parents[0]
-        best_cost = best_policy[1]
-        best_service_level = best_policy[2]
-        cost_progression.append(best_cost)
-        service_level_progression.append(best_service_level)
-
-        # End measuring time for the generation evaluation
-        end_time = time.time()
-        generation_time = end_time - start_time
-
-        # Update the live plot with both cost and service level
-        live_plot(cost_progression, service_level_progression, num_generations, ax)
-
-        # Progress bar
-        progress = (generation + 1) / num_generations * 100
-        sys.stdout.write(f'\rGeneration {generation + 1}/{num_generations} - Progress: {progress:.2f}% - Last generation evaluation time: {generation_time:.2f} seconds     ')
-        sys.stdout.flush()
-
-    print()  # Move to the next line after the progress bar is done
-
-    plt.ioff()  # Turn off interactive mode
-
-    # Save the final plot
-    fig.savefig('GeneticAlgorithm_Convergence', dpi=300)
-
-    # Return the best policies
+
+    checkpoint_path = setup.get('checkpoint_path')
+    checkpoint_interval = setup.get('checkpoint_interval', 1)
+    early_stop_generations = setup.get('early_stop_generations')
+    early_stop_tolerance = setup.get('early_stop_tolerance', 0)
+    problem = setup_hash(demand_distribution, setup)
+
+    checkpoint = None
+    if setup.get('resume', False) and checkpoint_path is not None:
+        if os.path.exists(checkpoint_path):
+            checkpoint = load_checkpoint(checkpoint_path, problem)
+            print(f"Resuming from {checkpoint_path} after generation {checkpoint['generation']}")
+        else:
+            print(f"No checkpoint found at {checkpoint_path}, starting a new run")
+
+    # The population is an integer array of shape (pop_size, num_items, 3); it is converted to lists for the result
+    if checkpoint is None:
+        start_generation = 0
+        # Seed all randomness from one sequence, so a run is reproducible when 'seed' is set: the first child seeds
+        # the fixed scenarios, the second the GA operators and the later ones the demand of each generation
+        seed_sequence = np.random.SeedSequence(setup.get('seed'))
+        fixed_seed = seed_sequence.spawn(1)[0]
+        rng = np.random.default_rng(seed_sequence.spawn(1)[0])
+        population = initialize_population_array(pop_size, setup['num_items'], setup, rng)
+        if initial_population is not None and len(initial_population) > 0:
+            seeded = policies_to_array(initial_population)[:pop_size, :setup['num_items']]
+            population[:len(seeded)] = seeded
+        scored_population = population[:0]
+        scored_metrics = np.zeros((0, 5))
+        cost_progression = []  # List to track cost at each generation
+        service_level_progression = []  # List to track service level at each generation
+    else:
+        start_generation = checkpoint['generation']
+        seed_sequence = checkpoint['seed_sequence']
+        fixed_seed = np.random.SeedSequence(seed_sequence.entropy).spawn(1)[0]  # Redraw the same fixed scenarios
+        rng = checkpoint['rng']
+        population = checkpoint['population']
+        scored_population = checkpoint['scored_population']
+        scored_metrics = checkpoint['scored_metrics']
+        cost_progression = checkpoint['cost_progression']
+        service_level_progression = checkpoint['service_level_progression']
+
+    fixed_scenarios = None
+    if setup.get('scenario_mode') == 'fixed':
+        fixed_scenarios = generate_scenarios(demand_distribution, setup, np.random.default_rng(fixed_seed))
+
+    # Remember evaluated policies so elites and duplicate offspring are not simulated again
+    cache = None
+    if setup.get('cache_size', 0) > 0:
+        warn_without_fixed_scenarios(setup)
+        cache = FitnessCache(setup['cache_size'], problem, setup.get('cache_path'))
+        for key, metrics in (checkpoint['cache_entries'] if checkpoint is not None else []):
+            cache.put(key, metrics, persist=False)
+
+    # The surrogate learns from the policies simulated in this run; after a resume it is refitted from scratch
+    surrogate = None
+    num_seen = 0  # Leading rows of the population the surrogate already learned from: the parents carried over
+    surrogate_fraction = setup.get('surrogate_fraction', 0.5)
+    surrogate_exploration = setup.get('surrogate_exploration', 0.1)
+    if setup.get('surrogate', False):
+        if surrogate_fraction + surrogate_exploration <= 0:
+            raise ValueError("surrogate_fraction and surrogate_exploration must keep some offspring")
+        surrogate = Surrogate(setup['num_items'], setup['max_S'])
+
+    # Every evaluated policy combination is appended to the archive, which keeps the search history on disk;
+    # a resumed run continues the archive from its checkpoint
+    archive = None
+    if setup.get('archive_path'):
+        archive = EvaluationArchive(setup['archive_path'], setup['num_items'], problem,
+                                    resume_records=checkpoint['archive_records'] if checkpoint is not None else None)
+
+    # Number of parents of the last completed generation, used for the result when no generation is left to run
+    _, num_parents = generation_size(pop_size, max(start_generation - 1, 0), setup)
+
+    # Progress is reported through callbacks (progress bar, live plot, ...)
+    if callbacks is None:
+        callbacks = default_callbacks(setup)
+
+    telemetry = Telemetry(setup.get('telemetry_path'), setup.get('profile_workers', False))
+    telemetry.event('run_start', setup=setup)
+
+    stopping = False
+
+    # Keep one worker pool, with the demand data in shared memory, for the whole run
+    pool_start_time = time.perf_counter()
+    pool = PopulationEvaluator(demand_distribution, setup) if evaluator is None else contextlib.nullcontext(evaluator)
+    with pool as evaluator:
+        evaluator.use_setup(setup)
+        evaluator.telemetry = telemetry
+        telemetry.event('pool_start', max_workers=evaluator.max_workers, seconds=time.perf_counter() - pool_start_time)
+
+        for generation in range(start_generation, num_generations):
+            current_pop_size, num_parents = generation_size(pop_size, generation, setup)
+
+            # Start measuring time for the generation evaluation
+            start_time = time.time()
+
+            # Calculate fitness, select parents, perform crossover and mutation
+            generation_seed = seed_sequence.spawn(1)[0]
+            with telemetry.phase('scenarios'):
+                scenarios = scenarios_for_generation(demand_distribution, setup, generation_seed, fixed_scenarios)
+            with telemetry.phase('evaluation'):
+                metrics, completed = evaluate_population(population, demand_distribution, setup, scenarios, generation_seed, evaluator, cache, num_parents)
+            if setup.get('polish_elites', 0) > 0:
+                with telemetry.phase('polish'):
+                    population, metrics = polish_elites(population, metrics, demand_distribution, setup, scenarios,
+                                                        setup['polish_elites'], setup.get('polish_steps', 5))
+            scored_population, scored_metrics = population, metrics
+            if archive is not None:
+                with telemetry.phase('archive'):
+                    archive.append(generation, population, metrics, completed)
+            if surrogate is not None:
+                with telemetry.phase('surrogate'):
+                    # Estimates of racing and the analytical screen would bias the fit, and the parents were seen before
+                    fresh = completed.copy()
+                    fresh[:num_seen] = False
+                    surrogate.update(population[fresh], metrics[fresh])
+            with telemetry.phase('selection'):
+                # The stable sort keeps policies of equal cost in population order
+                ranking = np.argsort(metrics[:, 0], kind='stable')[:num_parents]
+                parents = population[ranking]
+            # With a fitted surrogate, breed enough offspring that the screened ones fill the population
+            num_offspring = current_pop_size - num_parents
+            num_bred = num_offspring
+            if surrogate is not None and surrogate.ready:
+                num_bred = int(np.ceil(num_offspring / min(1.0, surrogate_fraction + surrogate_exploration)))
+            with telemetry.phase('crossover'):
+                offspring = crossover_array(parents, num_bred, rng)
+            with telemetry.phase('mutation'):
+                offspring = mutate_array(offspring, mutation_rate, setup, rng)
+            if num_bred > num_offspring:
+                with telemetry.phase('surrogate'):
+                    offspring = screen_offspring(surrogate, offspring, surrogate_fraction, surrogate_exploration, rng, num_offspring)
+            population = np.concatenate([parents, offspring])
+            num_seen = num_parents
+
+            # Get the cost and service level of the best policy in this generation
+            best_policy = (parents[0].tolist(), *metrics[ranking[0]].tolist())
+            best_cost = best_policy[1]
+            best_service_level = best_policy[2]
+            cost_progression.append(best_cost)
+            service_level_progression.append(best_service_level)
+
+            # End measuring time for the generation evaluation
+            end_time = time.time()
+            generation_time = end_time - start_time
+
+            # Report progress to the callbacks (progress bar, live plot, ...)
+            cache_hits, cache_lookups = None, None
+            if cache is not None:
+                cache_hits, cache_misses = cache.take_counters()
+                cache_lookups = cache_hits + cache_misses
+            progress = {
+                'generation': generation + 1,
+                'num_generations': num_generations,
+                'cost_progression': cost_progression,
+                'service_level_progression': service_level_progression,
+                'best_policy': best_policy,
+                'generation_time': generation_time,
+                'cache_hits': cache_hits,
+                'cache_lookups': cache_lookups
+            }
+            with telemetry.phase('callbacks'):
+                for callback in callbacks:
+                    callback(progress)
+
+            # Stop once the elites have not improved within the last early_stop_generations generations
+            stopping = (early_stop_generations is not None and len(cost_progression) > early_stop_generations
+                        and min(cost_progression[-early_stop_generations:])
+                        >= min(cost_progression[:-early_stop_generations]) * (1 - early_stop_tolerance))
+
+            # Save the state of the run, so an interrupted run can continue from here
+            if checkpoint_path is not None and ((generation + 1) % checkpoint_interval == 0 or generation + 1 == num_generations or stopping):
+                with telemetry.phase('checkpoint'):
+                    if archive is not None:
+                        archive.flush()  # The archive holds every generation up to the checkpoint
+                    save_checkpoint(checkpoint_path, generation + 1, population, scored_population, scored_metrics, cost_progression,
+                                    service_level_progression, seed_sequence, rng, problem, cache,
+                                    archive.written if archive is not None else None)
+
+            telemetry.end_generation(generation + 1, len(scored_population), generation_time=generation_time, best_cost=best_cost,
+                                     cache_hits=cache_hits, cache_lookups=cache_lookups)
+            if stopping:
+                break
+
+    telemetry.event('run_end', generations=len(cost_progression), best_cost=cost_progression[-1] if cost_progression else None)
+    telemetry.close()
+
+    for callback in callbacks:
+        if hasattr(callback, 'close'):
+            callback.close()
+    if stopping:
+        print(f"Stopped after generation {len(cost_progression)}: no improvement in {early_stop_generations} generations")
+
+    if cache is not None:
+        cache.close()
+    if archive is not None:
+        archive.close()
+
+    # Save the final plot, rendered once from the recorded history
+    if setup.get('plot', True):
+        from src.PeriodicReview_JointReplenishment.graph import static_plot
+        static_plot(cost_progression, service_level_progression, len(cost_progression), 'GeneticAlgorithm_Convergence.png')
+
+    # Return the best policies of the last evaluated generation as lists
+    fitness_scores = [(policies, *row) for policies, row in zip(scored_population.tolist(), scored_metrics.tolist())]
     best_policies = select_parents(fitness_scores, num_parents)
 
     return best_policies
\ No newline at end of file
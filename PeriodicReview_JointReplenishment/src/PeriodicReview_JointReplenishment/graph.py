@@ -1,6 +1,6 @@
 import matplotlib.pyplot as plt
 
-def static_plot(cost_progression, service_level_progression, num_generations):
+def static_plot(cost_progression, service_level_progression, num_generations, file_path=None):
     """
     Plot the cost and service level progression over generations.
     
@@ -8,6 +8,7 @@ def static_plot(cost_progression, service_level_progression, num_generations):
         cost_progression (list): List of costs for each generation.
         service_level_progression (list): List of service levels for each generation.
         num_generations (int): Total number of generations.
+        file_path (str, optional): Save the plot to this file instead of showing it. Defaults to None.
     """
     fig, ax1 = plt.subplots(figsize=(10, 6))  # Increase figure size to accommodate the legends
 
@@ -33,7 +34,38 @@ def static_plot(cost_progression, service_level_progression, num_generations):
 
     plt.grid(True)
     plt.tight_layout(pad=2.0)  # Increase padding to accommodate right label
-    plt.show()
+
+    if file_path is None:
+        plt.show()
+    else:
+        fig.savefig(file_path, dpi=300)
+        plt.close(fig)
+
+def front_plot(front, file_path=None):
+    """
+    Plot the trade-off between cost and service level of a Pareto front.
+
+    Parameters:
+        front (list): Policy combinations of the front with their metrics, as returned by pareto_front.
+        file_path (str, optional): Save the plot to this file instead of showing it. Defaults to None.
+    """
+    fig, ax = plt.subplots(figsize=(10, 6))
+
+    costs = [scores[1] for scores in front]
+    service_levels = [scores[2] for scores in front]
+    ax.plot(costs, service_levels, color='black', marker='o', markersize=4)
+    ax.set_xlabel('Average Cost')
+    ax.set_ylabel('Service Level (%)')
+
+    plt.title('(r, s, S) Policy Trade-off')
+    plt.grid(True)
+    plt.tight_layout(pad=2.0)
+
+    if file_path is None:
+        plt.show()
+    else:
+        fig.savefig(file_path, dpi=300)
+        plt.close(fig)
 
 def live_plot(cost_progression, service_level_progression, num_generations, ax=None):
     """
@@ -78,3 +110,22 @@ def live_plot(cost_progression, service_level_progression, num_generations, ax=N
     ax.grid(True)
     plt.tight_layout(pad=2.0)  # Increase padding to accommodate right label
     plt.pause(0.1)  # Pause to allow the plot to update
+
+class LivePlot:
+    """
+    Progress callback that redraws the live plot after every generation.
+    """
+
+    def __init__(self):
+        self.ax = None
+
+    def __call__(self, progress):
+        if self.ax is None:
+            plt.ion()  # Turn on interactive mode
+            fig, self.ax = plt.subplots()
+
+        # Update the live plot with both cost and service level
+        live_plot(progress['cost_progression'], progress['service_level_progression'], progress['num_generations'], self.ax)
+
+    def close(self):
+        plt.ioff()  # Turn off interactive mode
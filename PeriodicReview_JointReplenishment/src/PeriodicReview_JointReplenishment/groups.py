@@ -0,0 +1,142 @@
+import os
+import concurrent.futures
+import numpy as np
+from src.PeriodicReview_JointReplenishment.genetic_algorithm import genetic_algorithm
+
+def group_setups(setup):
+    """
+    Split the setup into one sub-problem per item group.
+
+    Each entry of setup['item_groups'] is a dictionary with:
+        - 'items' (list): Indices of the items in the group (rows of the demand data).
+        - 'name' (str, optional): Name of the group, e.g. the supplier.
+        - 'pallet_volume' (list, optional): Pallet volume of each item in the group. Defaults to the
+          entries of setup['pallet_volume'] for these items.
+        - Any other setup parameter, e.g. 'container_volume', 'order_cost' or 'lead_time', overriding
+          the global value for this group.
+
+    Parameters:
+        setup (dict): Dictionary containing setup parameters, including 'item_groups'.
+
+    Returns:
+        list: A list of (name, items, setup) tuples, one per group.
+    """
+    grouped_items = sorted(item for group in setup['item_groups'] for item in group['items'])
+    if grouped_items != list(range(setup['num_items'])):
+        raise ValueError(f"item_groups must assign each of the {setup['num_items']} items to exactly one group")
+
+    groups = []
+    seeds = np.random.SeedSequence(setup.get('seed')).spawn(len(setup['item_groups']))
+
+    for index, group in enumerate(setup['item_groups']):
+        items = list(group['items'])
+        name = group.get('name', f'Group {index + 1}')
+
+        group_setup = {key: value for key, value in setup.items() if key != 'item_groups'}
+        group_setup.update({key: value for key, value in group.items() if key not in ('items', 'name')})
+        group_setup['num_items'] = len(items)
+        if 'pallet_volume' not in group:
+            group_setup['pallet_volume'] = [setup['pallet_volume'][i] for i in items]
+        if setup.get('seed') is not None:
+            group_setup['seed'] = int(seeds[index].generate_state(1)[0])
+
+        # Each group keeps its own checkpoint and archive next to the configured ones
+        for key in ('checkpoint_path', 'archive_path'):
+            if setup.get(key) and key not in group:
+                root, extension = os.path.splitext(setup[key])
+                group_setup[key] = f'{root}_group{index + 1}{extension}'
+
+        # Groups run side by side, so they neither plot nor write to the shared console
+        group_setup['plot'] = False
+
+        groups.append((name, items, group_setup))
+
+    return groups
+
+def optimize_group(demand_distribution, group_setup):
+    """
+    Run the genetic algorithm on a single item group. Runs in a worker process.
+
+    Parameters:
+        demand_distribution (numpy.ndarray): Empirical demand distribution of the group's items.
+        group_setup (dict): Setup parameters of the group.
+
+    Returns:
+        list: The best policy combinations of the group, as returned by genetic_algorithm.
+    """
+    return genetic_algorithm(demand_distribution, group_setup, callbacks=[])
+
+def combine_group_policies(group_results, demand_distribution, num_items):
+    """
+    Combine the k-th best policies of every group into joint policies over all items.
+
+    Costs add up across groups. The service level is weighted by each group's average demand,
+    periodicity becomes the total number of orders per period, and containers per order and
+    container fill rate are weighted by each group's containers per period.
+
+    Parameters:
+        group_results (list): A list of (name, items, best_policies) tuples.
+        demand_distribution (numpy.ndarray): Empirical demand distribution for all items.
+        num_items (int): Total number of items.
+
+    Returns:
+        list: A list of tuples in the format returned by genetic_algorithm.
+    """
+    average_demand = np.asarray(demand_distribution, dtype=np.float64).mean(axis=1)
+    demand_weights = np.array([average_demand[items].sum() for _, items, _ in group_results])
+    demand_weights = demand_weights / demand_weights.sum() if demand_weights.sum() > 0 else np.full(len(group_results), 1 / len(group_results))
+
+    combined = []
+    for rank in range(min(len(best_policies) for _, _, best_policies in group_results)):
+        policies = [None] * num_items
+        metrics = np.array([best_policies[rank][1:] for _, _, best_policies in group_results], dtype=np.float64)
+        for _, items, best_policies in group_results:
+            for item, item_policy in zip(items, best_policies[rank][0]):
+                policies[item] = item_policy
+
+        cost, service_level, container_fill_rate, periodicity, containers_per_order = metrics.T
+        containers_per_period = periodicity * containers_per_order
+        total_containers = containers_per_period.sum()
+        combined.append((policies,
+                         cost.sum(),
+                         (service_level * demand_weights).sum(),
+                         (container_fill_rate * containers_per_period).sum() / total_containers if total_containers > 0 else 0,
+                         periodicity.sum(),
+                         total_containers / periodicity.sum() if periodicity.sum() > 0 else 0))
+
+    return combined
+
+def optimize_groups(demand_distribution, setup):
+    """
+    Optimize every item group as an independent joint replenishment problem, running the groups concurrently.
+
+    Parameters:
+        demand_distribution (numpy.ndarray): Empirical demand distribution for all items.
+        setup (dict): Dictionary containing setup parameters:
+            - 'item_groups' (list): Item groups, see group_setups.
+            - 'group_workers' (int, optional): Number of groups optimized at the same time. Defaults to the number of CPU cores.
+
+    Returns:
+        tuple: (combined best policies over all items, list of (name, items, best_policies) per group)
+    """
+    groups = group_setups(setup)
+    num_cores = os.cpu_count()
+    group_workers = min(len(groups), setup.get('group_workers') or num_cores)
+
+    # Share the cores between the groups; a group left with a single core evaluates in its own process
+    evaluation_workers = num_cores // group_workers
+    for _, _, group_setup in groups:
+        if group_setup.get('max_workers') is None:
+            group_setup['max_workers'] = evaluation_workers if evaluation_workers > 1 else 0
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=group_workers) as executor:
+        futures = [executor.submit(optimize_group, np.asarray(demand_distribution)[items], group_setup)
+                   for _, items, group_setup in groups]
+
+        group_results = []
+        for (name, items, _), future in zip(groups, futures):
+            best_policies = future.result()
+            print(f"{name}: {len(items)} items, best cost = {best_policies[0][1]:.2f}")
+            group_results.append((name, items, best_policies))
+
+    return combine_group_policies(group_results, demand_distribution, setup['num_items']), group_results
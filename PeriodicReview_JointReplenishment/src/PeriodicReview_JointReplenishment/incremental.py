@@ -0,0 +1,287 @@
+from collections import OrderedDict
+import numpy as np
+from src.PeriodicReview_JointReplenishment.batch_simulation import policies_to_array
+from src.PeriodicReview_JointReplenishment.fitness_cache import setup_hash, scenario_hash
+
+# Setup parameters the item trajectories depend on; the container parameters only enter when items are combined
+TRAJECTORY_KEYS = ['holding_cost', 'backorder_cost', 'lead_time', 'warm_up', 'num_samples']
+
+# Incremental evaluators by trajectory hash, so their caches live for the whole run; the least recently
+# used is dropped when a process works on more problems, e.g. the points of a sweep
+MAX_EVALUATORS = 4
+_evaluators = OrderedDict()
+
+def item_trajectories(items, policies, scenarios, setup):
+    """
+    Simulate single items along every scenario, with the same bookkeeping as simulate_path.
+
+    Each row is one (item, policy) pair on one scenario, so the pairs are simulated together with
+    array operations. Nothing but the container cost couples the items, which is left to the caller.
+
+    Parameters:
+        items (numpy.ndarray): Item index of each pair.
+        policies (numpy.ndarray): [r, s, S] of each pair, of shape (num_pairs, 3).
+        scenarios (tuple): Common demand scenarios from generate_scenarios.
+        setup (dict): Dictionary containing setup parameters.
+
+    Returns:
+        tuple: (order quantity per counted period, of shape (num_pairs, replications, num_samples),
+                holding and backorder cost, demand and demand met per replication, each of shape (num_pairs, replications))
+    """
+    holding_cost = setup['holding_cost']
+    backorder_cost = setup['backorder_cost']
+    lead_time = setup['lead_time']
+    warm_up = setup['warm_up']
+    num_samples = setup['num_samples']
+
+    initial_inventory, demand = scenarios
+    num_replications = len(initial_inventory)
+    num_pairs = len(items)
+
+    # Row k is pair k // num_replications on scenario k % num_replications
+    item = np.repeat(items, num_replications)
+    replication = np.tile(np.arange(num_replications), num_pairs)
+    r, s, S = (np.repeat(policies[:, k], num_replications) for k in range(3))
+
+    inventory_level = initial_inventory[replication, item].astype(np.float64)
+    inventory_position = inventory_level.copy()
+    pipeline_inventory = np.zeros((len(item), lead_time))
+
+    orders = np.zeros((len(item), num_samples))
+    total_cost = np.zeros(len(item))
+    total_demand = np.zeros(len(item))
+    total_demand_met = np.zeros(len(item))
+
+    for period in range(warm_up + num_samples):
+        counting = period >= warm_up  # Do not count costs in warm-up!
+        j = period - warm_up if counting else period
+        arrival_slot = period % lead_time
+        order_slot = (period + lead_time - 1) % lead_time
+
+        period_demand = demand[replication, item, period]
+        inventory_position -= period_demand
+        inventory_level -= pipeline_inventory[:, arrival_slot] - period_demand
+
+        if counting:
+            total_demand += period_demand
+            short = inventory_level < period_demand
+            total_demand_met += np.where(short, np.maximum(inventory_level, 0), period_demand)
+            total_cost += np.where(short, period_demand - inventory_level, 0) * backorder_cost
+
+        # Review inventory when in a review period
+        reorder = (j % r == 0) & (inventory_position <= s)
+        order_quantity = np.where(reorder, S - inventory_position, 0)
+        inventory_position += order_quantity
+        pipeline_inventory[:, order_slot] += order_quantity
+
+        if counting:
+            total_cost += np.where(inventory_level > 1, inventory_level, 0) * holding_cost
+            # The order slot was emptied when it last received, so it holds this period's order only
+            orders[:, j] = pipeline_inventory[:, order_slot]
+
+        # Update pipeline inventory
+        pipeline_inventory[:, arrival_slot] = 0
+
+    shape = (num_pairs, num_replications)
+    return (orders.reshape(num_pairs, num_replications, num_samples), total_cost.reshape(shape),
+            total_demand.reshape(shape), total_demand_met.reshape(shape))
+
+class IncrementalEvaluator:
+    """
+    Evaluate policy combinations from cached per-item trajectories.
+
+    Under common scenarios, the inventory of an item only depends on its own (r, s, S). The evaluator
+    keeps the order quantities and cost totals of every simulated (item, r, s, S) on the current
+    scenarios, so a child that differs from its parents in a few items only simulates those items.
+    The container cost, the container fill rate and the order counts are then derived from the cached
+    order quantities of all items, which gives the same metrics as simulate_policy on the scenarios.
+    """
+
+    def __init__(self, setup):
+        """
+        Parameters:
+            setup (dict): Dictionary containing setup parameters:
+                - 'trajectory_cache_size' (int, optional): Maximum number of cached item trajectories. Defaults to 5000.
+        """
+        self.setup = setup
+        self.max_size = setup.get('trajectory_cache_size', 5000)
+        self.trajectories = OrderedDict()  # (orders, cost, demand, demand met) by (item, r, s, S), least recently used first
+        self.scenarios_digest = None
+        self.simulated = 0  # Number of item trajectories simulated so far
+
+    def item_keys(self, population, scenarios):
+        """
+        Make sure the trajectories of every item policy in the population are cached.
+
+        Returns:
+            list: For each policy combination, the cache keys of its items.
+        """
+        digest = scenario_hash(scenarios)
+        if digest != self.scenarios_digest:
+            # Trajectories only hold for the scenarios they were simulated on
+            self.trajectories.clear()
+            self.scenarios_digest = digest
+
+        keys = [[(i, *map(int, policy)) for i, policy in enumerate(policies)] for policies in population]
+        missing = list(dict.fromkeys(key for candidate in keys for key in candidate if key not in self.trajectories))
+        if missing:
+            pairs = np.array(missing, dtype=np.int64)
+            for key, *trajectory in zip(missing, *item_trajectories(pairs[:, 0], pairs[:, 1:], scenarios, self.setup)):
+                self.trajectories[key] = trajectory
+            self.simulated += len(missing)
+
+        for candidate in keys:
+            for key in candidate:
+                self.trajectories.move_to_end(key)
+        return keys
+
+    def evaluate(self, population, scenarios, setup=None):
+        """
+        Parameters:
+            population (list or numpy.ndarray): Policy combinations.
+            scenarios (tuple): Common demand scenarios from generate_scenarios.
+            setup (dict, optional): Setup whose order cost and container and pallet volumes combine the items;
+                its trajectory parameters must match the evaluator's. Defaults to the evaluator's setup.
+
+        Returns:
+            numpy.ndarray: 2D array of shape (pop_size, 5) with the metrics of each policy combination,
+                averaged over the scenarios as by simulate_policy.
+        """
+        setup = self.setup if setup is None else setup
+        num_items = setup['num_items']
+        num_samples = setup['num_samples']
+        order_cost = setup['order_cost']
+        container_volume = setup['container_volume']
+        pallet_volume = setup['pallet_volume']
+
+        population = policies_to_array(population)[:, :num_items]
+        keys = self.item_keys(population, scenarios)
+
+        metrics = np.zeros((len(population), 5))
+        for k, candidate in enumerate(keys):
+            trajectories = [self.trajectories[key] for key in candidate]
+
+            # Joint orders per replication and period, summed over the items in the order of simulate_path
+            total_volume = 0.0
+            ordered = False
+            for i, (orders, _, _, _) in enumerate(trajectories):
+                total_volume = total_volume + pallet_volume[i] * orders
+                ordered = ordered | (orders != 0)
+            containers = np.where(ordered, np.ceil(total_volume / container_volume), 0)
+
+            total_cost = sum(cost for _, cost, _, _ in trajectories) + containers.sum(axis=1) * order_cost
+            total_demand = sum(demand for _, _, demand, _ in trajectories)
+            total_demand_met = sum(met for _, _, _, met in trajectories)
+            total_orders = ordered.sum(axis=1)
+            total_containers = containers.sum(axis=1)
+            container_fill_rate = np.divide(total_volume, container_volume * containers, out=np.zeros(containers.shape),
+                                            where=containers > 0).sum(axis=1)
+
+            has_orders = total_orders > 0
+            service_level = np.divide(100 * total_demand_met, total_demand, out=np.ones(len(total_demand)), where=total_demand > 0)
+            replications = np.column_stack((total_cost / num_samples, service_level,
+                                            np.divide(container_fill_rate, total_containers, out=np.zeros(len(total_orders)), where=has_orders),
+                                            total_orders / num_samples,
+                                            np.divide(total_containers, total_orders, out=np.zeros(len(total_orders)), where=has_orders)))
+            metrics[k] = replications.mean(axis=0)
+
+        while len(self.trajectories) > self.max_size:
+            self.trajectories.popitem(last=False)
+        return metrics
+
+def neighbourhood(policies, setup):
+    """
+    Policy combinations that differ from the given one by a unit step of s, S or both in one item.
+
+    Parameters:
+        policies (numpy.ndarray): Policy combination of shape (num_items, 3).
+        setup (dict): Dictionary containing setup parameters ('max_s' and 'max_S').
+
+    Returns:
+        numpy.ndarray: Feasible neighbours, of shape (num_neighbours, num_items, 3).
+    """
+    steps = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (1, 1)]
+    neighbours = []
+    for i in range(len(policies)):
+        for step_s, step_S in steps:
+            s = policies[i, 1] + step_s
+            S = policies[i, 2] + step_S
+            if 1 <= s <= setup['max_s'] and s < S <= setup['max_S']:
+                neighbour = policies.copy()
+                neighbour[i, 1:] = s, S
+                neighbours.append(neighbour)
+    return np.array(neighbours, dtype=np.int64).reshape(-1, *policies.shape)
+
+def local_search(policies, metrics_row, evaluator, scenarios, setup, max_steps):
+    """
+    Improve a policy combination by steepest descent over its neighbourhood.
+
+    Every neighbour differs in one item, so the incremental evaluator only simulates that item.
+
+    Parameters:
+        policies (numpy.ndarray): Policy combination of shape (num_items, 3).
+        metrics_row (numpy.ndarray): Its metrics on the scenarios.
+        evaluator (IncrementalEvaluator): Evaluator holding the trajectories of the scenarios.
+        scenarios (tuple): Common demand scenarios from generate_scenarios.
+        setup (dict): Dictionary containing setup parameters.
+        max_steps (int): Maximum number of moves.
+
+    Returns:
+        tuple: (improved policy combination, its metrics)
+    """
+    for _ in range(max_steps):
+        neighbours = neighbourhood(policies, setup)
+        if len(neighbours) == 0:
+            break
+        neighbour_metrics = evaluator.evaluate(neighbours, scenarios, setup)
+        best = np.argmin(neighbour_metrics[:, 0])
+        if neighbour_metrics[best, 0] >= metrics_row[0]:
+            break  # Local optimum
+        policies, metrics_row = neighbours[best], neighbour_metrics[best]
+    return policies, metrics_row
+
+def polish_elites(population, metrics, demand_distribution, setup, scenarios, num_elites, max_steps):
+    """
+    Apply local search to the best policy combinations of an evaluated population.
+
+    Parameters:
+        population (numpy.ndarray): Policy combinations of shape (pop_size, num_items, 3).
+        metrics (numpy.ndarray): Their metrics on the scenarios, of shape (pop_size, 5).
+        demand_distribution (numpy.ndarray): Empirical demand distribution for items.
+        setup (dict): Dictionary containing setup parameters.
+        scenarios (tuple): Common demand scenarios the population was evaluated against.
+        num_elites (int): Number of best policy combinations to polish.
+        max_steps (int): Maximum number of local search moves per policy combination.
+
+    Returns:
+        tuple: (population, metrics) with the elites replaced by their polished versions.
+    """
+    if scenarios is None:
+        raise ValueError("Polishing needs common scenarios; set scenario_mode to 'fixed' or 'generation'")
+
+    evaluator = incremental_evaluator(demand_distribution, setup)
+    population, metrics = population.copy(), metrics.copy()
+    for k in np.argsort(metrics[:, 0], kind='stable')[:num_elites]:
+        population[k], metrics[k] = local_search(population[k], metrics[k], evaluator, scenarios, setup, max_steps)
+    return population, metrics
+
+def incremental_evaluator(demand_distribution, setup):
+    """
+    Incremental evaluator of the demand data and trajectory parameters of a problem, reused across calls
+    so its trajectory cache is kept. Problems that only differ in container or order parameters, such as
+    neighbouring sweep points, share an evaluator; pass their setup to evaluate.
+
+    Parameters:
+        demand_distribution (numpy.ndarray): Empirical demand distribution for items.
+        setup (dict): Dictionary containing setup parameters.
+
+    Returns:
+        IncrementalEvaluator: The evaluator of this demand data and setup.
+    """
+    problem = setup_hash(demand_distribution, setup, TRAJECTORY_KEYS)
+    if problem not in _evaluators:
+        _evaluators[problem] = IncrementalEvaluator(setup)
+        while len(_evaluators) > MAX_EVALUATORS:
+            _evaluators.popitem(last=False)
+    _evaluators.move_to_end(problem)
+    return _evaluators[problem]
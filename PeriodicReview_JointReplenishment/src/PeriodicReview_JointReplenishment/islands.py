@@ -0,0 +1,213 @@
+import os
+import time
+import traceback
+import multiprocessing
+import numpy as np
+from src.PeriodicReview_JointReplenishment.evaluator import PopulationEvaluator
+from src.PeriodicReview_JointReplenishment.fitness_cache import FitnessCache, setup_hash, warn_without_fixed_scenarios
+from src.PeriodicReview_JointReplenishment.scenarios import generate_scenarios, scenarios_for_generation
+from src.PeriodicReview_JointReplenishment.genetic_algorithm import (initialize_population_array, evaluate_population, crossover_array,
+                                                                     mutate_array, select_parents, generation_size, default_callbacks,
+                                                                     reject_options)
+
+# Options of genetic_algorithm that the islands do not implement
+UNSUPPORTED_OPTIONS = ['resume', 'checkpoint_path', 'archive_path', 'telemetry_path', 'surrogate', 'polish_elites']
+
+def migrate(population, metrics, migrants, migrant_metrics):
+    """
+    Replace the worst policy combinations of an island with migrants from another island.
+
+    Parameters:
+        population (numpy.ndarray): Population of the island, of shape (pop_size, num_items, 3).
+        metrics (numpy.ndarray): Metrics of the population, of shape (pop_size, 5).
+        migrants (numpy.ndarray): Incoming policy combinations.
+        migrant_metrics (numpy.ndarray): Metrics of the incoming policy combinations.
+
+    Returns:
+        tuple: (population, metrics) with the migrants in place of the worst policy combinations.
+    """
+    worst = np.argsort(metrics[:, 0], kind='stable')[len(metrics) - len(migrants):]
+    population, metrics = population.copy(), metrics.copy()
+    population[worst] = migrants
+    metrics[worst] = migrant_metrics
+    return population, metrics
+
+def run_island(index, demand_distribution, setup, seed_sequence, fixed_scenarios, inbox, outbox, messages):
+    """
+    Run the genetic algorithm on one island. Runs in its own process.
+
+    Every 'migration_interval' generations the island sends copies of its best policy combinations
+    to outbox and replaces its worst ones with the migrants waiting in inbox. Progress and the final
+    population are reported on messages. With 'cache_size' set the island keeps its own fitness cache,
+    backed by its own file next to 'cache_path'.
+
+    Parameters:
+        index (int): Index of the island.
+        demand_distribution (numpy.ndarray): Empirical demand distribution for items.
+        setup (dict): Setup parameters of the island.
+        seed_sequence (numpy.random.SeedSequence): Seed of the island.
+        fixed_scenarios (tuple or None): Scenarios shared by all islands in 'fixed' scenario mode.
+        inbox, outbox, messages (multiprocessing.Queue): Channels for incoming migrants, outgoing migrants and reports.
+    """
+    try:
+        pop_size = setup['pop_size']
+        num_generations = setup['num_generations']
+        migration_interval = setup.get('migration_interval', 5)
+        num_migrants = setup.get('num_migrants', 2)
+
+        rng = np.random.default_rng(seed_sequence.spawn(1)[0])
+        population = initialize_population_array(pop_size, setup['num_items'], setup, rng)
+        scored_population, scored_metrics = population[:0], np.zeros((0, 5))
+
+        cache = None
+        if setup.get('cache_size', 0) > 0:
+            cache_path = setup.get('cache_path')
+            if cache_path:
+                root, extension = os.path.splitext(cache_path)
+                cache_path = f'{root}_island{index + 1}{extension}'
+            cache = FitnessCache(setup['cache_size'], setup_hash(demand_distribution, setup), cache_path)
+
+        with PopulationEvaluator(demand_distribution, setup) as evaluator:
+            for generation in range(num_generations):
+                current_pop_size, num_parents = generation_size(pop_size, generation, setup)
+                start_time = time.time()
+
+                generation_seed = seed_sequence.spawn(1)[0]
+                scenarios = scenarios_for_generation(demand_distribution, setup, generation_seed, fixed_scenarios)
+                metrics, _ = evaluate_population(population, demand_distribution, setup, scenarios, generation_seed, evaluator, cache, num_parents)
+
+                # Exchange the best policy combinations with the neighbouring islands before selection
+                if (generation + 1) % migration_interval == 0 and generation + 1 < num_generations:
+                    best = np.argsort(metrics[:, 0], kind='stable')[:num_migrants]
+                    outbox.put((population[best], metrics[best]))
+                    population, metrics = migrate(population, metrics, *inbox.get())
+
+                ranking = np.argsort(metrics[:, 0], kind='stable')[:num_parents]
+                parents = population[ranking]
+                offspring = crossover_array(parents, current_pop_size - num_parents, rng)
+                offspring = mutate_array(offspring, setup['mutation_rate'], setup, rng)
+                scored_population, scored_metrics = population, metrics
+                population = np.concatenate([parents, offspring])
+
+                best_policy = (parents[0].tolist(), *metrics[ranking[0]].tolist())
+                cache_counters = cache.take_counters() if cache is not None else None
+                messages.put(('generation', index, generation, best_policy, time.time() - start_time, cache_counters))
+
+        if cache is not None:
+            cache.close()
+        messages.put(('done', index, scored_population, scored_metrics))
+    except Exception:
+        messages.put(('error', index, traceback.format_exc()))
+
+def island_model(demand_distribution, setup, callbacks=None):
+    """
+    Run the genetic algorithm as several islands in separate processes, with migration between them.
+
+    The islands form a ring: every 'migration_interval' generations, each island sends its best
+    'num_migrants' policy combinations to the next island. Between migrations the islands evolve
+    independently, so the work spreads over the cores without a barrier in every generation.
+    Each island evaluates its own population in its process.
+
+    Parameters:
+        demand_distribution (numpy.ndarray): Empirical demand distribution for items.
+        setup (dict): Dictionary containing setup parameters:
+            - 'num_islands' (int): Number of islands.
+            - 'pop_size' (int): Total population size, split evenly over the islands (at least 100 per island).
+            - 'migration_interval' (int, optional): Number of generations between migrations. Defaults to 5.
+            - 'num_migrants' (int, optional): Number of policy combinations sent per migration. Defaults to 2.
+            - 'cache_size' (int, optional), 'cache_path' (str, optional): As for genetic_algorithm; each island
+              keeps its own cache, and its own file with '_island<k>' added to the name.
+            Resuming, checkpoints, the archive, telemetry, the surrogate and elite polishing are not supported;
+            setting them raises a ValueError.
+        callbacks (list, optional): Callables called with a progress dictionary after every generation,
+            once all islands completed it (see callbacks.py). Defaults as for genetic_algorithm.
+
+    Returns:
+        list: A list of the best policy combinations over all islands, in the format returned by genetic_algorithm.
+    """
+    reject_options(setup, UNSUPPORTED_OPTIONS, 'island')
+    warn_without_fixed_scenarios(setup)
+    num_islands = setup['num_islands']
+    num_generations = setup['num_generations']
+    island_setup = dict(setup, pop_size=setup['pop_size'] // num_islands, max_workers=0, plot=False)
+
+    # Seed everything from one sequence; all islands share the fixed scenarios, so migrant costs are comparable
+    seed_sequence = np.random.SeedSequence(setup.get('seed'))
+    fixed_seed = seed_sequence.spawn(1)[0]
+    fixed_scenarios = None
+    if setup.get('scenario_mode') == 'fixed':
+        fixed_scenarios = generate_scenarios(demand_distribution, setup, np.random.default_rng(fixed_seed))
+
+    if callbacks is None:
+        callbacks = default_callbacks(setup)
+
+    # Island k receives its migrants from island k - 1
+    context = multiprocessing.get_context(setup.get('start_method'))
+    inboxes = [context.Queue() for _ in range(num_islands)]
+    messages = context.Queue()
+    processes = [context.Process(target=run_island, args=(k, np.asarray(demand_distribution), island_setup, island_seed, fixed_scenarios,
+                                                          inboxes[k], inboxes[(k + 1) % num_islands], messages), daemon=True)
+                 for k, island_seed in enumerate(seed_sequence.spawn(num_islands))]
+    for process in processes:
+        process.start()
+
+    cost_progression = []
+    service_level_progression = []
+    reports = {}  # Best policies and times of generations that not every island completed yet
+    final = {}
+    try:
+        while len(final) < num_islands:
+            message = messages.get()
+            if message[0] == 'error':
+                raise RuntimeError(f"Island {message[1]} failed:\n{message[2]}")
+            if message[0] == 'done':
+                final[message[1]] = message[2:]
+                continue
+
+            _, _, generation, best_policy, generation_time, cache_counters = message
+            reports.setdefault(generation, []).append((best_policy, generation_time, cache_counters))
+            if len(reports[generation]) < num_islands:
+                continue
+
+            # Report a generation once every island completed it, with the best policy over the islands
+            island_reports = reports.pop(generation)
+            best_policy = min((policy for policy, _, _ in island_reports), key=lambda policy: policy[1])
+            generation_time = max(seconds for _, seconds, _ in island_reports)
+            cache_hits, cache_lookups = None, None
+            if island_reports[0][2] is not None:
+                cache_hits = sum(hits for _, _, (hits, _) in island_reports)
+                cache_lookups = cache_hits + sum(misses for _, _, (_, misses) in island_reports)
+            cost_progression.append(best_policy[1])
+            service_level_progression.append(best_policy[2])
+            progress = {
+                'generation': generation + 1,
+                'num_generations': num_generations,
+                'cost_progression': cost_progression,
+                'service_level_progression': service_level_progression,
+                'best_policy': best_policy,
+                'generation_time': generation_time,
+                'cache_hits': cache_hits,
+                'cache_lookups': cache_lookups
+            }
+            for callback in callbacks:
+                callback(progress)
+    finally:
+        for process in processes:
+            if process.is_alive() and len(final) < num_islands:
+                process.terminate()
+            process.join()
+
+    for callback in callbacks:
+        if hasattr(callback, 'close'):
+            callback.close()
+
+    if setup.get('plot', True):
+        from src.PeriodicReview_JointReplenishment.graph import static_plot
+        static_plot(cost_progression, service_level_progression, len(cost_progression), 'GeneticAlgorithm_Convergence.png')
+
+    # Pool the last generation of every island and return the best policies
+    fitness_scores = [(policies, *row) for k in range(num_islands)
+                      for policies, row in zip(final[k][0].tolist(), final[k][1].tolist())]
+    _, num_parents = generation_size(setup['pop_size'], num_generations - 1, setup)
+
+    return select_parents(fitness_scores, num_parents)
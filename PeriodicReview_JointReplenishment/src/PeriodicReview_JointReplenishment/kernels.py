@@ -0,0 +1,141 @@
+import numpy as np
+
+# Compiled kernel, built on first use so Numba is only imported when the backend is selected
+_compiled_kernel = None
+
+def path_kernel(r, s, S, initial_inventory, demand, pallet_volume, holding_cost, backorder_cost,
+                order_cost, container_volume, lead_time, warm_up, num_samples):
+    """
+    Simulate one demand path on typed arrays, with the same bookkeeping as simulation.simulate_path.
+
+    Written in the subset of Python that Numba compiles; it also runs uncompiled.
+
+    Parameters:
+        r, s, S (numpy.ndarray): Review period, reorder point and order-up-to level per item (int64).
+        initial_inventory (numpy.ndarray): Initial inventory per item (float64).
+        demand (numpy.ndarray): 2D array of demand per item and period, covering warm-up and samples (float64).
+        pallet_volume (numpy.ndarray): Pallet volume per item (float64).
+        holding_cost, backorder_cost, order_cost, container_volume (float): Cost and container parameters.
+        lead_time, warm_up, num_samples (int): Horizon parameters.
+
+    Returns:
+        tuple: (average total cost per sample, service level, container fill rate, periodicity, containers per order)
+    """
+    num_items = r.shape[0]
+    inventory_level = initial_inventory.copy()
+    inventory_position = initial_inventory.copy()
+
+    # Pipeline inventory as a ring buffer indexed by period
+    pipeline_inventory = np.zeros((num_items, lead_time))
+
+    total_cost = 0.0
+    total_demand = 0.0
+    total_demand_met = 0.0
+    total_containers = 0.0
+    total_orders = 0
+    container_fill_rate = 0.0
+
+    for period in range(warm_up + num_samples):
+        counting = period >= warm_up  # Do not count costs in warm-up!
+        j = period - warm_up if counting else period
+        arrival_slot = period % lead_time
+        order_slot = (period + lead_time - 1) % lead_time
+
+        for i in range(num_items):
+            period_demand = demand[i, period]
+
+            if counting:
+                total_demand += period_demand
+            inventory_position[i] -= period_demand
+            inventory_level[i] -= pipeline_inventory[i, arrival_slot] - period_demand
+
+            if counting:
+                if inventory_level[i] >= period_demand:
+                    total_demand_met += period_demand
+                else:
+                    total_demand_met += max(0.0, inventory_level[i])  # Partial demand fulfillment
+                    total_cost += (period_demand - inventory_level[i]) * backorder_cost
+
+            # Review inventory when in a review period
+            if j % r[i] == 0 and inventory_position[i] <= s[i]:
+                order_quantity = S[i] - inventory_position[i]
+                inventory_position[i] += order_quantity
+                pipeline_inventory[i, order_slot] += order_quantity
+
+        if counting:
+            # Add holding costs
+            for i in range(num_items):
+                if inventory_level[i] > 1:
+                    total_cost += inventory_level[i] * holding_cost
+
+            # Add ordering costs
+            ordered = False
+            total_volume = 0.0
+            for i in range(num_items):
+                if pipeline_inventory[i, order_slot] != 0:
+                    ordered = True
+                total_volume += pallet_volume[i] * pipeline_inventory[i, order_slot]
+
+            if ordered:
+                containers = np.ceil(total_volume / container_volume)
+                total_cost += containers * order_cost
+
+                # Update container fill rate, total container and order counter metrics
+                total_orders += 1
+                total_containers += containers
+                container_fill_rate += total_volume / (container_volume * containers)
+
+        # Update pipeline inventory
+        for i in range(num_items):
+            pipeline_inventory[i, arrival_slot] = 0.0
+
+    # Calculate the metrics
+    service_level = 100 * (total_demand_met / total_demand) if total_demand > 0 else 1.0
+    containers_per_order = total_containers / total_orders if total_orders > 0 else 0.0
+    container_fill_rate = container_fill_rate / total_containers if total_orders > 0 else 0.0
+    periodicity = total_orders / num_samples
+    total_cost = total_cost / num_samples
+
+    return total_cost, service_level, container_fill_rate, periodicity, containers_per_order
+
+def compiled_kernel():
+    """
+    Compile path_kernel with Numba on first use.
+
+    Returns:
+        callable or None: The compiled kernel, or None when Numba is not installed.
+    """
+    global _compiled_kernel
+    if _compiled_kernel is None:
+        try:
+            import numba
+        except ImportError:
+            return None
+        _compiled_kernel = numba.njit(cache=True)(path_kernel)
+    return _compiled_kernel
+
+def compiled_simulate_path(policies, setup, initial_inventory, demand):
+    """
+    Simulate the inventory policy along a single demand path with the compiled kernel.
+
+    Takes the same arguments as simulation.simulate_path and returns the same metrics.
+
+    Parameters:
+        policies (list): List of policy combinations for each item.
+        setup (dict): Dictionary containing setup parameters.
+        initial_inventory (numpy.ndarray): Initial inventory for each item.
+        demand (numpy.ndarray): 2D array of demand per item (rows) and period (columns), covering warm-up and samples.
+
+    Returns:
+        tuple: (average total cost per sample, service level, container fill rate, periodicity, containers per order)
+    """
+    num_items = setup['num_items']
+    policies = np.asarray(policies, dtype=np.int64)[:num_items]
+    kernel = compiled_kernel()
+    metrics = kernel(np.ascontiguousarray(policies[:, 0]), np.ascontiguousarray(policies[:, 1]), np.ascontiguousarray(policies[:, 2]),
+                     np.asarray(initial_inventory[:num_items], dtype=np.float64),
+                     np.ascontiguousarray(demand[:num_items], dtype=np.float64),
+                     np.asarray(setup['pallet_volume'][:num_items], dtype=np.float64),
+                     float(setup['holding_cost']), float(setup['backorder_cost']), float(setup['order_cost']),
+                     float(setup['container_volume']), int(setup['lead_time']), int(setup['warm_up']), int(setup['num_samples']))
+    return tuple(np.float64(value) for value in metrics)
@@ -1,31 +1,85 @@
 import os
 import sys
+import json
+import argparse
 
 # Add the project root directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from PeriodicReview_JointReplenishment.demand import load_historic_demand, create_empirical_distribution
 from PeriodicReview_JointReplenishment.simulation import load_setup
-from PeriodicReview_JointReplenishment.genetic_algorithm import genetic_algorithm
+
+# The optimizers are imported in main when they are used: worker processes started with the spawn
+# start method import this module again, and should only load what the simulation needs
 
 def main():
+    parser = argparse.ArgumentParser(description='Optimize joint replenishment (r, s, S) policies with a genetic algorithm.')
+    parser.add_argument('--resume', action='store_true', help="Continue from the checkpoint at 'checkpoint_path' in the setup")
+    parser.add_argument('--sweep', metavar='GRID', help="JSON file mapping setup parameters to lists of values; optimizes every "
+                                                        "combination and writes sweep_results.csv")
+    parser.add_argument('--serve', action='store_true', help="Run a local HTTP service that evaluates policies on request instead "
+                                                             "of the genetic algorithm")
+    parser.add_argument('--rolling', action='store_true', help="Re-plan after new demand periods: seed the population from the "
+                                                               "policies saved at 'policies_path' and stop once they stop improving")
+    args = parser.parse_args()
+
     # Load demand data and setup configuration
     demand_data = load_historic_demand('data/sample_data.csv')
     setup = load_setup('data/setup.json')
+    if args.resume:
+        setup['resume'] = True
     num_cores = os.cpu_count()
     print(f"Number of CPU cores available: {num_cores}")
 
     # Create the empirical demand distribution
     demand_distribution = create_empirical_distribution(demand_data, setup)
+
+    if args.sweep:
+        from PeriodicReview_JointReplenishment.sweep import run_sweep
+        with open(args.sweep, 'r') as file:
+            grid = json.load(file)
+        run_sweep(demand_distribution, setup, grid, 'sweep_results.csv')
+        return
+    if args.serve:
+        from PeriodicReview_JointReplenishment.server import serve
+        serve(demand_distribution, setup)
+        return
     
-    # Run the genetic algorithm to get the best policies
-    best_policies = genetic_algorithm(demand_distribution, setup)
+    # Run the genetic algorithm to get the best policies, per item group, on islands or steady-state when configured
+    group_results = []
+    if args.rolling:
+        from PeriodicReview_JointReplenishment.rolling import rolling_optimization
+        best_policies = rolling_optimization(demand_distribution, setup)
+    elif setup.get('item_groups'):
+        from PeriodicReview_JointReplenishment.groups import optimize_groups
+        best_policies, group_results = optimize_groups(demand_distribution, setup)
+    elif setup.get('num_islands', 1) > 1:
+        from PeriodicReview_JointReplenishment.islands import island_model
+        best_policies = island_model(demand_distribution, setup)
+    elif setup.get('ga_mode', 'generational') == 'pareto':
+        from PeriodicReview_JointReplenishment.pareto import pareto_front
+        best_policies = pareto_front(demand_distribution, setup)
+    elif setup.get('ga_mode', 'generational') == 'steady_state':
+        from PeriodicReview_JointReplenishment.steady_state import steady_state
+        best_policies = steady_state(demand_distribution, setup)
+    else:
+        from PeriodicReview_JointReplenishment.genetic_algorithm import genetic_algorithm
+        best_policies = genetic_algorithm(demand_distribution, setup)
+
+    # Save the best policies for the next rolling run; rolling_optimization saves its own
+    if not args.rolling:
+        from PeriodicReview_JointReplenishment.rolling import save_policies
+        save_policies(setup.get('policies_path') or 'best_policies.json', best_policies)
 
     # Save the best policies to a .txt file
     with open('best_policies.txt', 'w') as file:
         file.write("Best Policies, Costs, and Service Levels:\n")
         for policies, cost, service_level, container_fill_rate, periodicity, containers_per_order in best_policies:
             file.write(f"Policies: {policies}, Cost = {cost:.2f}, Service Level = {service_level:.2f}%, Fill Rate = {container_fill_rate:.2f}, Periodicity = {periodicity:.3f}, Containers per Order = {containers_per_order:.2f}\n")
+        for name, items, group_policies in group_results:
+            file.write(f"\n{name} (items {items}):\n")
+            for policies, cost, service_level, container_fill_rate, periodicity, containers_per_order in group_policies:
+                file.write(f"Policies: {policies}, Cost = {cost:.2f}, Service Level = {service_level:.2f}%, Fill Rate = {container_fill_rate:.2f}, Periodicity = {periodicity:.3f}, Containers per Order = {containers_per_order:.2f}\n")
     
     # Print the top 10 best policies along with their costs and service levels
     print("Top 10 Best Policies, Costs, and Service Levels:")
@@ -0,0 +1,226 @@
+import time
+import numpy as np
+from src.PeriodicReview_JointReplenishment.evaluator import PopulationEvaluator
+from src.PeriodicReview_JointReplenishment.fitness_cache import FitnessCache, setup_hash, warn_without_fixed_scenarios
+from src.PeriodicReview_JointReplenishment.scenarios import generate_scenarios, scenarios_for_generation
+from src.PeriodicReview_JointReplenishment.genetic_algorithm import (initialize_population_array, crossover_array, mutate_array,
+                                                                     evaluate_population, default_callbacks)
+
+def pareto_objectives(metrics):
+    """
+    Objectives of the Pareto search, both minimized: cost and the negated service level.
+
+    Parameters:
+        metrics (numpy.ndarray): Metrics of shape (pop_size, 5), as returned by evaluate_population.
+
+    Returns:
+        numpy.ndarray: Objectives of shape (pop_size, 2).
+    """
+    return np.column_stack((metrics[:, 0], -metrics[:, 1]))
+
+def non_dominated_fronts(objectives):
+    """
+    Sort points into non-dominated fronts, minimizing both objectives.
+
+    The points are visited in order of the first objective, so a point can only be dominated by points
+    already placed. Within a front the second objective then decreases, so the last point added to a
+    front is the only one that needs to be compared, and the front of a point is found by binary search
+    over the fronts. This takes O(n log n) instead of the O(n^2) comparisons of the NSGA-II sort.
+
+    Parameters:
+        objectives (numpy.ndarray): Objectives of shape (num_points, 2).
+
+    Returns:
+        numpy.ndarray: Front of each point; 0 is the Pareto front, 1 the front dominated only by it, and so on.
+    """
+    objectives = np.asarray(objectives, dtype=np.float64)
+    fronts = np.empty(len(objectives), dtype=np.int64)
+    last = []  # Objectives of the last point added to each front
+
+    for k in np.lexsort((objectives[:, 1], objectives[:, 0])).tolist():
+        first, second = objectives[k].tolist()
+        low, high = 0, len(last)
+        while low < high:
+            middle = (low + high) // 2
+            last_first, last_second = last[middle]
+            if last_second < second or (last_second == second and last_first < first):
+                low = middle + 1  # Dominated by this front, so it belongs to a later one
+            else:
+                high = middle
+        if low == len(last):
+            last.append((first, second))
+        else:
+            last[low] = (first, second)
+        fronts[k] = low
+
+    return fronts
+
+def crowding_distance(objectives, fronts):
+    """
+    Crowding distance of each point within its front: the normalized size of the box between its neighbours.
+
+    Parameters:
+        objectives (numpy.ndarray): Objectives of shape (num_points, num_objectives).
+        fronts (numpy.ndarray): Front of each point, from non_dominated_fronts.
+
+    Returns:
+        numpy.ndarray: Crowding distance of each point; the extremes of a front get infinity.
+    """
+    distance = np.zeros(len(objectives))
+    order = np.argsort(fronts, kind='stable')
+    for members in np.split(order, np.flatnonzero(np.diff(fronts[order])) + 1):
+        for values in objectives[members].T:
+            ranking = np.argsort(values, kind='stable')
+            sorted_values = values[ranking]
+            span = sorted_values[-1] - sorted_values[0]
+            if span > 0:
+                distance[members[ranking[1:-1]]] += (sorted_values[2:] - sorted_values[:-2]) / span
+            distance[members[ranking[[0, -1]]]] = np.inf
+    return distance
+
+def survival_order(fronts, distance):
+    """
+    Order of preference of the points: by front, and within a front the least crowded first.
+
+    Returns:
+        numpy.ndarray: Indices of the points, most preferred first.
+    """
+    return np.lexsort((-distance, fronts))
+
+def tournament_selection(fronts, distance, num_selected, rng):
+    """
+    Binary tournaments: of two random points, the one in the better front wins, or the less crowded one on a tie.
+
+    Parameters:
+        fronts (numpy.ndarray): Front of each point.
+        distance (numpy.ndarray): Crowding distance of each point.
+        num_selected (int): Number of tournaments.
+        rng (numpy.random.Generator): Random generator of the search.
+
+    Returns:
+        numpy.ndarray: Indices of the winners.
+    """
+    first = rng.integers(0, len(fronts), size=num_selected)
+    second = rng.integers(0, len(fronts), size=num_selected)
+    first_wins = (fronts[first] < fronts[second]) | ((fronts[first] == fronts[second]) & (distance[first] >= distance[second]))
+    return np.where(first_wins, first, second)
+
+def front_policies(population, metrics, fronts):
+    """
+    Distinct policy combinations of the Pareto front, in the format returned by genetic_algorithm.
+
+    Returns:
+        list: Tuples of policies and metrics, sorted by cost.
+    """
+    front = {}
+    for k in np.flatnonzero(fronts == 0):
+        policies = population[k].tolist()
+        front.setdefault(str(policies), (policies, *metrics[k].tolist()))
+    return sorted(front.values(), key=lambda scores: scores[1])
+
+def pareto_front(demand_distribution, setup, callbacks=None):
+    """
+    Search the trade-off between cost and service level in one run, NSGA-II style.
+
+    Every generation the population is sorted into non-dominated fronts on cost and service level.
+    Half of it survives, chosen by front and then by crowding distance, so the survivors spread along
+    the front; the other half are offspring of binary tournaments among the survivors, made with the
+    crossover and mutation operators of the genetic algorithm. Survivors are evaluated again with the
+    offspring, as in genetic_algorithm. Racing and the analytical cost screen rank on cost alone, so they are
+    not used here.
+
+    Parameters:
+        demand_distribution (numpy.ndarray): Empirical demand distribution for items.
+        setup (dict): Dictionary containing setup parameters, as for genetic_algorithm:
+            - 'pop_size' (int), 'num_generations' (int), 'mutation_rate' (float): The population size is kept
+              constant; 'decay_rate' and 'parent_fraction' are not used.
+            - 'plot' (bool, optional): Save a plot of the Pareto front after the run. Defaults to True.
+        callbacks (list, optional): Callables called with a progress dictionary after every generation (see callbacks.py);
+            the reported best policy is the cheapest one on the front. Defaults to a progress bar.
+
+    Returns:
+        list: The distinct policy combinations of the Pareto front of the last generation, in the format returned
+            by genetic_algorithm, sorted by cost (and so by service level).
+    """
+    pop_size = setup['pop_size']
+    num_generations = setup['num_generations']
+    mutation_rate = setup['mutation_rate']
+    num_survivors = max(2, pop_size // 2)
+
+    # Seeded as in genetic_algorithm: fixed scenarios, then the operators, then the demand of each generation
+    seed_sequence = np.random.SeedSequence(setup.get('seed'))
+    fixed_seed = seed_sequence.spawn(1)[0]
+    rng = np.random.default_rng(seed_sequence.spawn(1)[0])
+    population = initialize_population_array(pop_size, setup['num_items'], setup, rng)
+
+    fixed_scenarios = None
+    if setup.get('scenario_mode') == 'fixed':
+        fixed_scenarios = generate_scenarios(demand_distribution, setup, np.random.default_rng(fixed_seed))
+
+    cache = None
+    if setup.get('cache_size', 0) > 0:
+        warn_without_fixed_scenarios(setup)
+        cache = FitnessCache(setup['cache_size'], setup_hash(demand_distribution, setup), setup.get('cache_path'))
+
+    if callbacks is None:
+        callbacks = default_callbacks(dict(setup, live_plot=False))
+
+    cost_progression = []  # Cost of the cheapest policy on the front of each generation
+    service_level_progression = []  # Its service level
+
+    with PopulationEvaluator(demand_distribution, setup) as evaluator:
+        for generation in range(num_generations):
+            start_time = time.time()
+
+            generation_seed = seed_sequence.spawn(1)[0]
+            scenarios = scenarios_for_generation(demand_distribution, setup, generation_seed, fixed_scenarios)
+            metrics, _ = evaluate_population(population, demand_distribution, setup, scenarios, generation_seed, evaluator, cache)
+            scored_population, scored_metrics = population, metrics
+
+            objectives = pareto_objectives(metrics)
+            fronts = non_dominated_fronts(objectives)
+            distance = crowding_distance(objectives, fronts)
+            scored_fronts = fronts
+
+            survivors = survival_order(fronts, distance)[:num_survivors]
+            mating_pool = survivors[tournament_selection(fronts[survivors], distance[survivors], pop_size - num_survivors, rng)]
+            offspring = crossover_array(population[mating_pool], pop_size - num_survivors, rng)
+            offspring = mutate_array(offspring, mutation_rate, setup, rng)
+            population = np.concatenate([population[survivors], offspring])
+
+            front = np.flatnonzero(fronts == 0)
+            cheapest = front[np.argmin(metrics[front, 0])]
+            cost_progression.append(metrics[cheapest, 0])
+            service_level_progression.append(metrics[cheapest, 1])
+
+            cache_hits, cache_lookups = None, None
+            if cache is not None:
+                cache_hits, cache_misses = cache.take_counters()
+                cache_lookups = cache_hits + cache_misses
+            progress = {
+                'generation': generation + 1,
+                'num_generations': num_generations,
+                'cost_progression': cost_progression,
+                'service_level_progression': service_level_progression,
+                'best_policy': (scored_population[cheapest].tolist(), *metrics[cheapest].tolist()),
+                'generation_time': time.time() - start_time,
+                'cache_hits': cache_hits,
+                'cache_lookups': cache_lookups
+            }
+            for callback in callbacks:
+                callback(progress)
+
+    for callback in callbacks:
+        if hasattr(callback, 'close'):
+            callback.close()
+
+    if cache is not None:
+        cache.close()
+
+    front = front_policies(scored_population, scored_metrics, scored_fronts)
+
+    if setup.get('plot', True):
+        from src.PeriodicReview_JointReplenishment.graph import front_plot
+        front_plot(front, 'Pareto_Front.png')
+
+    return front
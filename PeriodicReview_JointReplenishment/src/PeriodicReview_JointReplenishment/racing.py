@@ -0,0 +1,70 @@
+import numpy as np
+from src.PeriodicReview_JointReplenishment.batch_simulation import BatchSimulation
+
+def race_population(demand_distribution, population, setup, num_survivors, rng=None, scenarios=None):
+    """
+    Evaluate a population in horizon segments, dropping candidates that are clearly worse than the survivors.
+
+    After each segment, the running cost of every remaining candidate is summarised by the mean and
+    standard error of its segment costs (batch means). A candidate is eliminated when the lower
+    confidence bound of its cost lies above the upper bound of the num_survivors-th best candidate,
+    so at least num_survivors candidates always run the full horizon.
+
+    Parameters:
+        demand_distribution (numpy.ndarray or list): Empirical demand distribution for items.
+        population (list): List of policy combinations.
+        setup (dict): Dictionary containing setup parameters:
+            - 'racing_segments' (int, optional): Number of segments the horizon is split into. Defaults to 8.
+            - 'racing_confidence' (float, optional): Width of the confidence bounds in standard errors. Defaults to 2.0.
+        num_survivors (int): Number of candidates that must be evaluated on the full horizon, e.g. the number of parents.
+        rng (numpy.random.Generator, optional): Random generator used to sample demand. Defaults to None.
+        scenarios (tuple, optional): Common demand scenarios every policy is evaluated against. Defaults to None.
+
+    Returns:
+        tuple: (2D array of shape (pop_size, 5) with the metrics of each candidate over the periods it was simulated,
+                1D boolean array marking the candidates simulated on the full horizon)
+    """
+    num_segments = setup.get('racing_segments', 8)
+    confidence = setup.get('racing_confidence', 2.0)
+    num_samples = setup['num_samples']
+    pop_size = len(population)
+
+    metrics = np.zeros((pop_size, 5))
+    completed = np.zeros(pop_size, dtype=bool)
+    segment_costs = np.zeros((pop_size, num_segments))
+
+    simulation = BatchSimulation(demand_distribution, population, setup, rng, scenarios)
+    simulation.advance(setup['warm_up'])
+
+    boundaries = np.linspace(0, num_samples, num_segments + 1).round().astype(int)
+    for segment in range(num_segments):
+        segment_length = boundaries[segment + 1] - boundaries[segment]
+        cost_before = simulation.total_cost.copy()
+        simulation.advance(segment_length)
+
+        # Average cost per period of the segment, for each remaining candidate
+        candidates = np.unique(simulation.candidate)
+        row_costs = (simulation.total_cost - cost_before) / max(1, segment_length)
+        segment_costs[candidates, segment] = row_costs.reshape(len(candidates), -1).mean(axis=1)
+
+        # Eliminate only between segments, once there are enough segment costs to estimate the spread
+        if segment < 1 or segment == num_segments - 1 or len(candidates) <= num_survivors:
+            continue
+
+        running_costs = segment_costs[candidates, :segment + 1]
+        mean_cost = running_costs.mean(axis=1)
+        standard_error = running_costs.std(axis=1, ddof=1) / np.sqrt(segment + 1)
+        upper_bound = mean_cost + confidence * standard_error
+        threshold = np.partition(upper_bound, num_survivors - 1)[num_survivors - 1]
+        eliminated = mean_cost - confidence * standard_error > threshold
+
+        if eliminated.any():
+            # Keep the partial-horizon metrics of the eliminated candidates
+            metrics[candidates[eliminated]] = simulation.candidate_metrics()[1][eliminated]
+            simulation.keep(np.repeat(~eliminated, simulation.num_replications))
+
+    candidates, survivor_metrics = simulation.candidate_metrics()
+    metrics[candidates] = survivor_metrics
+    completed[candidates] = True
+
+    return metrics, completed
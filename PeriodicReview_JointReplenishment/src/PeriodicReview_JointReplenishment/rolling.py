@@ -0,0 +1,113 @@
+import os
+import json
+import numpy as np
+from src.PeriodicReview_JointReplenishment.batch_simulation import policies_to_array
+from src.PeriodicReview_JointReplenishment.genetic_algorithm import genetic_algorithm, initialize_population_array
+
+# Generations without improvement after which a rolling run stops, when 'early_stop_generations' is not set
+ROLLING_EARLY_STOP = 3
+
+def save_policies(path, best_policies):
+    """
+    Save the best policy combinations of a run, to seed the next rolling run.
+
+    Parameters:
+        path (str): JSON file, replaced when it exists.
+        best_policies (list): Best policy combinations with their metrics, as returned by genetic_algorithm.
+    """
+    policies = [{'policies': policies, 'cost': cost, 'service_level': service_level}
+                for policies, cost, service_level, *_ in best_policies]
+    temporary_path = f'{path}.tmp'
+    with open(temporary_path, 'w') as file:
+        json.dump({'best_policies': policies}, file)
+    os.replace(temporary_path, path)
+
+def load_policies(path):
+    """
+    Load policy combinations saved by save_policies.
+
+    Returns:
+        list: Policy combinations, best first.
+    """
+    with open(path, 'r') as file:
+        policies = [entry['policies'] for entry in json.load(file)['best_policies']]
+    if not policies:
+        raise ValueError(f"No saved policies in {path}")
+    return policies
+
+def perturbed_population(seed_policies, pop_size, setup, rng):
+    """
+    Build a first population around saved policy combinations.
+
+    The population holds the saved combinations, copies of them with s and S of every item moved by
+    up to 'rolling_step' units, and a share of random combinations that keeps the search open for
+    larger changes in demand.
+
+    Parameters:
+        seed_policies (list or numpy.ndarray): Saved policy combinations, best first.
+        pop_size (int): Size of the population.
+        setup (dict): Dictionary containing setup parameters:
+            - 'num_items' (int), 'r' (int), 'max_s' (int), 'max_S' (int): As for initialize_population_array.
+            - 'rolling_step' (int, optional): Largest change of s and S in a perturbed copy. Defaults to 2.
+            - 'rolling_random_fraction' (float, optional): Fraction of the rest of the population drawn at random. Defaults to 0.2.
+        rng (numpy.random.Generator): Random generator used for the perturbations.
+
+    Returns:
+        numpy.ndarray: Population of shape (pop_size, num_items, 3).
+    """
+    num_items = setup['num_items']
+    step = setup.get('rolling_step', 2)
+
+    if len(seed_policies) == 0:
+        raise ValueError("A rolling population needs at least one saved policy combination")
+    seeds = policies_to_array(seed_policies)
+    if seeds.shape[1] != num_items:
+        raise ValueError(f"Saved policies are for {seeds.shape[1]} items, the setup has {num_items}")
+    seeds = seeds[:pop_size]
+
+    population = initialize_population_array(pop_size, num_items, setup, rng)
+    population[:len(seeds)] = seeds
+
+    num_perturbed = int((pop_size - len(seeds)) * (1 - setup.get('rolling_random_fraction', 0.2)))
+    perturbed = seeds[rng.integers(0, len(seeds), size=num_perturbed)]
+    s = np.clip(perturbed[:, :, 1] + rng.integers(-step, step + 1, size=(num_perturbed, num_items)), 1, setup['max_s'])
+    S = np.clip(perturbed[:, :, 2] + rng.integers(-step, step + 1, size=(num_perturbed, num_items)), s + 1, setup['max_S'])
+    perturbed[:, :, 1], perturbed[:, :, 2] = s, S
+    population[len(seeds):len(seeds) + num_perturbed] = perturbed
+
+    return population
+
+def rolling_optimization(demand_distribution, setup, callbacks=None):
+    """
+    Re-optimize the policies after new demand periods arrived, starting from the last saved best policies.
+
+    The saved policies are usually close to the new optimum, so the population is seeded around them
+    (see perturbed_population) and the run stops once the elites stop improving, after a few generations
+    instead of a full run. Without saved policies this is a normal run. The best policies are saved
+    again for the next rolling run.
+
+    Parameters:
+        demand_distribution (numpy.ndarray): Empirical demand distribution for items.
+        setup (dict): Dictionary containing setup parameters:
+            - 'policies_path' (str, optional): JSON file of the saved best policies. Defaults to 'best_policies.json'.
+            - 'early_stop_generations' (int, optional): As for genetic_algorithm. Defaults to ROLLING_EARLY_STOP.
+            - 'rolling_step', 'rolling_random_fraction': As for perturbed_population.
+        callbacks (list, optional): As for genetic_algorithm.
+
+    Returns:
+        list: A list of the best policy combinations, as returned by genetic_algorithm.
+    """
+    policies_path = setup.get('policies_path') or 'best_policies.json'
+    rolling_setup = dict(setup, early_stop_generations=setup.get('early_stop_generations') or ROLLING_EARLY_STOP)
+
+    initial_population = None
+    if os.path.exists(policies_path):
+        rng = np.random.default_rng(setup.get('seed'))
+        initial_population = perturbed_population(load_policies(policies_path), setup['pop_size'], setup, rng)
+        print(f"Seeding the population from {policies_path}")
+    else:
+        print(f"No saved policies found at {policies_path}, starting from a random population")
+
+    best_policies = genetic_algorithm(demand_distribution, rolling_setup, callbacks=callbacks, initial_population=initial_population)
+    save_policies(policies_path, best_policies)
+    return best_policies
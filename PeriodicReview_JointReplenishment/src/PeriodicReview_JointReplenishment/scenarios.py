@@ -0,0 +1,113 @@
+import numpy as np
+
+def demand_history(demand_distribution, num_items):
+    """
+    Pad the per-item demand histories into a single array so they can be sampled together.
+
+    Parameters:
+        demand_distribution (numpy.ndarray or list): Empirical demand distribution for items.
+        num_items (int): Number of items.
+
+    Returns:
+        tuple: (2D array of padded demand histories, 1D array of history lengths per item)
+    """
+    rows = [np.asarray(demand_distribution[i]) for i in range(num_items)]
+    history_lengths = np.array([len(row) for row in rows])
+    history = np.zeros((num_items, history_lengths.max()), dtype=np.result_type(*rows))
+    for i, row in enumerate(rows):
+        history[i, :len(row)] = row
+
+    if np.any(history < 0):
+        raise ValueError("demand cannot be negative!")
+
+    return history, history_lengths
+
+def sample_demand(history, history_lengths, rng, shape):
+    """
+    Sample demand for every item by picking historic periods uniformly at random.
+
+    Parameters:
+        history (numpy.ndarray): Padded demand histories from demand_history.
+        history_lengths (numpy.ndarray): Number of historic periods per item.
+        rng (numpy.random.Generator): Random generator used for sampling.
+        shape (tuple): Leading shape of the sample; the item axis is appended last.
+
+    Returns:
+        numpy.ndarray: Array of shape shape + (num_items,) with sampled demand.
+    """
+    picks = (rng.random(tuple(shape) + (len(history_lengths),)) * history_lengths).astype(np.int64)
+    return history[np.arange(len(history_lengths)), picks]
+
+def generate_scenarios(demand_distribution, setup, rng, num_replications=None):
+    """
+    Draw common demand scenarios that every candidate policy is evaluated against.
+
+    Parameters:
+        demand_distribution (numpy.ndarray or list): Empirical demand distribution for items.
+        setup (dict): Dictionary containing setup parameters:
+            - 'num_replications' (int, optional): Number of scenarios to draw. Defaults to 1.
+        rng (numpy.random.Generator): Random generator used for sampling.
+        num_replications (int, optional): Overrides 'num_replications' in setup. Defaults to None.
+
+    Returns:
+        tuple: (2D array of initial inventory with shape (replications, items),
+                3D array of demand with shape (replications, items, warm_up + num_samples))
+    """
+    num_items = setup['num_items']
+    lead_time = setup['lead_time']
+    num_periods = setup['warm_up'] + setup['num_samples']
+    if num_replications is None:
+        num_replications = setup.get('num_replications', 1)
+
+    history, history_lengths = demand_history(demand_distribution, num_items)
+
+    # Widen compact demand dtypes so inventory arithmetic on the samples cannot overflow
+    dtype = np.result_type(history.dtype, np.int64)
+
+    # Initial inventory is the demand over two lead times, as in a cold-started simulation
+    initial_inventory = sample_demand(history, history_lengths, rng, (num_replications, 2 * lead_time)).sum(axis=1, dtype=dtype)
+    demand = sample_demand(history, history_lengths, rng, (num_replications, num_periods)).transpose(0, 2, 1)
+
+    return initial_inventory, np.ascontiguousarray(demand, dtype=dtype)
+
+def spawn_generators(seed_sequence, count):
+    """
+    Create independent random generators, e.g. one per worker task.
+
+    Parameters:
+        seed_sequence (numpy.random.SeedSequence): Parent seed sequence.
+        count (int): Number of generators to create.
+
+    Returns:
+        list: A list of numpy.random.Generator with non-overlapping streams.
+    """
+    return [np.random.default_rng(child) for child in seed_sequence.spawn(count)]
+
+def scenarios_for_generation(demand_distribution, setup, generation_seed, fixed_scenarios=None):
+    """
+    Select the demand scenarios a generation is evaluated against.
+
+    Parameters:
+        demand_distribution (numpy.ndarray or list): Empirical demand distribution for items.
+        setup (dict): Dictionary containing setup parameters:
+            - 'scenario_mode' (str, optional): 'independent' to let every candidate draw its own demand,
+              'generation' to share freshly drawn scenarios within each generation,
+              or 'fixed' to reuse the same scenarios for the whole run. Defaults to 'independent'.
+        generation_seed (numpy.random.SeedSequence): Seed sequence of the current generation.
+        fixed_scenarios (tuple, optional): Scenarios drawn once for the run in 'fixed' mode. Defaults to None.
+
+    Returns:
+        tuple or None: Scenarios from generate_scenarios, or None when candidates draw their own demand.
+    """
+    scenario_mode = setup.get('scenario_mode', 'independent')
+
+    if scenario_mode == 'independent':
+        return None
+    elif scenario_mode == 'generation':
+        return generate_scenarios(demand_distribution, setup, np.random.default_rng(generation_seed))
+    elif scenario_mode == 'fixed':
+        if fixed_scenarios is None:
+            raise ValueError("fixed_scenarios must be provided when scenario_mode is 'fixed'")
+        return fixed_scenarios
+    else:
+        raise ValueError(f"Unknown scenario_mode '{scenario_mode}'")
@@ -0,0 +1,261 @@
+import json
+import time
+import asyncio
+import numpy as np
+from src.PeriodicReview_JointReplenishment.evaluator import PopulationEvaluator
+from src.PeriodicReview_JointReplenishment.batch_simulation import policies_to_array
+from src.PeriodicReview_JointReplenishment.scenarios import generate_scenarios, scenarios_for_generation
+from src.PeriodicReview_JointReplenishment.sweep import METRIC_COLUMNS
+
+# Largest request body accepted, in bytes
+MAX_BODY_SIZE = 1 << 20
+
+class RequestError(Exception):
+    """
+    A request the server cannot evaluate; answered with 400 Bad Request.
+    """
+
+class EvaluationServer:
+    """
+    Resident HTTP service that scores (r, s, S) policy combinations on demand.
+
+    The demand data and the worker pool are set up once when the server starts. Requests that arrive
+    while a batch is being simulated, or within 'server_batch_window' seconds of each other, are merged
+    into a single evaluation of the pool, so concurrent planners share one round trip to the workers.
+
+    Endpoints, on localhost:
+        POST /evaluate with a JSON body {"policies": [[r, s, S], ...]} for one policy combination, or
+            {"population": [[[r, s, S], ...], ...]} for several. Answers {"metrics": [{"cost": ..., "service_level": ...,
+            "container_fill_rate": ..., "periodicity": ..., "containers_per_order": ...}, ...]}.
+        GET /health answers {"status": "ok"} with the number of evaluations and batches so far.
+
+    In 'fixed' scenario mode every request is scored on the same demand scenarios, so repeated
+    requests give identical answers and policies can be compared without noise.
+    """
+
+    def __init__(self, demand_distribution, setup):
+        """
+        Parameters:
+            demand_distribution (numpy.ndarray): Empirical demand distribution for items.
+            setup (dict): Dictionary containing setup parameters:
+                - 'server_host' (str, optional): Interface to listen on. Defaults to '127.0.0.1'.
+                - 'server_port' (int, optional): Port to listen on; 0 picks a free port. Defaults to 8765.
+                - 'server_batch_window' (float, optional): Seconds to wait for more requests before a batch is
+                  evaluated. Defaults to 0.005.
+                - 'server_max_batch' (int, optional): Maximum number of policy combinations per batch. Defaults to 1024.
+        """
+        self.demand_distribution = demand_distribution
+        self.setup = setup
+        self.batch_window = setup.get('server_batch_window', 0.005)
+        self.max_batch = setup.get('server_max_batch', 1024)
+        self.evaluator = None
+        self.queue = None
+        self.batch_task = None
+
+        # Scenarios are drawn from one seed sequence, as in genetic_algorithm
+        self.seed_sequence = np.random.SeedSequence(setup.get('seed'))
+        self.fixed_scenarios = None
+        if setup.get('scenario_mode') == 'fixed':
+            self.fixed_scenarios = generate_scenarios(demand_distribution, setup, np.random.default_rng(self.seed_sequence.spawn(1)[0]))
+
+        self.evaluations = 0
+        self.batches = 0
+
+    def parse_population(self, body):
+        """
+        Read the policy combinations of a request body.
+
+        Returns:
+            numpy.ndarray: Policy combinations of shape (pop_size, num_items, 3).
+        """
+        try:
+            request = json.loads(body)
+            population = request['population'] if 'population' in request else [request['policies']]
+            population = policies_to_array(population)
+        except (ValueError, TypeError, KeyError) as error:
+            raise RequestError(f"Expected a JSON object with 'policies' or 'population': {error}")
+
+        num_items = self.setup['num_items']
+        if population.shape[1] != num_items:
+            raise RequestError(f"Expected policies for {num_items} items, got {population.shape[1]}")
+        if np.any(population[:, :, 0] < 1) or np.any(population[:, :, 1] >= population[:, :, 2]):
+            raise RequestError("Every policy needs r >= 1 and s < S")
+        return population
+
+    async def evaluate(self, population):
+        """
+        Queue policy combinations for the next batch and wait for their metrics.
+
+        Returns:
+            numpy.ndarray: 2D array of shape (pop_size, 5) with the metrics of each policy combination.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((population, future))
+        return await future
+
+    async def batch_loop(self):
+        """
+        Merge queued requests into batches and evaluate them on the worker pool, one batch at a time.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            requests = [await self.queue.get()]
+            size = len(requests[0][0])
+
+            # Collect the requests that arrive within the batch window
+            deadline = loop.time() + self.batch_window
+            while size < self.max_batch:
+                timeout = deadline - loop.time()
+                try:
+                    if timeout > 0:
+                        request = await asyncio.wait_for(self.queue.get(), timeout)
+                    else:
+                        request = self.queue.get_nowait()  # Requests that queued up during the last batch
+                except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                    break
+                requests.append(request)
+                size += len(request[0])
+
+            population = np.concatenate([population for population, _ in requests])
+            scenarios = scenarios_for_generation(self.demand_distribution, self.setup, self.seed_sequence.spawn(1)[0], self.fixed_scenarios)
+            try:
+                # The pool is driven from a thread, so the server keeps accepting requests during the simulation
+                metrics = await loop.run_in_executor(None, self.evaluator.evaluate, population, scenarios, self.seed_sequence.spawn(1)[0])
+            except Exception as error:
+                for _, future in requests:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+
+            self.evaluations += len(population)
+            self.batches += 1
+            start = 0
+            for request_population, future in requests:
+                if not future.done():
+                    future.set_result(metrics[start:start + len(request_population)])
+                start += len(request_population)
+
+    async def respond(self, path, method, body):
+        """
+        Answer a request.
+
+        Returns:
+            tuple: (HTTP status, JSON-serializable response)
+        """
+        if path == '/health' and method == 'GET':
+            return 200, {'status': 'ok', 'evaluations': self.evaluations, 'batches': self.batches}
+        if path != '/evaluate':
+            return 404, {'error': f"Unknown path '{path}'"}
+        if method != 'POST':
+            return 405, {'error': "Use POST for /evaluate"}
+
+        try:
+            population = self.parse_population(body)
+        except RequestError as error:
+            return 400, {'error': str(error)}
+
+        start_time = time.perf_counter()
+        metrics = await self.evaluate(population)
+        return 200, {'metrics': [dict(zip(METRIC_COLUMNS, row)) for row in metrics.tolist()],
+                     'seconds': time.perf_counter() - start_time}
+
+    async def handle_connection(self, reader, writer):
+        """
+        Serve one HTTP/1.1 connection; requests on a connection are answered in order.
+        """
+        reasons = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large',
+                   500: 'Internal Server Error'}
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY_SIZE:
+                    status, response = 413, {'error': f"Request bodies are limited to {MAX_BODY_SIZE} bytes"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length)
+                    keep_alive = headers.get('connection', '').lower() != 'close'
+                    try:
+                        status, response = await self.respond(path.split('?')[0], method, body)
+                    except Exception as error:
+                        status, response = 500, {'error': str(error)}
+
+                payload = json.dumps(response).encode()
+                writer.write(f"HTTP/1.1 {status} {reasons[status]}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(payload)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode())
+                writer.write(payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+            pass  # Malformed request or client gone
+        finally:
+            writer.close()
+
+    async def start(self):
+        """
+        Start the worker pool, the batch loop and the listening socket.
+
+        Returns:
+            asyncio.Server: The listening server; its sockets give the bound address.
+        """
+        self.evaluator = PopulationEvaluator(self.demand_distribution, self.setup).__enter__()
+        self.queue = asyncio.Queue()
+        self.batch_task = asyncio.create_task(self.batch_loop())
+
+        # Evaluate one policy so the workers are started and warm before the first request
+        warm_up_policy = [[self.setup['r'], 1, 2]] * self.setup['num_items']
+        await self.evaluate(policies_to_array(warm_up_policy))
+
+        return await asyncio.start_server(self.handle_connection, self.setup.get('server_host', '127.0.0.1'),
+                                          self.setup.get('server_port', 8765))
+
+    async def stop(self, server):
+        """
+        Stop listening and release the worker pool.
+        """
+        server.close()
+        await server.wait_closed()
+        self.batch_task.cancel()
+        try:
+            await self.batch_task
+        except asyncio.CancelledError:
+            pass
+        self.evaluator.close()
+
+    async def serve_forever(self):
+        """
+        Serve requests until the task is cancelled, e.g. by Ctrl+C.
+        """
+        server = await self.start()
+        host, port = server.sockets[0].getsockname()[:2]
+        print(f"Evaluation server listening on http://{host}:{port}")
+        try:
+            await server.serve_forever()
+        finally:
+            await self.stop(server)
+
+def serve(demand_distribution, setup):
+    """
+    Run the evaluation server until interrupted.
+
+    Parameters:
+        demand_distribution (numpy.ndarray): Empirical demand distribution for items.
+        setup (dict): Dictionary containing setup parameters (see EvaluationServer).
+    """
+    try:
+        asyncio.run(EvaluationServer(demand_distribution, setup).serve_forever())
+    except KeyboardInterrupt:
+        print("Evaluation server stopped")
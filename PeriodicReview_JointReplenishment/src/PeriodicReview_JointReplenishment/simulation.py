@@ -1,5 +1,8 @@
 import numpy as np
 import json
+import warnings
+from src.PeriodicReview_JointReplenishment.scenarios import generate_scenarios
+from src.PeriodicReview_JointReplenishment.kernels import compiled_kernel, compiled_simulate_path
 
 def load_setup(file_path):
     """
@@ -29,7 +32,49 @@ def is_factor(a, b):
     """
     return b % a == 0
 
-def simulate_policy(demand_distribution, policies, setup):
+def format_demand_distribution(demand_distribution):
+    """
+    Convert a demand distribution into a form that can be sampled per item.
+    
+    Parameters:
+        demand_distribution (numpy.ndarray or list): Empirical demand distribution for items,
+            either as an array or as a list of semicolon-separated strings.
+    
+    Returns:
+        numpy.ndarray or list: The demand distribution with one sequence of demand values per item.
+    """
+    if isinstance(demand_distribution, list) and isinstance(demand_distribution[0], str):
+        return [list(map(float, dist.split(';'))) for dist in demand_distribution]
+    elif isinstance(demand_distribution, np.ndarray):
+        return demand_distribution
+    else:
+        raise ValueError("demand_distribution is not in a recognizable format")
+
+def select_backend(setup):
+    """
+    Select the kernel that simulates a single demand path.
+    
+    Parameters:
+        setup (dict): Dictionary containing setup parameters:
+            - 'simulation_backend' (str, optional): 'python' for the reference simulate_path, or 'numba'
+              for the compiled kernel. Falls back to 'python' when Numba is not installed. Defaults to 'python'.
+    
+    Returns:
+        callable: A function with the signature of simulate_path.
+    """
+    backend = setup.get('simulation_backend', 'python')
+
+    if backend == 'python':
+        return simulate_path
+    elif backend == 'numba':
+        if compiled_kernel() is None:
+            warnings.warn("Numba is not installed, falling back to the python simulation backend")
+            return simulate_path
+        return compiled_simulate_path
+    else:
+        raise ValueError(f"Unknown simulation_backend '{backend}'")
+
+def simulate_policy(demand_distribution, policies, setup, scenarios=None, rng=None):
     """
     Simulate the inventory policy to calculate the total cost based on demand distribution.
     
@@ -37,9 +82,39 @@ def simulate_policy(demand_distribution, policies, setup):
         demand_distribution (numpy.ndarray or list): Empirical demand distribution for items.
         policies (list): List of policy combinations for each item.
         setup (dict): Dictionary containing setup parameters.
+        scenarios (tuple, optional): Common demand scenarios from generate_scenarios. When None,
+            a single demand path is drawn for this policy. Defaults to None.
+        rng (numpy.random.Generator, optional): Random generator used when drawing a demand path. Defaults to None.
     
     Returns:
-        tuple: (average total cost per sample, service level)
+        tuple: (average total cost per sample, service level, container fill rate, periodicity, containers per order),
+            averaged over the scenarios
+    """
+    if scenarios is None:
+        # Ensure that demand_distribution is in the correct format
+        demand_distribution = format_demand_distribution(demand_distribution)
+        if rng is None:
+            rng = np.random.default_rng()
+        scenarios = generate_scenarios(demand_distribution, setup, rng, num_replications=1)
+
+    initial_inventory, demand = scenarios
+    simulate = select_backend(setup)
+    results = [simulate(policies, setup, initial_inventory[k], demand[k]) for k in range(len(demand))]
+
+    return tuple(np.mean(results, axis=0))
+
+def simulate_path(policies, setup, initial_inventory, demand):
+    """
+    Simulate the inventory policy along a single demand path.
+    
+    Parameters:
+        policies (list): List of policy combinations for each item.
+        setup (dict): Dictionary containing setup parameters.
+        initial_inventory (numpy.ndarray): Initial inventory for each item.
+        demand (numpy.ndarray): 2D array of demand per item (rows) and period (columns), covering warm-up and samples.
+    
+    Returns:
+        tuple: (average total cost per sample, service level, container fill rate, periodicity, containers per order)
     """
     holding_cost = setup['holding_cost']
     backorder_cost = setup['backorder_cost']
@@ -51,18 +126,9 @@ def simulate_policy(demand_distribution, policies, setup):
     pallet_volume = setup['pallet_volume']
     warm_up = setup['warm_up']
     
-    # Ensure that demand_distribution is in the correct format
-    if isinstance(demand_distribution, list) and isinstance(demand_distribution[0], str):
-        demand_distribution = [list(map(float, dist.split(';'))) for dist in demand_distribution]
-    elif isinstance(demand_distribution, np.ndarray):
-        pass
-    else:
-        raise ValueError("demand_distribution is not in a recognizable format")
-    
     # Initialize inventory for each item
-    initial_inventory = [np.sum(np.random.choice(demand_distribution[i], size= 2 * lead_time)) for i in range(num_items)]
-    inventory_level = initial_inventory[:]
-    inventory_position = initial_inventory[:]
+    inventory_level = list(initial_inventory)
+    inventory_position = list(initial_inventory)
     
     # Initialize pipeline inventory (2D array)
     pipeline_inventory = np.zeros((num_items, lead_time))
@@ -70,13 +136,10 @@ def simulate_policy(demand_distribution, policies, setup):
     # Warm-up period
     for j in range(warm_up):
         for i in range(num_items):
-            demand = np.random.choice(demand_distribution[i])
-
-            if demand < 0:
-                raise ValueError("demand cannot be negative!")
+            period_demand = demand[i, j]
 
-            inventory_level[i] -= pipeline_inventory[i,0] - demand
-            inventory_position[i] -= demand
+            inventory_level[i] -= pipeline_inventory[i,0] - period_demand
+            inventory_position[i] -= period_demand
 
             r, s, S = policies[i]
 
@@ -84,7 +147,7 @@ def simulate_policy(demand_distribution, policies, setup):
             if is_factor(r, j):
                 if inventory_position[i] <= s:
                     order_quantity = S - inventory_position[i]
-                    inventory_position += order_quantity
+                    inventory_position[i] += order_quantity
 
                     # Add order to pipeline inventory
                     pipeline_inventory[i, lead_time - 1] += order_quantity
@@ -105,20 +168,17 @@ def simulate_policy(demand_distribution, policies, setup):
 
     for j in range(num_samples):
         for i in range(num_items):
-            demand = np.random.choice(demand_distribution[i])
-
-            if demand < 0:
-                raise ValueError("demand cannot be negative!")
+            period_demand = demand[i, warm_up + j]
 
-            total_demand += demand
-            inventory_position[i] -= demand
-            inventory_level[i] -= pipeline_inventory[i,0] - demand
+            total_demand += period_demand
+            inventory_position[i] -= period_demand
+            inventory_level[i] -= pipeline_inventory[i,0] - period_demand
 
-            if inventory_level[i] >= demand:
-                total_demand_met += demand
+            if inventory_level[i] >= period_demand:
+                total_demand_met += period_demand
             else:
                 total_demand_met += max(0,inventory_level[i])  # Partial demand fulfillment
-                total_cost += (demand-inventory_level[i]) * backorder_cost # more like a penalty cost
+                total_cost += (period_demand-inventory_level[i]) * backorder_cost # more like a penalty cost
                 #inventory_level[i] = 0  # Set inventory level to zero
 
             r, s, S = policies[i]
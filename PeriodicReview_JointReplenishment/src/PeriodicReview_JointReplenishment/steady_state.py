@@ -0,0 +1,193 @@
+import time
+import concurrent.futures
+import numpy as np
+from src.PeriodicReview_JointReplenishment.evaluator import PopulationEvaluator
+from src.PeriodicReview_JointReplenishment.scenarios import generate_scenarios
+from src.PeriodicReview_JointReplenishment.genetic_algorithm import (initialize_population_array, crossover_array, mutate_array,
+                                                                     select_parents, default_callbacks, reject_options)
+
+# Options of the generational run that steady_state does not implement
+UNSUPPORTED_OPTIONS = ['resume', 'checkpoint_path', 'archive_path', 'cache_size', 'telemetry_path', 'surrogate', 'racing', 'analytical_mode']
+
+def insert_into_pool(pool_population, pool_metrics, pool_counts, population, metrics, pool_size):
+    """
+    Merge evaluated policy combinations into the elite pool, keeping the cheapest pool_size.
+
+    A policy combination already in the pool, or repeated within population, does not take another
+    place: its new metrics are averaged into its pool entry. With independent demand draws a lucky
+    first evaluation is so evened out each time the combination is bred again, instead of staying
+    in the pool for good.
+
+    Parameters:
+        pool_population (numpy.ndarray): Elite pool, sorted by cost, of shape (size, num_items, 3).
+        pool_metrics (numpy.ndarray): Metrics of the elite pool, of shape (size, 5).
+        pool_counts (numpy.ndarray): Number of evaluations averaged into each pool entry.
+        population (numpy.ndarray): Newly evaluated policy combinations.
+        metrics (numpy.ndarray): Metrics of the newly evaluated policy combinations.
+        pool_size (int): Maximum size of the pool.
+
+    Returns:
+        tuple: (pool population, pool metrics, pool counts), sorted by cost.
+    """
+    population = np.concatenate([pool_population, population])
+    totals = np.concatenate([pool_metrics * pool_counts[:, None], np.asarray(metrics, dtype=np.float64)])
+    counts = np.concatenate([pool_counts, np.ones(len(totals) - len(pool_counts), dtype=np.int64)])
+
+    # Index of the first occurrence of each policy combination, which collects the evaluations of its repeats
+    first = {}
+    occurrence = np.array([first.setdefault(policies.tobytes(), k) for k, policies in enumerate(population)], dtype=np.int64)
+    repeated = occurrence != np.arange(len(occurrence))
+    np.add.at(totals, occurrence[repeated], totals[repeated])
+    np.add.at(counts, occurrence[repeated], counts[repeated])
+    unique = np.flatnonzero(~repeated)
+
+    pool_population, pool_counts = population[unique], counts[unique]
+    pool_metrics = totals[unique] / pool_counts[:, None]
+
+    # The stable sort keeps earlier pool members ahead of newcomers of equal cost
+    ranking = np.argsort(pool_metrics[:, 0], kind='stable')[:pool_size]
+    return pool_population[ranking], pool_metrics[ranking], pool_counts[ranking]
+
+def steady_state(demand_distribution, setup, callbacks=None):
+    """
+    Run a steady-state genetic algorithm that breeds and submits new offspring as soon as a worker finishes.
+
+    There is no generation barrier: the workers always have tasks queued, and each finished task is
+    merged into an elite pool of 'pop_size' policy combinations that the next offspring are bred from.
+    The run stops on an evaluation budget or when the best cost stops improving.
+
+    Parameters:
+        demand_distribution (numpy.ndarray): Empirical demand distribution for items.
+        setup (dict): Dictionary containing setup parameters:
+            - 'pop_size' (int): Size of the initial population and of the elite pool.
+            - 'parent_fraction' (float): Fraction of the elite pool used as parents.
+            - 'evaluation_budget' (int, optional): Maximum number of evaluations. Defaults to pop_size * num_generations.
+            - 'convergence_evaluations' (int, optional): Stop when the best cost has not improved by more than
+              'convergence_tolerance' (relative) within this many evaluations. Defaults to None (run the whole budget).
+            - 'convergence_tolerance' (float, optional): Defaults to 0.
+            - 'steady_state_batch' (int, optional): Number of offspring per task. Defaults to 1.
+            - 'scenario_mode' (str, optional): 'independent' or 'fixed'; 'generation' has no meaning without generations.
+              A policy combination bred again is evaluated again and its metrics averaged (see insert_into_pool).
+            Checkpoints, the archive, the fitness cache, telemetry, the surrogate, racing, the analytical evaluator
+            and incremental evaluation are not supported; setting them raises a ValueError.
+        callbacks (list, optional): Callables called with a progress dictionary after every pop_size evaluations
+            (see callbacks.py). Defaults as for genetic_algorithm.
+
+    Returns:
+        list: A list of the best policy combinations, in the format returned by genetic_algorithm.
+    """
+    pop_size = setup['pop_size']
+    num_parents = max(1, int(pop_size * setup['parent_fraction']))
+    evaluation_budget = setup.get('evaluation_budget') or pop_size * setup['num_generations']
+    convergence_evaluations = setup.get('convergence_evaluations')
+    convergence_tolerance = setup.get('convergence_tolerance', 0)
+    batch_size = setup.get('steady_state_batch', 1)
+
+    scenario_mode = setup.get('scenario_mode', 'independent')
+    if scenario_mode not in ('independent', 'fixed'):
+        raise ValueError(f"scenario_mode '{scenario_mode}' is not supported in steady-state mode")
+    reject_options(setup, UNSUPPORTED_OPTIONS, 'steady-state')
+    if setup.get('evaluation_mode') == 'incremental':
+        raise ValueError("evaluation_mode 'incremental' is not supported in steady-state mode")
+
+    # Seed everything from one sequence, as in genetic_algorithm
+    seed_sequence = np.random.SeedSequence(setup.get('seed'))
+    fixed_seed = seed_sequence.spawn(1)[0]
+    rng = np.random.default_rng(seed_sequence.spawn(1)[0])
+    scenarios = None
+    if scenario_mode == 'fixed':
+        scenarios = generate_scenarios(demand_distribution, setup, np.random.default_rng(fixed_seed))
+
+    if callbacks is None:
+        callbacks = default_callbacks(setup)
+
+    initial_population = initialize_population_array(pop_size, setup['num_items'], setup, rng)
+    initial_chunks = [initial_population[start:start + batch_size] for start in range(0, pop_size, batch_size)]
+    initial_chunks.reverse()  # Submitted from the end of the list
+
+    pool_population = initial_population[:0]
+    pool_metrics = np.zeros((0, 5))
+    pool_counts = np.zeros(0, dtype=np.int64)
+    cost_progression = []
+    service_level_progression = []
+
+    evaluations = 0
+    submitted = 0
+    best_cost = np.inf
+    last_improvement = 0  # Number of evaluations at the last improvement of the best cost
+    next_report = pop_size
+    report_start_time = time.time()
+
+    with PopulationEvaluator(demand_distribution, setup) as evaluator:
+        # Keep two tasks queued per worker, so a worker never waits for the next one
+        max_in_flight = 2 * max(1, evaluator.max_workers)
+        in_flight = {}
+
+        def submit_next():
+            nonlocal submitted
+            # The last task is cut to the evaluations left in the budget
+            remaining = evaluation_budget - submitted
+            if initial_chunks:
+                chunk = initial_chunks.pop()[:remaining]
+            else:
+                # Breed from the current elite pool
+                parents = pool_population[:num_parents]
+                chunk = mutate_array(crossover_array(parents, min(batch_size, remaining), rng), setup['mutation_rate'], setup, rng)
+            in_flight[evaluator.submit(chunk, scenarios, seed_sequence.spawn(1)[0])] = chunk
+            submitted += len(chunk)
+
+        stopping = False
+        while True:
+            # Breeding needs parents, so until the pool holds some only the initial population is submitted
+            while (not stopping and len(in_flight) < max_in_flight and submitted < evaluation_budget
+                   and (initial_chunks or len(pool_population) >= num_parents)):
+                submit_next()
+            if not in_flight:
+                break
+
+            done, _ = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                chunk = in_flight.pop(future)
+                metrics = future.result()
+                pool_population, pool_metrics, pool_counts = insert_into_pool(pool_population, pool_metrics, pool_counts,
+                                                                              chunk, metrics, pop_size)
+                evaluations += len(chunk)
+
+                if pool_metrics[0, 0] < best_cost * (1 - convergence_tolerance):
+                    last_improvement = evaluations
+                best_cost = min(best_cost, pool_metrics[0, 0])
+
+            # Report progress once per pop_size evaluations, like a generation of genetic_algorithm
+            while evaluations >= next_report:
+                best_policy = (pool_population[0].tolist(), *pool_metrics[0].tolist())
+                cost_progression.append(best_policy[1])
+                service_level_progression.append(best_policy[2])
+                progress = {
+                    'generation': len(cost_progression),
+                    'num_generations': -(-evaluation_budget // pop_size),
+                    'cost_progression': cost_progression,
+                    'service_level_progression': service_level_progression,
+                    'best_policy': best_policy,
+                    'generation_time': time.time() - report_start_time,
+                    'cache_hits': None,
+                    'cache_lookups': None
+                }
+                for callback in callbacks:
+                    callback(progress)
+                report_start_time = time.time()
+                next_report += pop_size
+
+            # Stop submitting once converged; the tasks in flight are still collected
+            if convergence_evaluations is not None and evaluations - last_improvement >= convergence_evaluations:
+                stopping = True
+
+    for callback in callbacks:
+        if hasattr(callback, 'close'):
+            callback.close()
+
+    if setup.get('plot', True):
+        from src.PeriodicReview_JointReplenishment.graph import static_plot
+        static_plot(cost_progression, service_level_progression, len(cost_progression), 'GeneticAlgorithm_Convergence.png')
+
+    fitness_scores = [(policies, *row) for policies, row in zip(pool_population.tolist(), pool_metrics.tolist())]
+    return select_parents(fitness_scores, num_parents)
@@ -0,0 +1,110 @@
+import numpy as np
+
+class Surrogate:
+    """
+    Ridge regression of cost and service level on per-item features of the (r, s, S) policies.
+
+    The model keeps the sufficient statistics X'X and X'y of all evaluated policy combinations,
+    so refitting after each generation costs one small linear solve regardless of how many
+    evaluations were seen. Per item the features are s, S, their squares and 1 / (S - s + 1),
+    which follows the order frequency, all scaled by max_S.
+    """
+
+    def __init__(self, num_items, scale, ridge=1e-3):
+        """
+        Parameters:
+            num_items (int): Number of items.
+            scale (float): Scale of the policy levels, e.g. setup['max_S'].
+            ridge (float, optional): Ridge penalty of the regression. Defaults to 1e-3.
+        """
+        self.scale = scale
+        self.ridge = ridge
+        self.num_features = 1 + 5 * num_items
+        self.gram = np.zeros((self.num_features, self.num_features))
+        self.moments = np.zeros((self.num_features, 2))
+        self.num_observations = 0
+        self.weights = None
+
+    def features(self, population):
+        """
+        Parameters:
+            population (numpy.ndarray): Policy combinations of shape (pop_size, num_items, 3).
+
+        Returns:
+            numpy.ndarray: Feature matrix of shape (pop_size, num_features).
+        """
+        population = np.asarray(population, dtype=np.float64)
+        s = population[:, :, 1] / self.scale
+        S = population[:, :, 2] / self.scale
+        order_frequency = 1 / (np.maximum(population[:, :, 2] - population[:, :, 1], 0) + 1)
+        return np.hstack([np.ones((len(population), 1)), s, S, s ** 2, S ** 2, order_frequency])
+
+    @property
+    def ready(self):
+        """
+        Whether the model has seen enough evaluations to be fitted.
+        """
+        return self.num_observations >= 2 * self.num_features
+
+    def update(self, population, metrics):
+        """
+        Add evaluated policy combinations and refit the model.
+
+        Parameters:
+            population (numpy.ndarray): Evaluated policy combinations.
+            metrics (numpy.ndarray): Their metrics, of shape (pop_size, 5).
+        """
+        X = self.features(population)
+        self.gram += X.T @ X
+        self.moments += X.T @ np.asarray(metrics)[:, :2]
+        self.num_observations += len(X)
+
+        if self.ready:
+            penalty = self.ridge * np.eye(self.num_features)
+            penalty[0, 0] = 0  # The intercept is not penalised
+            self.weights = np.linalg.solve(self.gram + penalty, self.moments)
+
+    def predict(self, population):
+        """
+        Parameters:
+            population (numpy.ndarray): Policy combinations.
+
+        Returns:
+            numpy.ndarray: Predicted cost and service level, of shape (pop_size, 2).
+        """
+        return self.features(population) @ self.weights
+
+def screen_offspring(surrogate, offspring, keep_fraction, exploration_fraction, rng, num_selected=None):
+    """
+    Keep the offspring with the lowest predicted cost, plus a random share of the others.
+
+    The exploration quota keeps candidates the surrogate misjudges in the population, so the
+    model keeps learning about regions it currently predicts to be poor.
+
+    Parameters:
+        surrogate (Surrogate): Fitted surrogate model.
+        offspring (numpy.ndarray): Offspring of shape (num_offspring, num_items, 3).
+        keep_fraction (float): Fraction of the offspring kept by predicted cost.
+        exploration_fraction (float): Fraction of the offspring kept at random from the rest.
+        rng (numpy.random.Generator): Random generator of the genetic algorithm.
+        num_selected (int, optional): Number of offspring to keep, split between the promising and the explored
+            ones in the ratio of the two fractions. Defaults to the two fractions of the offspring.
+
+    Returns:
+        numpy.ndarray: The offspring passed on to the simulation, in their original order.
+    """
+    if num_selected is None:
+        num_keep = int(np.ceil(len(offspring) * keep_fraction))
+        num_explore = int(round(len(offspring) * exploration_fraction))
+    else:
+        num_selected = min(num_selected, len(offspring))
+        num_keep = min(int(np.ceil(num_selected * keep_fraction / (keep_fraction + exploration_fraction))), num_selected)
+        num_explore = num_selected - num_keep
+
+    ranking = np.argsort(surrogate.predict(offspring)[:, 0], kind='stable')
+    promising, rest = ranking[:num_keep], ranking[num_keep:]
+
+    num_explore = min(num_explore, len(rest))
+    explored = rng.choice(rest, size=num_explore, replace=False)
+
+    return offspring[np.sort(np.concatenate([promising, explored]))]
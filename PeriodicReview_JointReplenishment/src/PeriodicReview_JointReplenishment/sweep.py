@@ -0,0 +1,109 @@
+import os
+import csv
+import json
+import time
+import itertools
+from src.PeriodicReview_JointReplenishment.evaluator import PopulationEvaluator
+from src.PeriodicReview_JointReplenishment.genetic_algorithm import genetic_algorithm
+
+# Metric columns of the sweep table, in the order of the metrics returned by genetic_algorithm
+METRIC_COLUMNS = ['cost', 'service_level', 'container_fill_rate', 'periodicity', 'containers_per_order']
+
+def sweep_points(grid):
+    """
+    List every combination of the parameter values in the grid.
+
+    Parameters:
+        grid (dict): Setup parameter name -> list of values, e.g. {'order_cost': [2500, 5000], 'lead_time': [10, 20]}.
+
+    Returns:
+        list: One dictionary of parameter values per grid point; the last parameter varies fastest.
+    """
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+def grid_distance(first, second, grid):
+    """
+    Distance between two grid points, counted in steps along each parameter's list of values.
+    """
+    return sum(abs(grid[name].index(first[name]) - grid[name].index(second[name])) for name in grid)
+
+def nearest_point(point, finished, grid):
+    """
+    Index of the finished grid point nearest to a point, or None when none is finished.
+
+    Parameters:
+        point (dict): Grid point.
+        finished (list): Grid points that were already optimized.
+        grid (dict): Parameter grid, as for sweep_points.
+
+    Returns:
+        int or None: Index in finished; ties go to the earliest point.
+    """
+    if not finished:
+        return None
+    return min(range(len(finished)), key=lambda k: grid_distance(point, finished[k], grid))
+
+def write_table(path, rows):
+    """
+    Write the sweep results as a CSV table, replacing an earlier version of the file.
+    """
+    temporary_path = f'{path}.tmp'
+    with open(temporary_path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(temporary_path, path)
+
+def run_sweep(demand_distribution, setup, grid, output_path='sweep_results.csv'):
+    """
+    Optimize the policies for every point of a grid of setup parameters.
+
+    The demand data is loaded once and all points share one worker pool. Points run in grid order, and
+    each point's first population is seeded with the best policies of the nearest point already optimized,
+    so neighbouring configurations start warm. The table is rewritten after every point, so the results
+    of an interrupted sweep are kept.
+
+    Parameters:
+        demand_distribution (numpy.ndarray): Empirical demand distribution for items.
+        setup (dict): Dictionary containing the setup parameters shared by all points.
+        grid (dict): Setup parameter name -> list of values, e.g. 'order_cost', 'backorder_cost',
+            'container_volume' or 'lead_time'.
+        output_path (str, optional): CSV file with one row per point. Defaults to 'sweep_results.csv'.
+
+    Returns:
+        list: One row dictionary per point, as written to the table.
+    """
+    points = sweep_points(grid)
+    finished = []
+    best_policies = []
+    rows = []
+
+    with PopulationEvaluator(demand_distribution, setup) as evaluator:
+        for index, point in enumerate(points):
+            point_setup = dict(setup, **point, plot=False)
+
+            # Each point keeps its own checkpoint and archive next to the configured ones
+            for key in ('checkpoint_path', 'archive_path'):
+                if setup.get(key):
+                    root, extension = os.path.splitext(setup[key])
+                    point_setup[key] = f'{root}_point{index + 1}{extension}'
+
+            neighbour = nearest_point(point, finished, grid)
+            initial_population = [policies for policies, *_ in best_policies[neighbour]] if neighbour is not None else None
+
+            start_time = time.time()
+            point_policies = genetic_algorithm(demand_distribution, point_setup, callbacks=[],
+                                               initial_population=initial_population, evaluator=evaluator)
+            seconds = time.time() - start_time
+
+            finished.append(point)
+            best_policies.append(point_policies)
+            policies, *metrics = point_policies[0]
+            rows.append({'point': index + 1, **point, **dict(zip(METRIC_COLUMNS, metrics)),
+                         'warm_start': neighbour + 1 if neighbour is not None else '',
+                         'seconds': round(seconds, 3), 'policies': json.dumps(policies)})
+            write_table(output_path, rows)
+            print(f"Point {index + 1}/{len(points)} {point}: best cost = {metrics[0]:.2f} ({seconds:.1f} s)")
+
+    return rows
@@ -0,0 +1,160 @@
+import json
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Number of functions kept from each worker profile
+PROFILE_TOP_FUNCTIONS = 25
+
+def profile_summary(profile):
+    """
+    Summarise a cProfile profile as plain data that can be sent between processes and written as JSON.
+
+    Parameters:
+        profile (cProfile.Profile): A finished profile.
+
+    Returns:
+        list: Dictionaries with the function, call count, total time and cumulative time, by cumulative time.
+    """
+    import pstats
+    stats = pstats.Stats(profile).stats
+    summary = [{'function': f'{file_name}:{line}({function_name})', 'calls': calls, 'total_time': total_time, 'cumulative_time': cumulative_time}
+               for (file_name, line, function_name), (_, calls, total_time, cumulative_time, _) in stats.items()]
+    summary.sort(key=lambda entry: entry['cumulative_time'], reverse=True)
+    return summary[:PROFILE_TOP_FUNCTIONS]
+
+class Telemetry:
+    """
+    Record per-generation timings of the genetic algorithm and of the evaluation tasks, written as JSON lines.
+
+    Every generation produces one 'generation' event with the wall time of each phase, the evaluation
+    throughput and, for pool evaluations, per-task latency, queue wait and IPC payload sizes. When worker
+    profiling is on, the event also holds the merged cProfile summary of the simulations in the workers.
+    A Telemetry without a path is disabled and records nothing.
+
+    The genetic algorithm times the phases 'scenarios', 'evaluation', 'selection', 'crossover', 'mutation',
+    'polish', 'archive', 'surrogate', 'callbacks' and 'checkpoint'. Within 'evaluation', the evaluator times 'dispatch' (sharing scenarios and submitting
+    tasks) and 'simulation' (waiting for and collecting results). Queue wait runs from submission to the
+    start of a task in a worker, so it includes worker start-up in the first generation; result wait runs
+    from the end of a task to its collection in the calling process.
+    """
+
+    def __init__(self, path=None, profile_workers=False):
+        """
+        Parameters:
+            path (str, optional): JSON lines file the events are appended to. Defaults to None (disabled).
+            profile_workers (bool, optional): Profile the evaluation tasks with cProfile. Defaults to False.
+        """
+        self.enabled = path is not None
+        self.profile_workers = self.enabled and profile_workers
+        self.file = open(path, 'a') if self.enabled else None
+        self.reset()
+
+    def reset(self):
+        """
+        Start recording a new generation.
+        """
+        self.phases = defaultdict(float)
+        self.tasks = []
+        self.evaluations = 0
+        self.profiles = {}
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Time a phase of the current generation; repeated phases add up.
+
+        Parameters:
+            name (str): Name of the phase.
+        """
+        if not self.enabled:
+            yield
+            return
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] += time.perf_counter() - start_time
+
+    def record_task(self, task):
+        """
+        Record the statistics of an evaluation task.
+
+        Parameters:
+            task (dict): Statistics from the worker, extended with 'payload_bytes' and 'collected_at'.
+        """
+        self.evaluations += task['policies']
+        self.tasks.append(task)
+
+        # Merge the profile of the task into the generation's profile
+        for entry in task.pop('profile', None) or []:
+            merged = self.profiles.setdefault(entry['function'], dict(entry, calls=0, total_time=0.0, cumulative_time=0.0))
+            merged['calls'] += entry['calls']
+            merged['total_time'] += entry['total_time']
+            merged['cumulative_time'] += entry['cumulative_time']
+
+    def event(self, name, **fields):
+        """
+        Write a single event.
+
+        Parameters:
+            name (str): Name of the event.
+            **fields: Fields of the event; must be JSON serialisable.
+        """
+        if self.enabled:
+            self.file.write(json.dumps({'event': name, 'time': time.time(), **fields}, default=str) + '\n')
+            self.file.flush()
+
+    def end_generation(self, generation, population_size, **fields):
+        """
+        Write the 'generation' event of the current generation and start recording the next one.
+
+        Parameters:
+            generation (int): Number of completed generations.
+            population_size (int): Size of the evaluated population.
+            **fields: Additional fields of the event.
+        """
+        if not self.enabled:
+            return
+
+        simulation_time = self.phases.get('simulation', 0.0)
+        event = {
+            'generation': generation,
+            'population_size': population_size,
+            'phases': dict(self.phases),
+            'evaluations': self.evaluations,
+            'evaluations_per_second': self.evaluations / simulation_time if simulation_time > 0 else None
+        }
+
+        if self.tasks:
+            latency = [task['collected_at'] - task['submitted_at'] for task in self.tasks]
+            queue_wait = [task['started_at'] - task['submitted_at'] for task in self.tasks]
+            result_wait = [task['collected_at'] - task['finished_at'] for task in self.tasks]
+            workers = defaultdict(lambda: {'tasks': 0, 'busy_seconds': 0.0})
+            for task in self.tasks:
+                workers[task['worker']]['tasks'] += 1
+                workers[task['worker']]['busy_seconds'] += task['finished_at'] - task['started_at']
+            event['tasks'] = {
+                'count': len(self.tasks),
+                'latency_mean': sum(latency) / len(latency),
+                'latency_max': max(latency),
+                'queue_wait_mean': sum(queue_wait) / len(queue_wait),
+                'queue_wait_max': max(queue_wait),
+                'result_wait_mean': sum(result_wait) / len(result_wait),
+                'payload_bytes': sum(task['payload_bytes'] for task in self.tasks),
+                'result_bytes': sum(task['result_bytes'] for task in self.tasks),
+                'workers': {str(worker): stats for worker, stats in workers.items()}
+            }
+
+        if self.profiles:
+            profile = sorted(self.profiles.values(), key=lambda entry: entry['cumulative_time'], reverse=True)
+            event['profile'] = profile[:PROFILE_TOP_FUNCTIONS]
+
+        event.update(fields)
+        self.event('generation', **event)
+        self.reset()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,153 @@
+"""
+Entry point of the evaluation workers.
+
+Pool workers only unpickle the functions of this module, so it must stay light: it depends on NumPy and
+the simulation modules only. Under the spawn start method every worker imports it afresh, and any heavy
+import here (plotting, pandas, the genetic algorithm) would be paid again in each worker.
+"""
+import os
+import sys
+import time
+import pickle
+from multiprocessing import shared_memory
+import numpy as np
+from src.PeriodicReview_JointReplenishment.simulation import simulate_policy
+from src.PeriodicReview_JointReplenishment.batch_simulation import simulate_population
+
+# Per-worker state, set once by init_worker when the pool starts
+_worker_state = {}
+
+def attach_array(descriptor):
+    """
+    Attach to an array shared with share_array, without copying it.
+
+    Parameters:
+        descriptor (tuple): (name, shape, dtype) returned by share_array.
+
+    Returns:
+        tuple: (shared memory block, numpy.ndarray view of the block)
+    """
+    name, shape, dtype = descriptor
+    shared = shared_memory.SharedMemory(name=name)
+    return shared, np.ndarray(shape, dtype=dtype, buffer=shared.buf)
+
+def init_worker(demand_descriptor, setup):
+    """
+    Attach a pool worker to the shared demand data.
+
+    Parameters:
+        demand_descriptor (tuple): Descriptor of the shared demand array.
+        setup (dict): Dictionary containing setup parameters.
+    """
+    shared, demand = attach_array(demand_descriptor)
+    _worker_state['blocks'] = [shared]
+    _worker_state['demand'] = demand
+    _worker_state['setup'] = setup
+    _worker_state['scenarios'] = (None, None)
+
+def worker_scenarios(scenario_descriptors):
+    """
+    Return the scenarios of the current generation, attaching to their shared blocks on first use.
+
+    Parameters:
+        scenario_descriptors (tuple or None): Descriptors of the shared initial inventory and demand arrays,
+            followed by the version of the scenarios.
+
+    Returns:
+        tuple or None: Scenarios as returned by generate_scenarios.
+    """
+    if scenario_descriptors is None:
+        return None
+
+    cached_descriptors, scenarios = _worker_state['scenarios']
+    if cached_descriptors != scenario_descriptors:
+        blocks, arrays = zip(*[attach_array(descriptor) for descriptor in scenario_descriptors[:2]])
+        _worker_state['blocks'] = _worker_state['blocks'][:1] + list(blocks)
+        scenarios = tuple(arrays)
+        _worker_state['scenarios'] = (scenario_descriptors, scenarios)
+
+    return scenarios
+
+def evaluate_chunk(policies_chunk, scenario_descriptors, seeds, demand_distribution=None, setup=None):
+    """
+    Evaluate a chunk of policy combinations, either in a pool worker or in the calling process.
+
+    Parameters:
+        policies_chunk (list): Policy combinations to evaluate.
+        scenario_descriptors (tuple or None): Shared scenario descriptors, or the scenarios themselves when run in-process.
+        seeds (list): Seed sequences for the demand streams; one per policy in 'process' mode, one per chunk in 'batch' mode.
+        demand_distribution (numpy.ndarray, optional): Demand data when run in-process. Defaults to None.
+        setup (dict, optional): Setup parameters when run in-process, or in a worker when they differ from
+            the setup the pool was started with. Defaults to None.
+
+    Returns:
+        numpy.ndarray: 2D array with one row of five metrics per policy combination.
+    """
+    if demand_distribution is None:
+        demand_distribution = _worker_state['demand']
+        if setup is None:
+            setup = _worker_state['setup']
+        scenarios = worker_scenarios(scenario_descriptors)
+    else:
+        scenarios = scenario_descriptors
+
+    if setup.get('evaluation_mode', 'process') == 'batch':
+        return simulate_population(demand_distribution, policies_chunk, setup, np.random.default_rng(seeds[0]), scenarios)
+
+    # Plain ints keep the per-period loop of the reference simulation fast
+    policies_chunk = np.asarray(policies_chunk).tolist()
+    return np.array([simulate_policy(demand_distribution, policies, setup, scenarios, np.random.default_rng(seed))
+                     for policies, seed in zip(policies_chunk, seeds)])
+
+def timed_evaluate_chunk(submitted_at, profile, policies_chunk, scenario_descriptors, seeds, demand_distribution=None, setup=None):
+    """
+    Evaluate a chunk like evaluate_chunk, also returning timing statistics for telemetry.
+
+    Parameters:
+        submitted_at (float): Wall-clock time the task was submitted, used for the queue wait.
+        profile (bool): Profile the evaluation with cProfile.
+        policies_chunk, scenario_descriptors, seeds, demand_distribution, setup: As for evaluate_chunk.
+
+    Returns:
+        tuple: (metrics as returned by evaluate_chunk, dictionary of task statistics)
+    """
+    started_at = time.time()
+    profiler = None
+    if profile:
+        import cProfile  # Only profiled runs pay for the profiler
+        profiler = cProfile.Profile()
+    if profiler is not None:
+        metrics = profiler.runcall(evaluate_chunk, policies_chunk, scenario_descriptors, seeds, demand_distribution, setup)
+    else:
+        metrics = evaluate_chunk(policies_chunk, scenario_descriptors, seeds, demand_distribution, setup)
+    finished_at = time.time()
+
+    stats = {
+        'worker': os.getpid(),
+        'policies': len(policies_chunk),
+        'submitted_at': submitted_at,
+        'started_at': started_at,
+        'finished_at': finished_at,
+        'result_bytes': len(pickle.dumps(metrics)),
+        'profile': None
+    }
+    if profiler is not None:
+        from src.PeriodicReview_JointReplenishment.telemetry import profile_summary
+        stats['profile'] = profile_summary(profiler)
+    return metrics, stats
+
+def startup_probe(hold_seconds=0.0):
+    """
+    Report when and how a worker started, for the startup benchmark.
+
+    Parameters:
+        hold_seconds (float, optional): Time to keep the worker busy, so the next probes start other workers. Defaults to 0.
+
+    Returns:
+        dict: 'worker' (process id), 'started_at' (wall-clock time the probe ran), 'modules' (number of imported
+              modules) and 'heavy_modules' (plotting or dataframe packages that were imported).
+    """
+    started_at = time.time()
+    heavy_modules = sorted({name.split('.')[0] for name in sys.modules} & {'matplotlib', 'pandas', 'asyncio', 'numba'})
+    time.sleep(hold_seconds)
+    return {'worker': os.getpid(), 'started_at': started_at, 'modules': len(sys.modules), 'heavy_modules': heavy_modules}
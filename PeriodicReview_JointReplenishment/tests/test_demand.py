@@ -0,0 +1,78 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from src.PeriodicReview_JointReplenishment.demand import load_historic_demand, create_empirical_distribution
+
+class TestLoadHistoricDemand(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.directory, 'demand.csv')
+        self.write_csv([[0, 1, 2, 0], [3, 0, 0, 250]])
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_csv(self, rows):
+        with open(self.file_path, 'w') as file:
+            for row in rows:
+                file.write(';'.join(map(str, row)) + '\n')
+
+    def test_parses_semicolon_rows_into_compact_integers(self):
+        demand_data = load_historic_demand(self.file_path, use_cache=False)
+        np.testing.assert_array_equal(demand_data, [[0, 1, 2, 0], [3, 0, 0, 250]])
+        self.assertEqual(demand_data.dtype, np.uint8)
+
+    def test_second_load_memory_maps_the_cache(self):
+        load_historic_demand(self.file_path)
+        self.assertTrue(os.path.exists(self.file_path + '.npy'))
+        demand_data = load_historic_demand(self.file_path)
+        self.assertIsInstance(demand_data, np.memmap)
+        np.testing.assert_array_equal(demand_data, [[0, 1, 2, 0], [3, 0, 0, 250]])
+
+    def test_cache_is_invalidated_when_the_csv_changes(self):
+        load_historic_demand(self.file_path)
+        self.write_csv([[1, 1, 1, 1, 1], [2, 2, 2, 2, 2]])
+        os.utime(self.file_path, ns=(0, 0))  # Make sure the modification time differs from the cached one
+        np.testing.assert_array_equal(load_historic_demand(self.file_path), [[1] * 5, [2] * 5])
+
+    def test_only_appended_periods_are_parsed(self):
+        load_historic_demand(self.file_path)
+        cached = np.load(self.file_path + '.npy')
+        cached[0, 0] = 7  # Marks the cached columns, which an incremental update keeps
+        np.save(self.file_path + '.npy', cached)
+        self.write_csv([[0, 1, 2, 0, 5, 300], [3, 0, 0, 250, 0, 1]])
+        os.utime(self.file_path, ns=(0, 0))
+        demand_data = load_historic_demand(self.file_path)
+        np.testing.assert_array_equal(demand_data, [[7, 1, 2, 0, 5, 300], [3, 0, 0, 250, 0, 1]])
+        self.assertEqual(demand_data.dtype, np.uint16)
+        np.testing.assert_array_equal(load_historic_demand(self.file_path), demand_data)
+
+    def test_edited_periods_are_parsed_again(self):
+        load_historic_demand(self.file_path)
+        cached = np.load(self.file_path + '.npy')
+        cached[0, 0] = 7
+        np.save(self.file_path + '.npy', cached)
+        self.write_csv([[0, 1, 2, 1, 5], [3, 0, 0, 250, 0]])
+        os.utime(self.file_path, ns=(0, 0))
+        np.testing.assert_array_equal(load_historic_demand(self.file_path), [[0, 1, 2, 1, 5], [3, 0, 0, 250, 0]])
+
+    def test_sample_data_matches_setup(self):
+        data_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'sample_data.csv')
+        demand_data = load_historic_demand(data_path, use_cache=False)
+        self.assertEqual(demand_data.shape[0], 4)
+
+class TestCreateEmpiricalDistribution(unittest.TestCase):
+
+    def test_selects_the_first_items(self):
+        demand_data = np.arange(12).reshape(3, 4)
+        np.testing.assert_array_equal(create_empirical_distribution(demand_data, {'num_items': 2}), demand_data[:2])
+
+    def test_rejects_more_items_than_rows(self):
+        with self.assertRaises(IndexError):
+            create_empirical_distribution(np.zeros((2, 4)), {'num_items': 3})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,809 @@
+import os
+import json
+import sys
+import asyncio
+import tempfile
+import subprocess
+import unittest
+from unittest import mock
+import numpy as np
+from src.PeriodicReview_JointReplenishment.simulation import simulate_policy
+from src.PeriodicReview_JointReplenishment.batch_simulation import simulate_population
+from src.PeriodicReview_JointReplenishment.scenarios import generate_scenarios
+from src.PeriodicReview_JointReplenishment.kernels import compiled_kernel, path_kernel
+from src.PeriodicReview_JointReplenishment.groups import group_setups, combine_group_policies, optimize_groups
+from src.PeriodicReview_JointReplenishment.racing import race_population
+from src.PeriodicReview_JointReplenishment.evaluator import PopulationEvaluator
+from src.PeriodicReview_JointReplenishment.telemetry import Telemetry
+from src.PeriodicReview_JointReplenishment.benchmark import benchmark_case
+from src.PeriodicReview_JointReplenishment.islands import island_model, migrate
+from src.PeriodicReview_JointReplenishment.steady_state import steady_state, insert_into_pool
+from src.PeriodicReview_JointReplenishment.surrogate import Surrogate, screen_offspring
+from src.PeriodicReview_JointReplenishment.analytical import AnalyticalEvaluator, analytical_evaluator
+from src.PeriodicReview_JointReplenishment.incremental import (IncrementalEvaluator, local_search, neighbourhood, incremental_evaluator,
+                                                               MAX_EVALUATORS)
+from src.PeriodicReview_JointReplenishment.sweep import run_sweep, sweep_points, nearest_point
+from src.PeriodicReview_JointReplenishment.server import EvaluationServer
+from src.PeriodicReview_JointReplenishment.archive import EvaluationArchive, load_archive, best_meeting
+from src.PeriodicReview_JointReplenishment.rolling import perturbed_population, rolling_optimization, load_policies, save_policies
+from src.PeriodicReview_JointReplenishment.pareto import non_dominated_fronts, crowding_distance, pareto_front
+from src.PeriodicReview_JointReplenishment.genetic_algorithm import (genetic_algorithm, initialize_population_array, crossover_array,
+                                                                     mutate_array, mutate, evaluate_metrics, evaluate_population)
+from src.PeriodicReview_JointReplenishment.fitness_cache import FitnessCache
+
+def make_setup(**overrides):
+    setup = {
+        'num_samples': 120,
+        'warm_up': 0,
+        'num_items': 3,
+        'r': 4,
+        'pallet_volume': [1.22, 1.14, 1.42],
+        'container_volume': 65,
+        'holding_cost': 1.9,
+        'backorder_cost': 100.0,
+        'order_cost': 5000.0,
+        'lead_time': 5
+    }
+    setup.update(overrides)
+    return setup
+
+# Constant demand rows make every sampled path deterministic, so both engines must agree exactly
+CONSTANT_DEMAND = np.array([[2] * 10, [1] * 10, [3] * 10])
+
+POPULATION = [
+    [[4, 1, 24], [4, 1, 25], [4, 2, 24]],
+    [[4, 10, 12], [4, 3, 9], [4, 20, 25]],
+    [[2, 5, 6], [3, 1, 2], [1, 15, 40]]
+]
+
+class TestSimulatePopulation(unittest.TestCase):
+
+    def assert_matches_reference(self, setup):
+        metrics = simulate_population(CONSTANT_DEMAND, POPULATION, setup)
+        for policies, row in zip(POPULATION, metrics):
+            np.testing.assert_allclose(row, simulate_policy(CONSTANT_DEMAND, policies, setup))
+
+    def test_matches_simulate_policy(self):
+        self.assert_matches_reference(make_setup())
+
+    def test_matches_simulate_policy_with_warm_up(self):
+        self.assert_matches_reference(make_setup(warm_up=30))
+
+    def test_matches_simulate_policy_with_single_period_lead_time(self):
+        self.assert_matches_reference(make_setup(lead_time=1))
+
+    def test_returns_one_row_per_candidate(self):
+        demand = np.random.default_rng(0).poisson(1.0, size=(3, 50))
+        metrics = simulate_population(demand, POPULATION, make_setup(), rng=np.random.default_rng(1))
+        self.assertEqual(metrics.shape, (len(POPULATION), 5))
+
+class TestScenarios(unittest.TestCase):
+
+    def setUp(self):
+        self.setup = make_setup(warm_up=10, num_replications=3)
+        self.demand = np.random.default_rng(0).poisson(1.5, size=(3, 60))
+
+    def test_scenario_shapes(self):
+        initial_inventory, demand = generate_scenarios(self.demand, self.setup, np.random.default_rng(1))
+        self.assertEqual(initial_inventory.shape, (3, 3))
+        self.assertEqual(demand.shape, (3, 3, 130))
+
+    def test_same_seed_gives_same_scenarios(self):
+        first = generate_scenarios(self.demand, self.setup, np.random.default_rng(7))
+        second = generate_scenarios(self.demand, self.setup, np.random.default_rng(7))
+        for a, b in zip(first, second):
+            np.testing.assert_array_equal(a, b)
+
+    def test_engines_agree_on_common_scenarios(self):
+        scenarios = generate_scenarios(self.demand, self.setup, np.random.default_rng(2))
+        metrics = simulate_population(self.demand, POPULATION, self.setup, scenarios=scenarios)
+        for policies, row in zip(POPULATION, metrics):
+            np.testing.assert_allclose(row, simulate_policy(self.demand, policies, self.setup, scenarios))
+
+    def test_rejects_negative_demand(self):
+        with self.assertRaises(ValueError):
+            generate_scenarios(-self.demand - 1, self.setup, np.random.default_rng(3))
+
+class TestSimulationBackends(unittest.TestCase):
+
+    def setUp(self):
+        self.setup = make_setup(warm_up=10, num_replications=2)
+        self.demand = np.random.default_rng(4).poisson(1.5, size=(3, 60))
+        self.scenarios = generate_scenarios(self.demand, self.setup, np.random.default_rng(5))
+
+    def test_uncompiled_kernel_matches_reference(self):
+        initial_inventory, demand = self.scenarios
+        for policies in POPULATION:
+            policies = np.array(policies)
+            for k in range(len(demand)):
+                reference = simulate_policy(self.demand, policies, self.setup, (initial_inventory[k:k + 1], demand[k:k + 1]))
+                kernel = path_kernel(policies[:, 0], policies[:, 1], policies[:, 2], initial_inventory[k].astype(float),
+                                     demand[k].astype(float), np.array(self.setup['pallet_volume']), 1.9, 100.0, 5000.0,
+                                     65.0, self.setup['lead_time'], self.setup['warm_up'], self.setup['num_samples'])
+                np.testing.assert_allclose(kernel, reference)
+
+    @unittest.skipIf(compiled_kernel() is None, "Numba is not installed")
+    def test_numba_backend_matches_reference(self):
+        numba_setup = dict(self.setup, simulation_backend='numba')
+        for policies in POPULATION:
+            np.testing.assert_allclose(simulate_policy(self.demand, policies, numba_setup, self.scenarios),
+                                       simulate_policy(self.demand, policies, self.setup, self.scenarios))
+
+    def test_unknown_backend_is_rejected(self):
+        with self.assertRaises(ValueError):
+            simulate_policy(self.demand, POPULATION[0], dict(self.setup, simulation_backend='fortran'), self.scenarios)
+
+class TestGroups(unittest.TestCase):
+
+    def setUp(self):
+        self.setup = make_setup(pop_size=20, num_generations=2, mutation_rate=0.2, decay_rate=1, parent_fraction=0.1, max_s=20, max_S=25,
+                                seed=8, max_workers=0, evaluation_mode='batch', group_workers=1,
+                                item_groups=[{'items': [2, 0], 'name': 'A', 'order_cost': 100.0}, {'items': [1], 'pallet_volume': [2.0]}])
+
+    def test_rejects_missing_or_duplicated_items(self):
+        with self.assertRaises(ValueError):
+            group_setups(dict(self.setup, item_groups=[{'items': [0, 1]}]))
+        with self.assertRaises(ValueError):
+            group_setups(dict(self.setup, item_groups=[{'items': [0, 1]}, {'items': [1, 2]}]))
+
+    def test_group_overrides_and_pallet_volumes(self):
+        (first_name, first_items, first), (second_name, second_items, second) = group_setups(self.setup)
+        self.assertEqual((first_name, first_items, second_name, second_items), ('A', [2, 0], 'Group 2', [1]))
+        self.assertEqual((first['num_items'], first['order_cost'], first['pallet_volume']), (2, 100.0, [1.42, 1.22]))
+        self.assertEqual((second['num_items'], second['order_cost'], second['pallet_volume']), (1, 5000.0, [2.0]))
+        self.assertNotIn('item_groups', first)
+        self.assertNotEqual(first['seed'], second['seed'])
+
+    def test_combined_policies_and_metrics(self):
+        demand = np.array([[1] * 4, [2] * 4, [3] * 4])
+        group_results = [('A', [2, 0], [([[4, 1, 2], [4, 3, 4]], 10.0, 0.9, 0.5, 0.25, 2.0)]),
+                         ('B', [1], [([[4, 5, 6]], 20.0, 0.6, 0.8, 0.5, 3.0)])]
+        (policies, *metrics), = combine_group_policies(group_results, demand, 3)
+        self.assertEqual(policies, [[4, 3, 4], [4, 5, 6], [4, 1, 2]])
+        # Service level weighted by demand 4 : 2, fill rate by containers per period 0.5 : 1.5
+        np.testing.assert_allclose(metrics, [30.0, 0.8, (0.5 * 0.5 + 0.8 * 1.5) / 2, 0.75, 2.0 / 0.75])
+
+    def test_optimize_groups(self):
+        combined, group_results = optimize_groups(CONSTANT_DEMAND, self.setup)
+        self.assertEqual([len(best_policies[0][0]) for _, _, best_policies in group_results], [2, 1])
+        self.assertEqual(len(combined[0][0]), 3)
+        self.assertAlmostEqual(combined[0][1], sum(best_policies[0][1] for _, _, best_policies in group_results))
+
+class TestRacing(unittest.TestCase):
+
+    def test_survivors_match_full_horizon_evaluation(self):
+        setup = make_setup(num_samples=400)
+        demand = np.random.default_rng(6).poisson(1.5, size=(3, 60))
+        scenarios = generate_scenarios(demand, setup, np.random.default_rng(7))
+        rng = np.random.default_rng(8)
+        population = [[[4, s, s + rng.integers(1, 30)] for s in rng.integers(1, 20, size=3)] for _ in range(60)]
+
+        full = simulate_population(demand, population, setup, scenarios=scenarios)
+        metrics, completed = race_population(demand, population, setup, 5, scenarios=scenarios)
+
+        self.assertGreaterEqual(completed.sum(), 5)
+        self.assertTrue(completed[np.argmin(full[:, 0])])
+        np.testing.assert_allclose(metrics[completed], full[completed])
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_benchmark_case_on_a_tiny_problem(self):
+        setup = make_setup(pop_size=20, num_generations=2, mutation_rate=0.2, decay_rate=1, parent_fraction=0.1, max_s=20, max_S=25,
+                           max_workers=0, evaluation_mode='batch', plot=False)
+        population = initialize_population_array(20, 3, setup, np.random.default_rng(0)).tolist()
+        results = benchmark_case(setup, CONSTANT_DEMAND, population, 1)
+        self.assertEqual([result['benchmark'] for result in results], ['simulate_policy', 'evaluate_fitness', 'genetic_algorithm'])
+        for result in results:
+            self.assertGreater(result['evaluations_per_second'], 0)
+        # Every generation has at least 100 policy combinations
+        self.assertAlmostEqual(results[2]['evaluations_per_second'] * results[2]['seconds'], 200)
+
+class TestTelemetry(unittest.TestCase):
+
+    def test_records_tasks_without_changing_results(self):
+        setup = make_setup(max_workers=0, chunk_size=1)
+        scenarios = generate_scenarios(CONSTANT_DEMAND, setup, np.random.default_rng(9))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'telemetry.jsonl')
+            telemetry = Telemetry(path, profile_workers=True)
+            with PopulationEvaluator(CONSTANT_DEMAND, setup) as evaluator:
+                expected = evaluator.evaluate(POPULATION, scenarios)
+                evaluator.telemetry = telemetry
+                np.testing.assert_allclose(evaluator.evaluate(POPULATION, scenarios), expected)
+            telemetry.end_generation(1, len(POPULATION))
+            telemetry.close()
+
+            with open(path) as file:
+                event = json.loads(file.readline())
+
+        self.assertEqual(event['event'], 'generation')
+        self.assertEqual(event['evaluations'], len(POPULATION))
+        self.assertEqual(event['tasks']['count'], len(POPULATION))
+        self.assertIn('simulation', event['phases'])
+        self.assertTrue(any('simulate_policy' in entry['function'] for entry in event['profile']))
+
+class TestFitnessCache(unittest.TestCase):
+
+    def test_independent_draws_are_not_reused_across_generations(self):
+        setup = make_setup(max_workers=0, evaluation_mode='batch')
+        cache = FitnessCache(100, 'problem')
+        first, _ = evaluate_population(POPULATION, CONSTANT_DEMAND, setup, seed_sequence=np.random.SeedSequence(1), cache=cache)
+        self.assertEqual(cache.take_counters(), (0, 3))
+        evaluate_population(POPULATION, CONSTANT_DEMAND, setup, seed_sequence=np.random.SeedSequence(2), cache=cache)
+        self.assertEqual(cache.take_counters(), (0, 3))
+        again, _ = evaluate_population(POPULATION, CONSTANT_DEMAND, setup, seed_sequence=np.random.SeedSequence(1), cache=cache)
+        self.assertEqual(cache.take_counters(), (3, 0))
+        np.testing.assert_array_equal(again, first)
+
+    def test_warns_when_elites_are_not_reused(self):
+        setup = make_setup(pop_size=100, num_generations=1, mutation_rate=0.2, decay_rate=1, parent_fraction=0.1, max_s=20, max_S=25,
+                           seed=4, max_workers=0, evaluation_mode='batch', plot=False, cache_size=100)
+        with self.assertWarnsRegex(UserWarning, 'scenario_mode'):
+            genetic_algorithm(CONSTANT_DEMAND, setup, callbacks=[])
+
+class TestGeneticOperators(unittest.TestCase):
+
+    def setUp(self):
+        self.setup = make_setup(max_s=20, max_S=25)
+        self.rng = np.random.default_rng(12)
+
+    def test_initial_policies_are_within_bounds(self):
+        population = initialize_population_array(200, 3, self.setup, self.rng)
+        self.assertEqual(population.shape, (200, 3, 3))
+        self.assertTrue(np.all(population[:, :, 0] == 4))
+        self.assertTrue(np.all((population[:, :, 1] >= 1) & (population[:, :, 1] <= 20)))
+        self.assertTrue(np.all((population[:, :, 1] < population[:, :, 2]) & (population[:, :, 2] <= 25)))
+
+    def test_crossover_takes_genes_from_parents(self):
+        parents = initialize_population_array(2, 3, self.setup, self.rng)
+        offspring = crossover_array(parents, 500, self.rng)
+        self.assertEqual(offspring.shape, (500, 3, 3))
+        for gene in (0, 1):
+            self.assertTrue(np.all(np.isin(offspring[:, :, gene], parents[:, :, gene])))
+        self.assertTrue(np.all(offspring[:, :, 2] >= np.minimum(parents[0, :, 1], parents[1, :, 1])))
+        self.assertTrue(np.all(offspring[:, :, 2] <= np.maximum(parents[0, :, 2], parents[1, :, 2])))
+
+    def test_mutation_changes_at_most_one_item(self):
+        offspring = initialize_population_array(500, 3, self.setup, self.rng)
+        original = offspring.copy()
+        mutate_array(offspring, 0.5, self.setup, self.rng)
+        changed = np.any(offspring != original, axis=2).sum(axis=1)
+        self.assertTrue(np.all(changed <= 1))
+        self.assertTrue(np.all(offspring[:, :, 1] < offspring[:, :, 2]))
+
+    def test_list_conversion_layer(self):
+        offspring = initialize_population_array(10, 3, self.setup, self.rng).tolist()
+        mutated = mutate(offspring, 1.0, self.setup, self.rng)
+        self.assertIs(mutated, offspring)
+        self.assertIsInstance(mutated[0][0][0], int)
+
+class TestIslands(unittest.TestCase):
+
+    def test_migrants_replace_worst_policies(self):
+        population = np.arange(4 * 3 * 3).reshape(4, 3, 3)
+        metrics = np.array([[3.0] * 5, [1.0] * 5, [4.0] * 5, [2.0] * 5])
+        migrants = np.zeros((2, 3, 3), dtype=np.int64)
+        population, metrics = migrate(population, metrics, migrants, np.zeros((2, 5)))
+        np.testing.assert_array_equal(metrics[:, 0], [0.0, 1.0, 0.0, 2.0])
+        np.testing.assert_array_equal(population[[0, 2]], migrants)
+
+    def test_islands_return_best_policies(self):
+        setup = make_setup(pop_size=200, num_generations=3, mutation_rate=0.2, decay_rate=1, parent_fraction=0.1, max_s=20, max_S=25,
+                           seed=13, evaluation_mode='batch', plot=False, num_islands=2, migration_interval=1, num_migrants=2)
+        best_policies = island_model(CONSTANT_DEMAND, setup, callbacks=[])
+        self.assertEqual(len(best_policies), 20)
+        self.assertEqual(best_policies, sorted(best_policies, key=lambda scores: scores[1]))
+        self.assertIsInstance(best_policies[0][0][0][0], int)
+
+    def test_islands_use_their_own_caches(self):
+        with tempfile.TemporaryDirectory() as directory:
+            setup = make_setup(pop_size=200, num_generations=2, mutation_rate=0.2, decay_rate=1, parent_fraction=0.1, max_s=20, max_S=25,
+                               seed=13, evaluation_mode='batch', plot=False, num_islands=2, scenario_mode='fixed', cache_size=1000,
+                               cache_path=os.path.join(directory, 'cache.db'))
+            reports = []
+            island_model(CONSTANT_DEMAND, setup, callbacks=[reports.append])
+            self.assertEqual(reports[1]['cache_lookups'], 200)
+            self.assertGreater(reports[1]['cache_hits'], 0)
+            self.assertEqual(sorted(os.listdir(directory)), ['cache_island1.db', 'cache_island2.db'])
+
+    def test_rejects_unsupported_options(self):
+        setup = make_setup(pop_size=200, num_generations=1, num_islands=2, resume=True)
+        with self.assertRaisesRegex(ValueError, 'resume'):
+            island_model(CONSTANT_DEMAND, setup, callbacks=[])
+
+class TestSteadyState(unittest.TestCase):
+
+    def setUp(self):
+        self.setup = make_setup(pop_size=100, num_generations=5, mutation_rate=0.2, parent_fraction=0.1, max_s=20, max_S=25,
+                                seed=14, max_workers=0, evaluation_mode='batch', plot=False, steady_state_batch=10)
+
+    def test_runs_the_evaluation_budget(self):
+        reports = []
+        best_policies = steady_state(CONSTANT_DEMAND, self.setup, callbacks=[reports.append])
+        self.assertEqual(len(reports), 5)
+        self.assertEqual(len(best_policies), 10)
+        self.assertEqual(best_policies, sorted(best_policies, key=lambda scores: scores[1]))
+        self.assertTrue(all(a >= b for a, b in zip(reports[-1]['cost_progression'], reports[-1]['cost_progression'][1:])))
+
+    def test_stops_on_convergence(self):
+        reports = []
+        steady_state(CONSTANT_DEMAND, dict(self.setup, evaluation_budget=100000, convergence_evaluations=300), callbacks=[reports.append])
+        self.assertLess(len(reports), 1000)
+
+    def test_last_batch_is_cut_to_the_budget(self):
+        submit = PopulationEvaluator.submit
+        with mock.patch.object(PopulationEvaluator, 'submit', autospec=True, side_effect=submit) as submitted:
+            steady_state(CONSTANT_DEMAND, dict(self.setup, steady_state_batch=7, evaluation_budget=333), callbacks=[])
+        self.assertEqual(sum(len(call.args[1]) for call in submitted.call_args_list), 333)
+
+    def test_pool_averages_repeated_policies(self):
+        population = initialize_population_array(4, 3, self.setup, np.random.default_rng(14))
+        metrics = np.zeros((4, 5))
+        metrics[:, 0] = [1.0, 2.0, 3.0, 4.0]
+        pool = insert_into_pool(population[:0], np.zeros((0, 5)), np.zeros(0, dtype=np.int64), population, metrics, 10)
+        repeated_metrics = np.zeros((3, 5))
+        repeated_metrics[:, 0] = [3.0, 5.0, 6.0]
+        pool_population, pool_metrics, pool_counts = insert_into_pool(*pool, population[[0, 0, 1]], repeated_metrics, 10)
+        self.assertEqual(len({policies.tobytes() for policies in pool_population}), 4)
+        np.testing.assert_array_equal(pool_metrics[:, 0], [3.0, 3.0, 4.0, 4.0])
+        np.testing.assert_array_equal(pool_population, population[[0, 2, 1, 3]])
+        np.testing.assert_array_equal(pool_counts, [3, 1, 2, 1])
+
+    def test_rejects_unsupported_options(self):
+        for option, value in [('resume', True), ('cache_size', 10), ('analytical_mode', 'screen'), ('evaluation_mode', 'incremental')]:
+            with self.assertRaisesRegex(ValueError, option):
+                steady_state(CONSTANT_DEMAND, dict(self.setup, **{option: value}), callbacks=[])
+
+class TestSurrogate(unittest.TestCase):
+
+    def setUp(self):
+        self.setup = make_setup(max_s=20, max_S=25, num_samples=1040, lead_time=20)
+        self.rng = np.random.default_rng(15)
+        self.population = initialize_population_array(400, 3, self.setup, self.rng)
+        demand = self.rng.poisson(0.5, size=(3, 60))
+        scenarios = generate_scenarios(demand, self.setup, self.rng)
+        self.metrics = simulate_population(demand, self.population, self.setup, scenarios=scenarios)
+
+    def test_predictions_rank_costs(self):
+        surrogate = Surrogate(3, self.setup['max_S'])
+        surrogate.update(self.population[:200], self.metrics[:200])
+        self.assertTrue(surrogate.ready)
+        predicted = surrogate.predict(self.population[200:])[:, 0]
+        self.assertGreater(np.corrcoef(predicted, self.metrics[200:, 0])[0, 1], 0.8)
+
+    def test_screening_keeps_promising_and_exploration_share(self):
+        surrogate = Surrogate(3, self.setup['max_S'])
+        surrogate.update(self.population, self.metrics)
+        offspring = initialize_population_array(100, 3, self.setup, self.rng)
+        screened = screen_offspring(surrogate, offspring, 0.3, 0.1, self.rng)
+        self.assertEqual(len(screened), 40)
+        best = offspring[np.argmin(surrogate.predict(offspring)[:, 0])]
+        self.assertTrue(any(np.array_equal(best, policies) for policies in screened))
+        self.assertEqual(len(screen_offspring(surrogate, offspring, 0.3, 0.1, self.rng, num_selected=25)), 25)
+
+    def test_screened_generations_keep_their_size(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'archive.bin')
+            setup = make_setup(pop_size=100, num_generations=4, mutation_rate=0.2, decay_rate=1, parent_fraction=0.1, max_s=20,
+                               max_S=25, seed=15, max_workers=0, evaluation_mode='batch', plot=False, surrogate=True, archive_path=path)
+            genetic_algorithm(CONSTANT_DEMAND, setup, callbacks=[])
+            self.assertEqual(np.bincount(load_archive(path)['generation']).tolist(), [100] * 4)
+
+    def test_fit_skips_estimates_and_carried_parents(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'archive.bin')
+            setup = make_setup(pop_size=100, num_generations=4, mutation_rate=0.2, decay_rate=1, parent_fraction=0.1, max_s=20,
+                               max_S=25, seed=10, max_workers=0, evaluation_mode='batch', plot=False, surrogate=True, racing=True,
+                               scenario_mode='fixed', num_replications=4, archive_path=path)
+            update = Surrogate.update
+            with mock.patch.object(Surrogate, 'update', autospec=True, side_effect=update) as updates:
+                genetic_algorithm(np.random.default_rng(4).poisson(1.5, size=(3, 60)), setup, callbacks=[])
+            records = np.array(load_archive(path))
+
+        self.assertFalse(records['simulated'].all())
+        expected = Surrogate(3, 25)
+        for generation in range(4):
+            generation_records = records[records['generation'] == generation]
+            fresh = generation_records['simulated'].copy()
+            fresh[:10 if generation > 0 else 0] = False
+            update(expected, generation_records['policies'][fresh], generation_records['metrics'][fresh])
+        np.testing.assert_allclose(updates.call_args.args[0].weights, expected.weights)
+
+class TestAnalyticalEvaluator(unittest.TestCase):
+
+    def setUp(self):
+        self.setup = make_setup(max_s=20, max_S=25, num_samples=2000, warm_up=200, lead_time=5)
+        self.rng = np.random.default_rng(17)
+        self.demand = self.rng.poisson(1.5, size=(3, 60))
+        self.population = initialize_population_array(6, 3, self.setup, self.rng)
+
+    def test_matches_long_simulation(self):
+        scenarios = generate_scenarios(self.demand, self.setup, self.rng, num_replications=200)
+        simulated = simulate_population(self.demand, self.population, self.setup, scenarios=scenarios)
+        analytical = AnalyticalEvaluator(self.demand, self.setup).evaluate(self.population)
+        np.testing.assert_allclose(analytical[:, 0], simulated[:, 0], rtol=0.03)
+        np.testing.assert_allclose(analytical[:, 1], simulated[:, 1], atol=0.5)
+        np.testing.assert_allclose(analytical[:, 3], simulated[:, 3], atol=0.01)
+
+    def test_screening_cost_is_below_estimate(self):
+        evaluator = AnalyticalEvaluator(self.demand, self.setup)
+        self.assertTrue(np.all(evaluator.screening_costs(self.population) <= evaluator.evaluate(self.population)[:, 0] + 1e-9))
+
+    def test_screening_keeps_the_simulated_parents(self):
+        # Short independent simulations are noisy around the screening cost; the margin must absorb that noise
+        setup = dict(self.setup, num_samples=200, warm_up=0, max_workers=0, evaluation_mode='batch', analytical_mode='screen')
+        rng = np.random.default_rng(0)
+        population = initialize_population_array(100, 3, setup, rng)
+        scenarios = generate_scenarios(self.demand, setup, rng, num_replications=1)
+        screened, completed = evaluate_metrics(population, self.demand, setup, scenarios, num_parents=10)
+        simulated, _ = evaluate_metrics(population, self.demand, dict(setup, analytical_mode='off'), scenarios)
+        self.assertLess(completed.sum(), 100)
+        np.testing.assert_allclose(screened[completed], simulated[completed])
+        self.assertTrue(np.all(completed[np.argsort(simulated[:, 0])[:10]]))
+
+    def test_container_parameters_share_an_evaluator(self):
+        changed = dict(self.setup, order_cost=1000.0, container_volume=30)
+        evaluator = analytical_evaluator(self.demand, self.setup)
+        self.assertIs(analytical_evaluator(self.demand, changed), evaluator)
+        np.testing.assert_allclose(evaluator.evaluate(self.population, changed), AnalyticalEvaluator(self.demand, changed).evaluate(self.population))
+
+    def test_rejects_single_period_lead_time(self):
+        with self.assertRaises(ValueError):
+            AnalyticalEvaluator(self.demand, make_setup(lead_time=1))
+
+    def test_screen_mode_runs_genetic_algorithm(self):
+        setup = dict(self.setup, pop_size=100, num_generations=2, mutation_rate=0.2, decay_rate=1, parent_fraction=0.1,
+                     seed=5, max_workers=0, evaluation_mode='batch', cache_size=1000, plot=False, analytical_mode='screen')
+        best = genetic_algorithm(self.demand, setup, callbacks=[])
+        self.assertEqual(len(best), 10)
+
+class TestIncrementalEvaluator(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = np.random.default_rng(18)
+        self.demand = self.rng.poisson(1.5, size=(3, 60))
+
+    def assert_matches_reference(self, setup):
+        scenarios = generate_scenarios(self.demand, setup, self.rng, num_replications=3)
+        population = np.concatenate([np.array(POPULATION), initialize_population_array(10, 3, dict(setup, max_s=20, max_S=25), self.rng)])
+        metrics = IncrementalEvaluator(setup).evaluate(population, scenarios)
+        for policies, row in zip(population.tolist(), metrics):
+            np.testing.assert_allclose(row, simulate_policy(self.demand, policies, setup, scenarios=scenarios))
+
+    def test_matches_simulate_policy(self):
+        self.assert_matches_reference(make_setup())
+
+    def test_matches_simulate_policy_with_warm_up(self):
+        self.assert_matches_reference(make_setup(warm_up=30))
+
+    def test_matches_simulate_policy_with_single_period_lead_time(self):
+        self.assert_matches_reference(make_setup(lead_time=1))
+
+    def test_only_changed_items_are_simulated(self):
+        setup = make_setup()
+        scenarios = generate_scenarios(self.demand, setup, self.rng)
+        evaluator = IncrementalEvaluator(setup)
+        evaluator.evaluate(POPULATION[:1], scenarios)
+        changed = np.array(POPULATION[:1])
+        changed[0, 1] = [4, 2, 20]
+        evaluator.evaluate(changed, scenarios)
+        self.assertEqual(evaluator.simulated, 4)
+
+    def test_local_search_reaches_local_optimum(self):
+        setup = make_setup(max_s=20, max_S=25)
+        scenarios = generate_scenarios(self.demand, setup, self.rng)
+        evaluator = IncrementalEvaluator(setup)
+        start = np.array(POPULATION[1])
+        start_metrics = evaluator.evaluate(start[np.newaxis], scenarios)[0]
+        policies, metrics_row = local_search(start, start_metrics, evaluator, scenarios, setup, max_steps=100)
+        self.assertLessEqual(metrics_row[0], start_metrics[0])
+        self.assertTrue(np.all(evaluator.evaluate(neighbourhood(policies, setup), scenarios)[:, 0] >= metrics_row[0]))
+
+    def test_container_parameters_share_an_evaluator(self):
+        setup = make_setup()
+        changed = make_setup(order_cost=1000.0, container_volume=30)
+        scenarios = generate_scenarios(self.demand, setup, self.rng)
+        evaluator = incremental_evaluator(self.demand, setup)
+        self.assertIs(incremental_evaluator(self.demand, changed), evaluator)
+        np.testing.assert_allclose(evaluator.evaluate(POPULATION, scenarios, changed),
+                                   simulate_population(self.demand, POPULATION, changed, scenarios=scenarios))
+
+    def test_evaluators_are_bounded(self):
+        evaluators = [incremental_evaluator(self.demand, make_setup(holding_cost=k)) for k in range(MAX_EVALUATORS + 1)]
+        self.assertIsNot(incremental_evaluator(self.demand, make_setup(holding_cost=0)), evaluators[0])
+        self.assertIs(incremental_evaluator(self.demand, make_setup(holding_cost=MAX_EVALUATORS)), evaluators[-1])
+
+    def test_polishing_runs_genetic_algorithm(self):
+        setup = make_setup(pop_size=100, num_generations=2, mutation_rate=0.2, decay_rate=1, parent_fraction=0.1, max_s=20, max_S=25,
+                           seed=6, max_workers=0, evaluation_mode='incremental', scenario_mode='fixed', plot=False, polish_elites=2)
+        best = genetic_algorithm(self.demand, setup, callbacks=[])
+        self.assertEqual(len(best), 10)
+        with self.assertRaises(ValueError):
+            genetic_algorithm(self.demand, dict(setup, scenario_mode='independent'), callbacks=[])
+
+class TestSweep(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.setup = make_setup(pop_size=100, num_generations=2, mutation_rate=0.2, decay_rate=1, parent_fraction=0.1,
+                                max_s=20, max_S=25, seed=8, max_workers=0, evaluation_mode='batch', scenario_mode='fixed')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_grid_points_and_nearest_point(self):
+        grid = {'order_cost': [1000.0, 5000.0], 'lead_time': [3, 5, 8]}
+        points = sweep_points(grid)
+        self.assertEqual(len(points), 6)
+        self.assertEqual(points[1], {'order_cost': 1000.0, 'lead_time': 5})
+        self.assertEqual(nearest_point(points[4], points[:4], grid), 1)
+        self.assertIsNone(nearest_point(points[0], [], grid))
+
+    def test_sweep_writes_one_row_per_point(self):
+        path = os.path.join(self.directory.name, 'sweep.csv')
+        rows = run_sweep(CONSTANT_DEMAND, self.setup, {'order_cost': [1000.0, 5000.0]}, path)
+        self.assertEqual([row['warm_start'] for row in rows], ['', 1])
+        with open(path) as file:
+            lines = file.read().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[0].startswith('point,order_cost,cost,'))
+
+    def test_pool_evaluates_with_changed_setup(self):
+        scenarios = generate_scenarios(CONSTANT_DEMAND, self.setup, np.random.default_rng(0))
+        changed = dict(self.setup, order_cost=1000.0, evaluation_mode='process')
+        with PopulationEvaluator(CONSTANT_DEMAND, dict(self.setup, max_workers=1)) as evaluator:
+            evaluator.use_setup(changed)
+            metrics = evaluator.evaluate(POPULATION, scenarios)
+        np.testing.assert_allclose(metrics, simulate_population(CONSTANT_DEMAND, POPULATION, changed, scenarios=scenarios))
+
+class TestEvaluationServer(unittest.TestCase):
+
+    def setUp(self):
+        self.setup = make_setup(max_workers=0, evaluation_mode='batch', scenario_mode='fixed', seed=9,
+                                server_port=0, server_batch_window=0.05)
+
+    async def request(self, port, method, path, body=None):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        payload = json.dumps(body).encode() if body is not None else b''
+        writer.write(f"{method} {path} HTTP/1.1\r\nContent-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode() + payload)
+        response = await reader.read()
+        writer.close()
+        head, _, content = response.partition(b'\r\n\r\n')
+        return int(head.split()[1]), json.loads(content)
+
+    async def exchange(self, requests):
+        server = EvaluationServer(CONSTANT_DEMAND, self.setup)
+        listener = await server.start()
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            responses = await asyncio.gather(*(self.request(port, *request) for request in requests))
+        finally:
+            await server.stop(listener)
+        return server, responses
+
+    def test_concurrent_requests_share_a_batch(self):
+        requests = [('POST', '/evaluate', {'policies': policies}) for policies in POPULATION]
+        server, responses = asyncio.run(self.exchange(requests))
+
+        expected = simulate_population(CONSTANT_DEMAND, POPULATION, self.setup, scenarios=server.fixed_scenarios)
+        for (status, response), row in zip(responses, expected):
+            self.assertEqual(status, 200)
+            np.testing.assert_allclose(list(response['metrics'][0].values()), row)
+        self.assertEqual(server.batches, 2)  # The warm-up evaluation, then all requests together
+
+    def test_rejects_invalid_requests(self):
+        requests = [('POST', '/evaluate', {'policies': [[4, 5, 3]] * 3}), ('POST', '/evaluate', {'policies': [[4, 1, 3]]}),
+                    ('GET', '/evaluate'), ('GET', '/health')]
+        _, responses = asyncio.run(self.exchange(requests))
+        self.assertEqual([status for status, _ in responses], [400, 400, 405, 200])
+
+class TestEvaluationArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'archive.bin')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_records_round_trip_through_chunks(self):
+        population = np.array(POPULATION)
+        metrics = np.arange(15, dtype=np.float64).reshape(3, 5)
+        with EvaluationArchive(self.path, 3, 'problem', chunk_size=2) as archive:
+            archive.append(0, population, metrics)
+            archive.append(1, population[:1], metrics[:1] + 100)
+        with EvaluationArchive(self.path, 3, 'problem', resume_records=3) as archive:
+            archive.append(2, population[1:2], metrics[1:2])
+            self.assertEqual(archive.written, 3)
+
+        records = load_archive(self.path)
+        self.assertEqual(records['generation'].tolist(), [0, 0, 0, 2])  # The record of generation 1 was after the checkpoint
+        np.testing.assert_array_equal(records['policies'][:3], population)
+        np.testing.assert_array_equal(records['metrics'][3], metrics[1])
+
+    def test_best_meeting_service_level(self):
+        metrics = np.array([[10.0, 90.0, 0, 0, 0], [20.0, 96.0, 0, 0, 0], [15.0, 95.0, 0, 0, 0]])
+        with EvaluationArchive(self.path, 3) as archive:
+            archive.append(0, np.array(POPULATION), metrics)
+        records = load_archive(self.path)
+        self.assertEqual(best_meeting(records, 95)[:3], (POPULATION[2], 15.0, 95.0))
+        self.assertIsNone(best_meeting(records, 99))
+
+    def test_best_meeting_skips_estimates(self):
+        metrics = np.array([[10.0, 96.0, 0, 0, 0], [20.0, 96.0, 0, 0, 0], [15.0, 95.0, 0, 0, 0]])
+        with EvaluationArchive(self.path, 3) as archive:
+            archive.append(0, np.array(POPULATION), metrics, np.array([False, True, True]))
+        self.assertEqual(best_meeting(load_archive(self.path), 95)[:2], (POPULATION[2], 15.0))
+
+    def test_rejects_archive_of_another_problem(self):
+        EvaluationArchive(self.path, 3, 'problem').close()
+        with self.assertRaises(ValueError):
+            EvaluationArchive(self.path, 3, 'other', resume_records=0)
+
+    def test_genetic_algorithm_archives_every_evaluation(self):
+        setup = make_setup(pop_size=100, num_generations=3, mutation_rate=0.2, decay_rate=1, parent_fraction=0.1, max_s=20, max_S=25,
+                           seed=10, max_workers=0, evaluation_mode='batch', plot=False, archive_path=self.path)
+        best = genetic_algorithm(CONSTANT_DEMAND, setup, callbacks=[])
+        records = load_archive(self.path)
+        self.assertEqual(len(records), 300)
+        self.assertTrue(records['simulated'].all())
+        self.assertLessEqual(records['metrics'][:, 0].min(), best[0][1])
+
+        genetic_algorithm(CONSTANT_DEMAND, setup, callbacks=[])
+        self.assertEqual(len(load_archive(self.path)), 300)  # A new run starts a new archive
+
+    def test_resumed_run_drops_records_after_the_checkpoint(self):
+        setup = make_setup(pop_size=100, num_generations=4, mutation_rate=0.2, decay_rate=1, parent_fraction=0.1, max_s=20, max_S=25,
+                           seed=10, max_workers=0, evaluation_mode='batch', plot=False, archive_path=self.path,
+                           checkpoint_path=os.path.join(self.directory.name, 'run.npz'), checkpoint_interval=2)
+
+        def interrupt(progress):
+            if progress['generation'] == 3:
+                raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            genetic_algorithm(CONSTANT_DEMAND, setup, callbacks=[interrupt])
+        # Records of generation 3 that reached the file before the interruption
+        with open(self.path, 'ab') as file:
+            file.write(load_archive(self.path)[:50].tobytes())
+
+        genetic_algorithm(CONSTANT_DEMAND, dict(setup, resume=True), callbacks=[])
+        records = load_archive(self.path)
+        self.assertEqual(np.bincount(records['generation']).tolist(), [100, 100, 100, 100])
+
+    def test_racing_estimates_are_marked(self):
+        setup = make_setup(pop_size=100, num_generations=2, mutation_rate=0.2, decay_rate=1, parent_fraction=0.1, max_s=20, max_S=25,
+                           seed=10, max_workers=0, evaluation_mode='batch', plot=False, archive_path=self.path, racing=True,
+                           scenario_mode='fixed', num_replications=4, cache_size=1000)
+        genetic_algorithm(np.random.default_rng(4).poisson(1.5, size=(3, 60)), setup, callbacks=[])
+        simulated = load_archive(self.path)['simulated']
+        self.assertEqual(len(simulated), 200)
+        self.assertTrue(0 < simulated.sum() < 200)
+
+class TestRolling(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.setup = make_setup(pop_size=100, num_generations=30, mutation_rate=0.2, decay_rate=1, parent_fraction=0.1,
+                                max_s=20, max_S=25, seed=5, max_workers=0, evaluation_mode='batch', scenario_mode='fixed',
+                                plot=False, policies_path=os.path.join(self.directory.name, 'policies.json'))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_perturbed_population_surrounds_the_saved_policies(self):
+        population = perturbed_population(POPULATION[:2], 100, self.setup, np.random.default_rng(0))
+        np.testing.assert_array_equal(population[:2], POPULATION[:2])
+        self.assertTrue(np.all(population[:, :, 1] >= 1) and np.all(population[:, :, 1] < population[:, :, 2]))
+        self.assertTrue(np.all(population[:, :, 2] <= 25))
+        # 80% of the other 98 are within two units of a saved policy in every item
+        distance = np.abs(population[2:, None, :, 1:] - np.array(POPULATION[:2])[None, :, :, 1:]).max(axis=(2, 3)).min(axis=1)
+        self.assertGreaterEqual(np.sum(distance <= 2), 78)
+
+    def test_rejects_policies_for_other_items(self):
+        with self.assertRaises(ValueError):
+            perturbed_population([[[4, 1, 2]]], 100, self.setup, np.random.default_rng(0))
+        with self.assertRaises(ValueError):
+            perturbed_population([], 100, self.setup, np.random.default_rng(0))
+
+    def test_rejects_empty_saved_policies(self):
+        save_policies(self.setup['policies_path'], [])
+        with self.assertRaises(ValueError):
+            load_policies(self.setup['policies_path'])
+
+    def test_early_stop_ends_the_run(self):
+        reports = []
+        genetic_algorithm(CONSTANT_DEMAND, dict(self.setup, early_stop_generations=2), callbacks=[reports.append])
+        costs = reports[-1]['cost_progression']
+        self.assertLess(len(reports), 30)
+        self.assertGreaterEqual(min(costs[-2:]), min(costs[:-2]))
+
+    def test_rolling_run_starts_from_saved_policies(self):
+        first = rolling_optimization(CONSTANT_DEMAND, self.setup, callbacks=[])
+        self.assertEqual(load_policies(self.setup['policies_path'])[0], first[0][0])
+        reports = []
+        second = rolling_optimization(CONSTANT_DEMAND, self.setup, callbacks=[reports.append])
+        self.assertLessEqual(second[0][1], first[0][1])
+        self.assertLessEqual(reports[0]['cost_progression'][0], first[0][1])
+
+class TestPareto(unittest.TestCase):
+
+    def test_fronts_match_pairwise_dominance(self):
+        objectives = np.random.default_rng(2).integers(0, 15, size=(300, 2)).astype(float)  # Many ties and duplicates
+        fronts = non_dominated_fronts(objectives)
+        dominates = (np.all(objectives[:, None] <= objectives[None], axis=2) & np.any(objectives[:, None] < objectives[None], axis=2))
+        remaining = np.ones(len(objectives), dtype=bool)
+        front = 0
+        while remaining.any():
+            # Peel off the points not dominated by any remaining point
+            current = remaining & ~np.any(dominates[remaining], axis=0)
+            np.testing.assert_array_equal(np.flatnonzero(fronts == front), np.flatnonzero(current))
+            remaining &= ~current
+            front += 1
+
+    def test_crowding_distance_favours_extremes(self):
+        objectives = np.array([[0.0, 4.0], [1.0, 3.0], [2.0, 2.5], [4.0, 0.0], [5.0, 5.0]])
+        fronts = non_dominated_fronts(objectives)
+        np.testing.assert_array_equal(fronts, [0, 0, 0, 0, 1])
+        distance = crowding_distance(objectives, fronts)
+        self.assertTrue(np.isinf(distance[[0, 3, 4]]).all())
+        self.assertAlmostEqual(distance[1], 2 / 4 + 1.5 / 4)
+
+    def test_front_trades_cost_for_service_level(self):
+        # Cheap backorders make low stock worth its lost service, so the front has more than one point
+        demand = np.random.default_rng(1).poisson(2, size=(3, 30))
+        setup = make_setup(pop_size=60, num_generations=4, mutation_rate=0.2, max_s=20, max_S=25, seed=9, max_workers=0,
+                           evaluation_mode='batch', scenario_mode='fixed', num_replications=4, plot=False,
+                           backorder_cost=0.5, order_cost=100.0)
+        front = pareto_front(demand, setup, callbacks=[])
+        costs = [scores[1] for scores in front]
+        service_levels = [scores[2] for scores in front]
+        self.assertGreater(len(front), 1)
+        self.assertEqual(costs, sorted(costs))
+        self.assertTrue(all(a < b for a, b in zip(service_levels, service_levels[1:])))
+
+class TestStartup(unittest.TestCase):
+
+    def imported_modules(self, module):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.run([sys.executable, '-c', f"import sys, {module}; print(' '.join(sys.modules))"], cwd=root,
+                                capture_output=True, text=True, check=True).stdout
+        return {name.split('.')[-1] for name in output.split()} | {name.split('.')[0] for name in output.split()}
+
+    def test_worker_entry_only_needs_numpy(self):
+        modules = self.imported_modules('src.PeriodicReview_JointReplenishment.worker')
+        for heavy in ['matplotlib', 'pandas', 'asyncio', 'genetic_algorithm', 'graph', 'evaluator']:
+            self.assertNotIn(heavy, modules)
+
+    def test_command_line_imports_optimizers_lazily(self):
+        modules = self.imported_modules('src.PeriodicReview_JointReplenishment.main')
+        for heavy in ['matplotlib', 'pandas', 'asyncio', 'genetic_algorithm']:
+            self.assertNotIn(heavy, modules)
+
+class TestCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.setup = make_setup(pop_size=100, num_generations=4, mutation_rate=0.2, decay_rate=1, parent_fraction=0.1,
+                                max_s=20, max_S=25, seed=11, max_workers=0, evaluation_mode='batch', cache_size=1000,
+                                plot=False, checkpoint_path=os.path.join(self.directory.name, 'run.npz'))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_resumed_run_matches_uninterrupted_run(self):
+        uninterrupted = genetic_algorithm(CONSTANT_DEMAND, dict(self.setup, checkpoint_path=None), callbacks=[])
+
+        genetic_algorithm(CONSTANT_DEMAND, dict(self.setup, num_generations=2), callbacks=[])
+        resumed = genetic_algorithm(CONSTANT_DEMAND, dict(self.setup, resume=True), callbacks=[])
+
+        self.assertEqual(resumed, uninterrupted)
+
+    def test_rejects_checkpoint_of_another_problem(self):
+        genetic_algorithm(CONSTANT_DEMAND, dict(self.setup, num_generations=1), callbacks=[])
+        with self.assertRaises(ValueError):
+            genetic_algorithm(CONSTANT_DEMAND, dict(self.setup, resume=True, order_cost=1000.0), callbacks=[])
+
+if __name__ == '__main__':
+    unittest.main()